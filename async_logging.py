@@ -0,0 +1,164 @@
+"""
+Logging that never blocks extraction.
+
+Records used to be written to stderr and pdf_processor.log by the thread that
+logged them, so a scanned 500-page document, which logs a warning or two per
+page, spent real time in blocking file writes inside the page loop.
+
+configure() gives the root logger a single QueueHandler. Logging a record
+only formats it and puts it on an unbounded queue, and a QueueListener
+thread writes it to stderr and to the log file. The file rotates by size.
+Worker processes forked afterwards start their own listener (the parent's
+thread does not exist in a forked child) and append to the same file,
+reopening it when the main process has rotated it; only the main process
+rotates.
+
+Within repeat_summary(), records below ERROR that differ only in their
+numbers (the same warning for page 3, page 4, ...) are logged REPEAT_BURST times and then
+counted instead, and the counts are logged as one summary line per kind when
+the document is done. Suppressed records are dropped before they are
+formatted or queued.
+"""
+
+import contextlib
+import logging
+import queue
+import re
+import sys
+from typing import Dict, Iterator, Optional, Tuple
+
+LOG_FILE = 'pdf_processor.log'
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_MAX_MB = 10     # Size at which the log file is rotated
+LOG_BACKUPS = 3     # Rotated log files kept
+REPEAT_BURST = 3    # Records of one kind logged per document before the rest are counted
+
+_NUMBERS = re.compile(r'\d+(?:\.\d+)?')
+
+_listener = None
+_settings: Optional[Dict[str, object]] = None
+
+
+class RepeatFilter(logging.Filter):
+    """Passes the first `burst` records of each kind below ERROR within a scope and counts the rest."""
+
+    def __init__(self, burst: int = REPEAT_BURST):
+        super().__init__()
+        self.burst = burst
+        self.depth = 0
+        self.counts: Dict[Tuple[str, int, str], int] = {}
+        self.examples: Dict[Tuple[str, int, str], str] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # Errors are always logged: distinct failures must not be folded into a count
+        if not self.depth or record.levelno >= logging.ERROR:
+            return True
+        message = record.getMessage()
+        key = (record.name, record.levelno, _NUMBERS.sub('#', message))
+        seen = self.counts.get(key, 0) + 1
+        self.counts[key] = seen
+        if seen == 1:
+            self.examples[key] = message
+        return seen <= self.burst
+
+    def flush(self, label: str) -> None:
+        """Log one line for each kind of record that was suppressed, and reset the counts."""
+        counts, examples = self.counts, self.examples
+        self.counts, self.examples = {}, {}
+        for key, seen in counts.items():
+            if seen > self.burst:
+                name, level, _ = key
+                logging.getLogger(name).log(level, f"{label}: {seen - self.burst} more like "
+                                                   f"'{examples[key]}' suppressed ({seen} in total)")
+
+
+REPEATS = RepeatFilter()
+
+
+@contextlib.contextmanager
+def repeat_summary(label: str) -> Iterator[None]:
+    """Rate-limit repeated records until the block exits, then log a summary prefixed with `label`."""
+    REPEATS.depth += 1
+    try:
+        yield
+    finally:
+        REPEATS.depth -= 1
+        if not REPEATS.depth:
+            REPEATS.flush(label)
+
+
+def _file_handler(path: str, max_bytes: int, backups: int, rotate: bool) -> logging.Handler:
+    import logging.handlers
+
+    if rotate:
+        return logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                                    encoding='utf-8')
+    # Appends, and reopens the file after another process has rotated it
+    return logging.handlers.WatchedFileHandler(path, encoding='utf-8')
+
+
+def configure(path: str = LOG_FILE, level: int = logging.INFO, max_mb: float = LOG_MAX_MB,
+              backups: int = LOG_BACKUPS, rotate: Optional[bool] = None) -> None:
+    """
+    Route the root logger through a queue to stderr and a size-rotated `path`.
+
+    Args:
+        rotate: Rotate the file from this process (default: unless this is a
+            multiprocessing child, whose parent does the rotating).
+    """
+    import logging.handlers
+    import multiprocessing
+    import multiprocessing.util
+
+    global _listener, _settings
+    if rotate is None:
+        rotate = multiprocessing.parent_process() is None
+    stop()
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [logging.StreamHandler(sys.stderr),
+                _file_handler(path, int(max_mb * 1024 * 1024), backups, rotate)]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(records)
+    queue_handler.addFilter(REPEATS)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    if _settings is None:
+        multiprocessing.util.register_after_fork(REPEATS, _after_fork)
+    _settings = {'path': path, 'level': level, 'max_mb': max_mb, 'backups': backups}
+    if not rotate:
+        # Forked workers leave through os._exit, which skips atexit but runs these
+        multiprocessing.util.Finalize(REPEATS, stop, exitpriority=1)
+    else:
+        import atexit
+
+        atexit.register(stop)
+
+
+def _after_fork(repeats: RepeatFilter) -> None:
+    """Start a listener of this process's own in a forked child of a configured process."""
+    global _listener
+    _listener = None  # The parent's thread did not survive the fork
+    # Counts belong to the parent's document; this process summarises its own
+    repeats.depth, repeats.counts, repeats.examples = 0, {}, {}
+    if _settings is not None:
+        configure(rotate=False, **_settings)
+
+
+def stop() -> None:
+    """Write the records still queued and stop the listener thread."""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
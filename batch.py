@@ -0,0 +1,311 @@
+"""
+Process-pool batch execution for the outline extractor.
+
+Each document is handed to a worker process one at a time. The parent enforces
+a wall-clock timeout per document (killing the worker, with any helper
+processes it started, if a page hangs inside pdfplumber) and workers retire themselves after a number of documents or when
+their resident memory grows past a ceiling, so pdfminer's caches never
+accumulate across a large batch. Results are yielded as soon as they finish.
+"""
+
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from multiprocessing.connection import wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 10.0        # Seconds a single document may take
+DEFAULT_MAX_TASKS = 50        # Documents handled before a worker is recycled
+DEFAULT_MAX_RSS_MB = 2048     # Resident memory ceiling before a worker is recycled
+
+
+class BatchResult(NamedTuple):
+    """Outcome of one document processed by the pool."""
+    pdf_path: str
+    result: Optional[Dict[str, Any]]
+    error: Optional[str]
+    elapsed: float
+    tag: Any = None
+
+
+# A PDF path, or a (PDF path, extractor keyword arguments) pair
+Job = Union[str, Tuple[str, Dict[str, Any]]]
+
+
+def _unpack(job: Job) -> Tuple[str, Dict[str, Any]]:
+    return (job, {}) if isinstance(job, str) else job
+
+
+def current_rss_mb() -> float:
+    """Return the resident set size of this process in megabytes."""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        import resource
+        # Peak rather than current RSS, but good enough as a recycling signal
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _worker_loop(conn, extractor: Callable[[str], Dict[str, Any]],
+                 max_tasks: int, max_rss_mb: float,
+                 initializer: Optional[Callable[[], None]] = None) -> None:
+    """Receive documents over `conn`, extract them and send back the results."""
+    if hasattr(os, 'setsid'):
+        # Lead a process group of our own, so killing the worker also kills
+        # the helper processes (page shards) the extractor started
+        os.setsid()
+    if initializer is not None:
+        initializer()
+    handled = 0
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if job is None:
+            break
+
+        pdf_path, options = job
+        try:
+            result, error = extractor(pdf_path, **options), None
+        except Exception as e:
+            result, error = None, str(e)
+
+        handled += 1
+        retiring = handled >= max_tasks or current_rss_mb() > max_rss_mb
+        conn.send((result, error, retiring))
+        if retiring:
+            break
+    conn.close()
+
+
+class _Worker:
+    """A single worker process and the parent's end of its pipe."""
+
+    def __init__(self, ctx, extractor, max_tasks: int, max_rss_mb: float, initializer=None):
+        self.conn, child_conn = ctx.Pipe()
+        # Not a daemon, so the extractor may start its own helper processes
+        self.process = ctx.Process(
+            target=_worker_loop,
+            args=(child_conn, extractor, max_tasks, max_rss_mb, initializer),
+        )
+        self.process.start()
+        child_conn.close()
+        self.pdf_path: Optional[str] = None
+        self.tag: Any = None
+        self.started = 0.0
+        self.deadline = 0.0
+
+    def assign(self, pdf_path: str, timeout: float, tag: Any, options: Dict[str, Any]) -> None:
+        self.pdf_path = pdf_path
+        self.tag = tag
+        self.started = time.time()
+        self.deadline = self.started + timeout
+        self.conn.send((pdf_path, options))
+
+    def stop(self, kill: bool = False) -> None:
+        if kill:
+            self._kill_group()
+            self.process.terminate()
+        else:
+            try:
+                self.conn.send(None)
+            except (OSError, ValueError):
+                pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+    def _kill_group(self) -> None:
+        """Kill the worker's process group, which includes any helper processes it started."""
+        if not hasattr(os, 'killpg') or self.process.pid is None:
+            return
+        try:
+            # Only once the worker has made itself a group leader
+            if os.getpgid(self.process.pid) == self.process.pid:
+                os.killpg(self.process.pid, signal.SIGKILL)
+        except OSError:
+            pass  # Already gone
+
+
+class WorkerPool:
+    """
+    Pool of isolated extractor processes.
+
+    Args:
+        extractor: Picklable function taking a PDF path and returning the result dict.
+        workers: Number of worker processes (default: CPU count).
+        timeout: Wall-clock seconds per document before its worker is killed.
+        max_tasks_per_worker: Documents a worker handles before it is replaced.
+        max_rss_mb: Resident memory (MB) above which a worker is replaced.
+        context: multiprocessing start method for the workers (default: the
+            platform default).
+        initializer: Called once in each worker before its first document.
+    """
+
+    def __init__(self, extractor: Callable[[str], Dict[str, Any]],
+                 workers: Optional[int] = None,
+                 timeout: float = DEFAULT_TIMEOUT,
+                 max_tasks_per_worker: int = DEFAULT_MAX_TASKS,
+                 max_rss_mb: float = DEFAULT_MAX_RSS_MB,
+                 context: Optional[str] = None,
+                 initializer: Optional[Callable[[], None]] = None):
+        self.extractor = extractor
+        self.size = max(1, workers or os.cpu_count() or 1)
+        self.timeout = timeout
+        self.max_tasks = max(1, max_tasks_per_worker)
+        self.max_rss_mb = max_rss_mb
+        self._ctx = multiprocessing.get_context(context)
+        self.initializer = initializer
+        self._idle: List[_Worker] = []
+        self._busy: Dict[Any, _Worker] = {}
+
+    def _spawn(self) -> _Worker:
+        return _Worker(self._ctx, self.extractor, self.max_tasks, self.max_rss_mb, self.initializer)
+
+    def _release(self, worker: _Worker, retiring: bool) -> None:
+        del self._busy[worker.conn]
+        if retiring:
+            worker.stop()
+            logger.debug(f"Recycled worker {worker.process.pid}")
+        else:
+            self._idle.append(worker)
+
+    @property
+    def available(self) -> int:
+        """Number of documents that can be started without waiting."""
+        return self.size - len(self._busy)
+
+    def warm(self) -> None:
+        """Start every worker now rather than on first use."""
+        while len(self._idle) + len(self._busy) < self.size:
+            self._idle.append(self._spawn())
+
+    def start(self, pdf_path: str, options: Optional[Dict[str, Any]] = None,
+              timeout: Optional[float] = None, tag: Any = None) -> None:
+        """
+        Hand `pdf_path` to an idle worker; its BatchResult is returned by a later poll().
+
+        `options` are passed to the extractor as keyword arguments (kept apart
+        from this method's own, so an extractor option may be called `timeout`
+        or `tag`), `timeout` overrides the pool's per-document timeout, and
+        `tag` is copied to the BatchResult.
+        """
+        if not self.available:
+            raise RuntimeError("No worker available")
+        worker = self._idle.pop() if self._idle else self._spawn()
+        worker.assign(pdf_path, self.timeout if timeout is None else timeout, tag, options or {})
+        self._busy[worker.conn] = worker
+
+    def poll(self, timeout: Optional[float] = None, wakeup: Iterable[Any] = ()) -> List[BatchResult]:
+        """
+        Wait for running documents and return those that finished or timed out.
+
+        Returns after `timeout` seconds at the latest, when the earliest
+        running document reaches its deadline, or when one of the `wakeup`
+        connections becomes readable (the caller drains those).
+        """
+        wakeup = list(wakeup)
+        if not self._busy:
+            if wakeup:
+                wait(wakeup, timeout=timeout)
+            return []
+
+        wait_for = max(0.0, min(w.deadline for w in self._busy.values()) - time.time())
+        if timeout is not None:
+            wait_for = min(wait_for, timeout)
+        ready = wait(list(self._busy) + wakeup, timeout=wait_for)
+
+        results = []
+        for conn in ready:
+            worker = self._busy.get(conn)
+            if worker is None:
+                continue  # A wakeup connection
+            elapsed = time.time() - worker.started
+            try:
+                result, error, retiring = conn.recv()
+            except (EOFError, OSError):
+                del self._busy[conn]
+                worker.stop(kill=True)
+                code = worker.process.exitcode
+                logger.error(f"Worker died while processing {worker.pdf_path} (exit code {code})")
+                results.append(BatchResult(worker.pdf_path, None, f"worker exited with code {code}",
+                                           elapsed, worker.tag))
+                continue
+            self._release(worker, retiring)
+            results.append(BatchResult(worker.pdf_path, result, error, elapsed, worker.tag))
+
+        now = time.time()
+        for conn, worker in list(self._busy.items()):
+            if now > worker.deadline:
+                del self._busy[conn]
+                worker.stop(kill=True)
+                logger.error(f"Timed out after {worker.deadline - worker.started:.1f} seconds: {worker.pdf_path}")
+                results.append(BatchResult(worker.pdf_path, None, 'timeout', now - worker.started, worker.tag))
+        return results
+
+    def imap_unordered(self, jobs: Iterable[Job]) -> Iterator[BatchResult]:
+        """
+        Process `jobs` and yield a BatchResult for each as it completes.
+
+        Jobs are drawn only when a worker is free, so `jobs` may be a lazy
+        iterator that prepares each document just in time.
+        """
+        jobs = iter(jobs)
+        exhausted = False
+
+        while True:
+            while not exhausted and self.available:
+                job = next(jobs, None)
+                if job is None:
+                    exhausted = True
+                    break
+                pdf_path, options = _unpack(job)
+                self.start(pdf_path, options)
+            if not self._busy:
+                break
+            yield from self.poll()
+
+    def close(self) -> None:
+        """Stop all workers, killing any that are still busy."""
+        for worker in self._idle:
+            worker.stop()
+        for worker in self._busy.values():
+            worker.stop(kill=True)
+        self._idle.clear()
+        self._busy.clear()
+
+    def __enter__(self) -> "WorkerPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def process_inline(jobs: Iterable[Job],
+                   extractor: Callable[[str], Dict[str, Any]]) -> Iterator[BatchResult]:
+    """Run `extractor` over `jobs` in this process, without isolation or timeouts."""
+    for job in jobs:
+        pdf_path, options = _unpack(job)
+        start_time = time.time()
+        try:
+            result, error = extractor(pdf_path, **options), None
+        except Exception as e:
+            result, error = None, str(e)
+        yield BatchResult(pdf_path, result, error, time.time() - start_time)
+
+
+def process_batch(jobs: Iterable[Job],
+                  extractor: Callable[[str], Dict[str, Any]],
+                  **pool_options: Any) -> Iterator[BatchResult]:
+    """Run `extractor` over `jobs` in a WorkerPool, yielding results as they finish."""
+    with WorkerPool(extractor, **pool_options) as pool:
+        yield from pool.imap_unordered(jobs)
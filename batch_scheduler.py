@@ -0,0 +1,169 @@
+"""
+Cost-based ordering of a batch and sharing of a batch-wide deadline.
+
+Documents used to start in directory-listing order, so a 500-page PDF listed
+last started when the other workers were already idle and alone set the
+batch's wall time. plan_batch() predicts each document's cost from its file
+size and page count (the page tree root's /Count, found in the raw bytes at
+either end of the file without parsing it, so planning a large batch reads
+only a little of each file) and orders the batch longest first, so the large documents start first and
+the small ones fill in around them.
+
+With a batch deadline, the batch's makespan is estimated by replaying that
+order on the available workers. If it does not fit, every document's page
+budget is cut by the same proportion, so each still gets a sampled pass over
+all its pages (see page_scheduler) instead of the last documents getting
+nothing.
+
+After the batch, cost_report() compares predicted with actual seconds and
+fits new coefficients to the actuals, which can be used to tune the model.
+"""
+
+import heapq
+import os
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+MIN_PAGE_BUDGET = 0.5    # Seconds of page reading no document is cut below
+BYTES_PER_PAGE = 50_000  # Bytes assumed per page when the page tree root is not found
+COUNT_SCAN_BYTES = 256 * 1024  # Bytes read from each end of a file looking for the page tree root
+
+# (seconds per document, per page, per MB) for each extraction backend
+DEFAULT_COEFFICIENTS = {
+    'pdfplumber': (0.1, 0.05, 0.05),
+    'pdfminer': (0.1, 0.015, 0.05),
+}
+
+
+# A /Type /Pages dictionary (entries may hold one level of nested dictionaries) and its /Count
+_DICT_BODY = rb'(?:[^<>]|<<[^<>]*>>)*?'
+_PAGES_COUNT = re.compile(rb'/Type\s*/Pages\b' + _DICT_BODY + rb'/Count\s+(\d+)|'
+                          rb'/Count\s+(\d+)' + _DICT_BODY + rb'/Type\s*/Pages\b')
+
+
+def page_count(pdf_path: str) -> Optional[int]:
+    """
+    Return the page count stated by the page tree root, or None if it is not found.
+
+    Only the first and last COUNT_SCAN_BYTES of the file are searched, for
+    uncompressed page tree nodes; the root's /Count is the largest. Nothing is
+    parsed, so a root kept in a compressed object stream is not found.
+    """
+    try:
+        with open(pdf_path, 'rb') as f:
+            chunks = [f.read(COUNT_SCAN_BYTES)]
+            size = f.seek(0, os.SEEK_END)
+            if size > COUNT_SCAN_BYTES:
+                f.seek(max(COUNT_SCAN_BYTES, size - COUNT_SCAN_BYTES))
+                chunks.append(f.read())
+    except OSError:
+        return None
+    counts = [int(before or after) for chunk in chunks for before, after in _PAGES_COUNT.findall(chunk)]
+    return max(counts) if counts else None
+
+
+class DocumentCostModel:
+    """Linear model of a document's extraction seconds in its page count and size."""
+
+    def __init__(self, per_document: float, per_page: float, per_mb: float):
+        self.per_document = per_document
+        self.per_page = per_page
+        self.per_mb = per_mb
+
+    @classmethod
+    def for_backend(cls, backend: str) -> "DocumentCostModel":
+        return cls(*DEFAULT_COEFFICIENTS.get(backend, DEFAULT_COEFFICIENTS['pdfplumber']))
+
+    def predict(self, pages: int, size_bytes: int) -> float:
+        return self.per_document + self.per_page * pages + self.per_mb * size_bytes / (1024 * 1024)
+
+    @classmethod
+    def fit(cls, samples: Sequence[Tuple[int, int, float]]) -> Optional["DocumentCostModel"]:
+        """Least-squares fit to (pages, size in bytes, seconds) samples; None if there are too few."""
+        import numpy as np
+
+        if len(samples) < 3:
+            return None
+        pages, sizes, seconds = (np.array(column, dtype=float) for column in zip(*samples))
+        design = np.column_stack([np.ones(len(samples)), pages, sizes / (1024 * 1024)])
+        coefficients = np.linalg.lstsq(design, seconds, rcond=None)[0]
+        return cls(*(float(c) for c in coefficients))
+
+    def as_dict(self) -> Dict[str, float]:
+        return {'per_document': round(self.per_document, 4), 'per_page': round(self.per_page, 4),
+                'per_mb': round(self.per_mb, 4)}
+
+
+class PlannedDocument(NamedTuple):
+    """One document of a planned batch."""
+    pdf_path: str
+    size_bytes: int
+    pages: int
+    predicted: float     # Seconds, within the document's page budget
+    page_budget: float   # Seconds of page reading allowed
+
+
+def makespan(costs: Iterable[float], workers: int) -> float:
+    """Wall time of running `costs` in the given order, each on the first free of `workers`."""
+    finish_times = [0.0] * max(1, workers)
+    for cost in costs:
+        heapq.heappush(finish_times, heapq.heappop(finish_times) + cost)
+    return max(finish_times)
+
+
+def plan_batch(pdf_paths: Iterable[str], workers: int, page_budget: float,
+               deadline: Optional[float] = None,
+               model: Optional[DocumentCostModel] = None) -> List[PlannedDocument]:
+    """
+    Return the documents longest first, with page budgets fitted to `deadline`.
+
+    Args:
+        pdf_paths: Documents of the batch.
+        workers: Documents processed at once.
+        page_budget: Page-reading seconds each document gets without a deadline.
+        deadline: Seconds the whole batch may take (default: no limit).
+        model: Cost model (default: the pdfplumber defaults).
+    """
+    model = model or DocumentCostModel.for_backend('pdfplumber')
+    documents = []
+    for pdf_path in pdf_paths:
+        try:
+            size_bytes = os.path.getsize(pdf_path)
+        except OSError:
+            size_bytes = 0
+        pages = page_count(pdf_path)
+        if pages is None:
+            pages = max(1, size_bytes // BYTES_PER_PAGE)
+        # Page reading stops at the budget, so no document costs much more than that
+        predicted = min(model.predict(pages, size_bytes), model.per_document + page_budget)
+        documents.append(PlannedDocument(pdf_path, size_bytes, pages, predicted, page_budget))
+    documents.sort(key=lambda document: document.predicted, reverse=True)
+
+    if deadline is not None and documents:
+        scale = deadline / makespan((d.predicted for d in documents), workers)
+        if scale < 1:
+            cut = []
+            for d in documents:
+                budget = max(MIN_PAGE_BUDGET, min(page_budget, d.predicted * scale))
+                cut.append(d._replace(page_budget=budget, predicted=min(d.predicted, model.per_document + budget)))
+            documents = cut
+    return documents
+
+
+def cost_report(planned: Sequence[PlannedDocument], actual: Dict[str, float]) -> Dict[str, object]:
+    """Compare predicted with actual seconds for the documents that were extracted."""
+    measured = [(d, actual[d.pdf_path]) for d in planned if d.pdf_path in actual]
+    predicted_total = sum(d.predicted for d, _ in measured)
+    actual_total = sum(seconds for _, seconds in measured)
+    report: Dict[str, object] = {
+        'documents': len(measured),
+        'predicted_seconds': round(predicted_total, 3),
+        'actual_seconds': round(actual_total, 3),
+        'mean_abs_error': round(sum(abs(d.predicted - s) for d, s in measured) / len(measured), 3)
+                          if measured else 0.0,
+    }
+    # Only documents that read every page say what a full read costs
+    fitted = DocumentCostModel.fit([(d.pages, d.size_bytes, s) for d, s in measured if s < d.page_budget])
+    if fitted is not None:
+        report['fitted'] = fitted.as_dict()
+    return report
@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the outline extractors.
+
+Generates synthetic PDFs with known headings (no network or external tools
+needed), runs each extractor on them in a fresh process and records wall time,
+peak RSS, peak Python allocations (one extra run under tracemalloc), pages
+per second and heading precision/recall. The main-* extractors run once per
+extraction backend (main-pdfminer being the lean pdfminer device), and
+main-reparse runs the font-size heuristic with --page-buffer reparse.
+
+    python benchmark.py --preset quick --save-baseline benchmark_baseline.json
+    python benchmark.py --preset quick --baseline benchmark_baseline.json
+
+With --baseline, the run fails (exit code 1) if any scenario is slower or uses
+more memory than the baseline by more than --threshold, or loses more than
+--quality-tolerance precision or recall.
+
+Every run also times the start-up of `main.py` in a fresh interpreter (bare
+interpreter, `import main`, `main.py --help`) and fails if `--help` takes
+longer than --startup-target-ms.
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+TITLE_SIZE = 24
+HEADING_SIZES = {1: 18, 2: 14, 3: 12}
+BODY_SIZE = 10
+STARTUP_TARGET_MS = 150  # `python main.py --help`, interpreter start-up included
+
+WORDS = ("analysis data model system process result method value table figure "
+         "report review design test level section summary detail policy plan").split()
+
+
+class Scenario(NamedTuple):
+    """Shape of one synthetic document."""
+    name: str
+    pages: int
+    lines_per_page: int      # Body text lines (glyph density)
+    heading_levels: int      # Distinct heading sizes used (1-3)
+    bookmarks: bool          # Embed the headings as bookmarks
+    image_every: int = 0     # Every n-th page is image-only (0: none)
+
+
+PRESETS = {
+    'quick': [
+        Scenario('1p-sparse', 1, 10, 2, False),
+        Scenario('10p-dense', 10, 45, 3, False),
+        Scenario('50p-bookmarks', 50, 30, 3, True),
+        Scenario('50p-scanned-mix', 50, 30, 2, False, image_every=3),
+    ],
+    'full': [
+        Scenario('1p-sparse', 1, 10, 2, False),
+        Scenario('10p-dense', 10, 45, 3, False),
+        Scenario('50p-one-size', 50, 30, 1, False),
+        Scenario('100p-dense', 100, 45, 3, False),
+        Scenario('100p-bookmarks', 100, 30, 3, True),
+        Scenario('100p-scanned-mix', 100, 30, 2, False, image_every=3),
+        Scenario('500p', 500, 30, 3, False),
+        Scenario('2000p', 2000, 20, 3, False),
+        Scenario('2000p-bookmarks', 2000, 20, 3, True),
+    ],
+}
+
+
+def _pdf_string(text: str) -> bytes:
+    escaped = text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    return b'(' + escaped.encode('latin-1') + b')'
+
+
+def build_pdf(pages: List[Any], bookmarks: Optional[List[Tuple[int, str, int]]] = None,
+              title: Optional[str] = None) -> bytes:
+    """
+    Write a minimal PDF using the standard Helvetica font.
+
+    Args:
+        pages: One entry per page, either a list of (font size, text) lines or
+            the string 'image' for a page that only paints an image.
+        bookmarks: Optional (level, text, page number) entries, in order.
+        title: Optional /Title for the document information dictionary.
+    """
+    objects: List[Optional[bytes]] = []
+
+    def reserve() -> int:
+        objects.append(None)
+        return len(objects)
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    def stream(body: bytes, extra: bytes = b'') -> bytes:
+        return b'<< /Length %d%s >>\nstream\n%s\nendstream' % (len(body), extra, body)
+
+    catalog_id = reserve()
+    pages_id = reserve()
+    font_id = add(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+    image_id = add(stream(bytes(range(0, 256, 4)) * 4,
+                          b' /Type /XObject /Subtype /Image /Width 16 /Height 16'
+                          b' /ColorSpace /DeviceGray /BitsPerComponent 8'))
+
+    page_ids = []
+    for page in pages:
+        if page == 'image':
+            resources = b'<< /XObject << /Im1 %d 0 R >> >>' % image_id
+            content = b'q %d 0 0 %d 36 36 cm /Im1 Do Q' % (PAGE_WIDTH - 72, PAGE_HEIGHT - 72)
+        else:
+            resources = b'<< /Font << /F1 %d 0 R >> >>' % font_id
+            y = PAGE_HEIGHT - 36
+            ops = []
+            for size, text in page:
+                y -= size * 1.3
+                ops.append(b'BT /F1 %d Tf 36 %.1f Td %s Tj ET' % (size, y, _pdf_string(text)))
+            content = b'\n'.join(ops)
+        content_id = add(stream(content))
+        page_ids.append(add(b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Resources %s /Contents %d 0 R >>'
+                            % (pages_id, PAGE_WIDTH, PAGE_HEIGHT, resources, content_id)))
+
+    objects[pages_id - 1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+        b' '.join(b'%d 0 R' % i for i in page_ids), len(page_ids))
+
+    catalog = b'<< /Type /Catalog /Pages %d 0 R' % pages_id
+    if bookmarks:
+        root_id = reserve()
+        item_ids = [reserve() for _ in bookmarks]
+        parents: Dict[int, int] = {}
+        children: Dict[int, List[int]] = {root_id: []}
+        stack = [(0, root_id)]
+        for (level, _, _), item_id in zip(bookmarks, item_ids):
+            while stack[-1][0] >= level:
+                stack.pop()
+            parents[item_id] = stack[-1][1]
+            children[stack[-1][1]].append(item_id)
+            children[item_id] = []
+            stack.append((level, item_id))
+
+        def links(item_id: int) -> bytes:
+            kids = children[item_id]
+            if not kids:
+                return b''
+            return b' /First %d 0 R /Last %d 0 R /Count %d' % (kids[0], kids[-1], len(kids))
+
+        for (_, text, page), item_id in zip(bookmarks, item_ids):
+            siblings = children[parents[item_id]]
+            i = siblings.index(item_id)
+            body = b'<< /Title %s /Parent %d 0 R /Dest [%d 0 R /XYZ 0 %d 0]' % (
+                _pdf_string(text), parents[item_id], page_ids[page - 1], PAGE_HEIGHT)
+            if i > 0:
+                body += b' /Prev %d 0 R' % siblings[i - 1]
+            if i + 1 < len(siblings):
+                body += b' /Next %d 0 R' % siblings[i + 1]
+            objects[item_id - 1] = body + links(item_id) + b' >>'
+        objects[root_id - 1] = b'<< /Type /Outlines' + links(root_id) + b' >>'
+        catalog += b' /Outlines %d 0 R' % root_id
+    objects[catalog_id - 1] = catalog + b' >>'
+
+    info_id = add(b'<< /Title %s >>' % _pdf_string(title)) if title else None
+
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    for offset in offsets:
+        out += b'%010d 00000 n \n' % offset
+    out += b'trailer\n<< /Size %d /Root %d 0 R' % (len(objects) + 1, catalog_id)
+    if info_id:
+        out += b' /Info %d 0 R' % info_id
+    out += b' >>\nstartxref\n%d\n%%%%EOF\n' % xref
+    return bytes(out)
+
+
+def generate(scenario: Scenario, seed: int = 0) -> Tuple[bytes, List[Dict[str, Any]]]:
+    """Return the PDF bytes for `scenario` and the outline it should produce."""
+    rng = random.Random(seed)
+    pages: List[Any] = []
+    expected = []
+    counters = [0, 0, 0]
+
+    for pg_no in range(1, scenario.pages + 1):
+        if scenario.image_every and pg_no % scenario.image_every == 0:
+            pages.append('image')
+            continue
+
+        lines = []
+        if pg_no == 1:
+            lines.append((TITLE_SIZE, 'Synthetic Benchmark Document'))
+        # One heading per level present on the page, deeper levels on alternate pages
+        for level in range(1, scenario.heading_levels + 1):
+            if level > 1 and pg_no % level:
+                continue
+            counters[level - 1] += 1
+            number = '.'.join(str(c) for c in counters[:level])
+            text = f"{number} {rng.choice(WORDS).title()} {rng.choice(WORDS).title()}"
+            lines.append((HEADING_SIZES[level], text))
+            expected.append({'level': f'H{level}', 'text': text, 'page': pg_no})
+            body_lines = scenario.lines_per_page // scenario.heading_levels
+            for _ in range(body_lines):
+                lines.append((BODY_SIZE, ' '.join(rng.choice(WORDS) for _ in range(14))))
+        pages.append(lines)
+
+    bookmarks = [(int(h['level'][1]), h['text'], h['page']) for h in expected] if scenario.bookmarks else None
+    return build_pdf(pages, bookmarks), expected
+
+
+def _extract_main(pdf_path: str) -> Dict[str, Any]:
+    import main
+    return main.extract_outline(pdf_path)
+
+
+def _extract_main_font_size(pdf_path: str) -> Dict[str, Any]:
+    import main
+    return main.extract_outline(pdf_path, tiered=False)
+
+
+def _extract_main_pdfminer(pdf_path: str) -> Dict[str, Any]:
+    import main
+    return main.extract_outline(pdf_path, tiered=False, backend='pdfminer')
+
+
+def _extract_main_reparse(pdf_path: str) -> Dict[str, Any]:
+    import main
+    return main.extract_outline(pdf_path, tiered=False, page_buffer='reparse')
+
+
+def _extract_final(pdf_path: str) -> Dict[str, Any]:
+    import extract_outline_final
+    return extract_outline_final.extract_outline(pdf_path)
+
+
+EXTRACTORS = {
+    'main': _extract_main,
+    'main-font-size': _extract_main_font_size,
+    'main-pdfminer': _extract_main_pdfminer,
+    'main-reparse': _extract_main_reparse,
+    'final': _extract_final,
+}
+
+
+def _run_child(conn, extractor: str, pdf_path: str, trace_allocations: bool = False) -> None:
+    """
+    Run one extraction in a fresh process and report result, time, peak RSS
+    and, when tracing allocations (which slows the run), the peak of traced memory.
+    """
+    logging.disable(logging.WARNING)
+    try:
+        if trace_allocations:
+            tracemalloc.start()
+        start = time.perf_counter()
+        result = EXTRACTORS[extractor](pdf_path)
+        elapsed = time.perf_counter() - start
+        peak_alloc_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024) if trace_allocations else 0.0
+        peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        conn.send((result, elapsed, peak_rss_mb, None, peak_alloc_mb))
+    except Exception as e:
+        conn.send((None, 0.0, 0.0, f"{type(e).__name__}: {e}", 0.0))
+    conn.close()
+
+
+def _normalise(text: str) -> str:
+    return ' '.join(text.split()).casefold()
+
+
+def score(outline: List[Dict[str, Any]], expected: List[Dict[str, Any]]) -> Tuple[float, float]:
+    """Return heading precision and recall, matching entries by normalised text."""
+    found = {_normalise(h['text']) for h in outline}
+    wanted = {_normalise(h['text']) for h in expected}
+    hits = len(found & wanted)
+    precision = hits / len(found) if found else (1.0 if not wanted else 0.0)
+    recall = hits / len(wanted) if wanted else 1.0
+    return precision, recall
+
+
+def run_one(extractor: str, pdf_path: str, expected: List[Dict[str, Any]],
+            pages: int, repeat: int) -> Dict[str, Any]:
+    """
+    Benchmark one extractor on one document; time is the best of `repeat`
+    runs, followed by one run under tracemalloc for the allocation peak.
+    """
+    ctx = multiprocessing.get_context('spawn')
+    runs = []
+    for run in range(repeat + 1):
+        parent_conn, child_conn = ctx.Pipe(duplex=False)
+        process = ctx.Process(target=_run_child, args=(child_conn, extractor, pdf_path, run == repeat))
+        process.start()
+        child_conn.close()
+        try:
+            runs.append(parent_conn.recv())
+        except EOFError:
+            runs.append((None, 0.0, 0.0, f"exited with code {process.exitcode}", 0.0))
+        process.join()
+
+    errors = [r[3] for r in runs if r[3]]
+    if errors:
+        return {'error': errors[0]}
+
+    traced = runs.pop()
+    result = runs[0][0]
+    if result.get('error'):
+        return {'error': result['error']}
+    wall_time = min(r[1] for r in runs)
+    precision, recall = score(result.get('outline', []), expected)
+    return {
+        'wall_time': round(wall_time, 4),
+        'peak_rss_mb': round(max(r[2] for r in runs), 1),
+        'peak_alloc_mb': round(traced[4], 1),
+        'pages_per_sec': round(pages / wall_time, 1) if wall_time else None,
+        'precision': round(precision, 4),
+        'recall': round(recall, 4),
+    }
+
+
+def measure_startup(repeat: int) -> Dict[str, float]:
+    """Return the best of `repeat` wall times (ms) of each start-up command in a fresh interpreter."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    commands = {
+        'interpreter': [sys.executable, '-c', 'pass'],
+        'import_main': [sys.executable, '-c', 'import main'],
+        'main_help': [sys.executable, 'main.py', '--help'],
+    }
+    timings = {}
+    for name, command in commands.items():
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run(command, cwd=here, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+            best = min(best, time.perf_counter() - start)
+        timings[name] = round(best * 1000, 1)
+    return timings
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any],
+            threshold: float, quality_tolerance: float) -> List[str]:
+    """Return a description of every regression of `results` against `baseline`."""
+    regressions = []
+    for scenario, by_extractor in results['scenarios'].items():
+        for extractor, current in by_extractor.items():
+            previous = baseline.get('scenarios', {}).get(scenario, {}).get(extractor)
+            if not previous or 'error' in previous:
+                continue
+            where = f"{scenario}/{extractor}"
+            if 'error' in current:
+                regressions.append(f"{where}: failed ({current['error']})")
+                continue
+            for key in ('wall_time', 'peak_rss_mb', 'peak_alloc_mb'):
+                if key in previous and current[key] > previous[key] * (1 + threshold):
+                    regressions.append(f"{where}: {key} {current[key]} > baseline {previous[key]}")
+            for key in ('precision', 'recall'):
+                if current[key] < previous[key] - quality_tolerance:
+                    regressions.append(f"{where}: {key} {current[key]} < baseline {previous[key]}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the PDF outline extractors on synthetic documents.")
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='quick', help="Scenario set to run")
+    parser.add_argument('--scenario', action='append', help="Only run the named scenario(s)")
+    parser.add_argument('--extractors', nargs='+', choices=sorted(EXTRACTORS), default=sorted(EXTRACTORS),
+                        help="Extractors to benchmark")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per measurement; the fastest is kept")
+    parser.add_argument('--workdir', help="Directory for the generated PDFs (default: a temporary directory)")
+    parser.add_argument('--output', help="Write the results JSON here")
+    parser.add_argument('--save-baseline', help="Write the results as a new baseline JSON")
+    parser.add_argument('--baseline', help="Compare against this baseline and fail on regressions")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="Allowed relative increase of time and memory over the baseline")
+    parser.add_argument('--quality-tolerance', type=float, default=0.02,
+                        help="Allowed absolute drop of precision and recall below the baseline")
+    parser.add_argument('--startup-target-ms', type=float, default=STARTUP_TARGET_MS,
+                        help="Fail if `main.py --help` takes longer than this")
+    args = parser.parse_args()
+
+    scenarios = [s for s in PRESETS[args.preset] if not args.scenario or s.name in args.scenario]
+    workdir = args.workdir or tempfile.mkdtemp(prefix='outline-bench-')
+    os.makedirs(workdir, exist_ok=True)
+
+    results: Dict[str, Any] = {'preset': args.preset, 'python': sys.version.split()[0], 'scenarios': {}}
+    startup = results['startup'] = measure_startup(max(args.repeat, 5))
+    print("startup " + ' '.join(f"{name}={ms:.1f}ms" for name, ms in startup.items()))
+    for scenario in scenarios:
+        pdf_bytes, expected = generate(scenario)
+        pdf_path = os.path.join(workdir, f"{scenario.name}.pdf")
+        with open(pdf_path, 'wb') as f:
+            f.write(pdf_bytes)
+
+        by_extractor = results['scenarios'][scenario.name] = {}
+        for extractor in args.extractors:
+            measured = run_one(extractor, pdf_path, expected, scenario.pages, args.repeat)
+            by_extractor[extractor] = measured
+            if 'error' in measured:
+                print(f"{scenario.name:<20} {extractor:<15} error: {measured['error']}")
+            else:
+                print(f"{scenario.name:<20} {extractor:<15} {measured['wall_time']:>8.3f}s "
+                      f"{measured['peak_rss_mb']:>7.1f}MB {measured['peak_alloc_mb']:>7.1f}MB alloc "
+                      f"{measured['pages_per_sec'] or 0:>8.1f} pages/s "
+                      f"P={measured['precision']:.2f} R={measured['recall']:.2f}")
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to: {path}")
+
+    failed = False
+    if startup['main_help'] > args.startup_target_ms:
+        print(f"STARTUP main_help {startup['main_help']:.1f}ms > target {args.startup_target_ms:.1f}ms")
+        failed = True
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.quality_tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print("No regressions against baseline")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,272 @@
+"""
+Content-addressed on-disk caches for extraction results and page lines.
+
+Entries are stored one file per key in a flat directory. Writes go to a
+temporary file that is atomically renamed into place, so several processes
+can share one cache directory. Each hit refreshes the entry's modification
+time, and when the directory grows past its size cap the least recently used
+entries are evicted first.
+
+ResultCache holds whole-document results keyed by the file's bytes.
+PageCache holds the lines of single pages keyed by what the page draws: its
+content streams, the fonts and form XObjects they use, and its geometry. An
+incrementally updated revision or a document built from the same template
+shares those objects with its predecessor even though the file as a whole
+differs, so only its changed pages need extracting again.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_MB = 512
+HASH_CHUNK_SIZE = 1024 * 1024
+MAX_OBJECT_DEPTH = 32  # Nesting followed when hashing a page's resources
+PAGE_EVICT_EVERY = 100  # Page entries written between size-cap checks
+
+
+def file_digest(path: str) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """
+    Size-capped key/value store of byte strings with LRU eviction.
+
+    Args:
+        cache_dir: Directory holding the entries (created if missing).
+        max_bytes: Total size of entries above which old ones are evicted.
+        suffix: File extension used for entries.
+        evict_every: Check the size cap after this many writes; caches of
+            many small entries check less often, since each check scans the
+            directory.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024,
+                 suffix: str = '.bin', evict_every: int = 1):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.evict_every = evict_every
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + self.suffix)
+
+    def _hit(self, key: str) -> None:
+        self.hits += 1
+        try:
+            os.utime(self._path(key))  # Mark as recently used
+        except OSError:
+            pass
+
+    def _read(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        """Return the stored bytes for `key`, or None on a miss."""
+        data = self._read(key)
+        if data is None:
+            self.misses += 1
+            return None
+        self._hit(key)
+        return data
+
+    def get_json(self, key: str, convert: Callable[[Any], Any] = lambda value: value) -> Any:
+        """
+        Return the JSON entry for `key` passed through `convert`, or None on a miss.
+
+        An entry that is not valid JSON, or that `convert` rejects with
+        ValueError or TypeError, counts as a miss and is not marked as
+        recently used; it is overwritten on the next put.
+        """
+        data = self._read(key)
+        try:
+            value = None if data is None else convert(json.loads(data.decode('utf-8')))
+        except (ValueError, TypeError):
+            value = None
+        if value is None:
+            self.misses += 1
+            return None
+        self._hit(key)
+        return value
+
+    def put_bytes(self, key: str, data: bytes) -> None:
+        """Store `data` under `key`, replacing any previous entry atomically."""
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            logger.warning(f"Could not write cache entry {key}: {str(e)}")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+        self._writes += 1
+        if self._writes % self.evict_every == 0:
+            self.evict()
+
+    def put_json(self, key: str, value: Any) -> None:
+        """Store `value` as compact JSON under `key`."""
+        self.put_bytes(key, json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+    def evict(self) -> int:
+        """Remove least recently used entries until the cache fits its cap; return how many."""
+        entries = []
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.startswith('.') or not entry.name.endswith(self.suffix):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue  # Removed by another process
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+
+        removed = 0
+        if total > self.max_bytes:
+            for _, size, path in sorted(entries):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+                if total <= self.max_bytes:
+                    break
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the hit and miss counters of this instance."""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+class ResultCache(DiskCache):
+    """Cache of outline results keyed by PDF content and extractor version."""
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024):
+        super().__init__(cache_dir, max_bytes=max_bytes, suffix='.json')
+
+    @staticmethod
+    def key_for(pdf_path: str, version: str) -> str:
+        """Return the cache key for a PDF file under a given extractor/config version."""
+        return hashlib.sha256(f"{file_digest(pdf_path)}:{version}".encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def key_for_data(data: bytes, version: str) -> str:
+        """Return the cache key for PDF contents already in memory; equal to key_for() of the same file."""
+        return hashlib.sha256(f"{hashlib.sha256(data).hexdigest()}:{version}".encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result for `key`, or None on a miss."""
+        return self.get_json(key)
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        """Store an extraction result under `key`."""
+        self.put_json(key, result)
+
+
+def _feed_object(obj: Any, digest: "hashlib._Hash", seen: Dict[int, bytes], depth: int = 0) -> None:
+    """
+    Feed a canonical encoding of a pdfminer object, with everything it references, into `digest`.
+
+    Indirect objects are hashed once per document: `seen` maps object ids to
+    their digests. Image data is left out, since images produce no text.
+    """
+    from pdfminer.pdftypes import PDFObjRef, PDFStream
+    from pdfminer.psparser import PSKeyword, PSLiteral
+
+    if depth > MAX_OBJECT_DEPTH:
+        raise ValueError("PDF objects nested too deeply to hash")
+    if isinstance(obj, PDFObjRef):
+        if obj.objid not in seen:
+            seen[obj.objid] = b'cycle'  # Stands in for the object while it is being hashed
+            sub_digest = hashlib.sha256()
+            _feed_object(obj.resolve(), sub_digest, seen, depth + 1)
+            seen[obj.objid] = sub_digest.digest()
+        digest.update(b'R' + seen[obj.objid])
+    elif isinstance(obj, dict):
+        digest.update(b'<<')
+        for key in sorted(obj):
+            if key in ('Parent', 'Length'):
+                continue
+            digest.update(b'/' + str(key).encode('utf-8'))
+            _feed_object(obj[key], digest, seen, depth + 1)
+        digest.update(b'>>')
+    elif isinstance(obj, (list, tuple)):
+        digest.update(b'[')
+        for item in obj:
+            _feed_object(item, digest, seen, depth + 1)
+        digest.update(b']')
+    elif isinstance(obj, PDFStream):
+        _feed_object(obj.attrs, digest, seen, depth + 1)
+        subtype = obj.attrs.get('Subtype')
+        if not (isinstance(subtype, PSLiteral) and subtype.name == 'Image'):
+            data = obj.get_data()
+            digest.update(b'stream%d:' % len(data) + data)
+    elif isinstance(obj, (PSLiteral, PSKeyword)):
+        name = obj.name
+        digest.update(b'/' + (name if isinstance(name, bytes) else name.encode('utf-8')))
+    elif isinstance(obj, bytes):
+        digest.update(b'(%d:' % len(obj) + obj + b')')
+    else:
+        digest.update(f"{type(obj).__name__}:{obj!r};".encode('utf-8'))
+
+
+class PageCache(DiskCache):
+    """Cache of extracted page lines keyed by page content and extractor version."""
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024):
+        super().__init__(cache_dir, max_bytes=max_bytes, suffix='.lines', evict_every=PAGE_EVICT_EVERY)
+
+    @staticmethod
+    def key_for_page(page_obj: Any, version: str, seen: Optional[Dict[int, bytes]] = None) -> str:
+        """
+        Return the cache key for a pdfminer page under a given extractor version.
+
+        Pass the same `seen` dict for all pages of one document so shared
+        fonts and forms are hashed once.
+        """
+        seen = {} if seen is None else seen
+        digest = hashlib.sha256(version.encode('utf-8'))
+        for name, value in (('MediaBox', page_obj.mediabox), ('CropBox', page_obj.cropbox),
+                            ('Rotate', page_obj.rotate), ('Resources', page_obj.resources),
+                            ('Contents', page_obj.contents)):
+            digest.update(name.encode('utf-8'))
+            _feed_object(value, digest, seen)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[List[Tuple[str, float, int]]]:
+        """Return the cached (text, size, glyph count) lines for `key`, or None on a miss."""
+        return self.get_json(key, lambda lines: [(text, size, glyph_count) for text, size, glyph_count in lines])
+
+    def put(self, key: str, lines: List[Tuple[str, float, int]]) -> None:
+        """Store the lines of one page under `key`."""
+        self.put_json(key, lines)
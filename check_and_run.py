@@ -1,18 +1,19 @@
+import json
 import os
 import sys
-from PyPDF2 import PdfReader
 
-def check_pdf(filepath):
+import main
+from document_session import DocumentSession
+
+def check_pdf(session):
     try:
-        with open(filepath, 'rb') as f:
-            reader = PdfReader(f)
-            print(f"PDF file is valid. Number of pages: {len(reader.pages)}")
-            if hasattr(reader, 'outline') and reader.outline:
-                print("This PDF has an outline.")
-                return True
-            else:
-                print("This PDF does not have an outline.")
-                return False
+        print(f"PDF file is valid. Number of pages: {session.page_count}")
+        if session.bookmarks(max_level=None):
+            print("This PDF has an outline.")
+            return True
+        else:
+            print("This PDF does not have an outline.")
+            return False
     except Exception as e:
         print(f"Error checking PDF: {e}")
         return False
@@ -23,6 +24,19 @@ if __name__ == "__main__":
         sys.exit(1)
     
     pdf_path = sys.argv[1]
-    if check_pdf(pdf_path):
-        print("\nRunning outline extractor...")
-        os.system(f'python main.py "{pdf_path}" -o "output/outline.json"')
+    try:
+        session = DocumentSession(pdf_path)
+    except Exception as e:
+        print(f"Error checking PDF: {e}")
+        sys.exit(1)
+    
+    # The check and the extraction share one parse of the file
+    with session:
+        if check_pdf(session):
+            print("\nRunning outline extractor...")
+            main.configure_logging()
+            result, _ = main.extract_outline_with_tier(pdf_path, session=session)
+            os.makedirs("output", exist_ok=True)
+            with open("output/outline.json", 'w', encoding='utf-8') as f:
+                json.dump(result, f, indent=2, ensure_ascii=False)
+            print("Outline saved to output/outline.json")
@@ -0,0 +1,123 @@
+"""
+One parse of a PDF, shared by everything that needs to look at it.
+
+The probe scripts used to open a document with PyPDF2 to count its pages and
+check its bookmarks, then start main.py, which parsed it again with
+pdfplumber. DocumentSession memory-maps the file once and hands the mapping
+to pdfplumber, so the xref table and trailer are parsed once, and page count,
+metadata, bookmarks and the pages themselves all come from that parse. A
+validate-then-extract flow passes the same session to
+main.extract_outline_with_tier().
+"""
+
+import io
+import mmap
+from typing import Any, Dict, List, Optional
+
+from embedded_outline import MAX_LEVEL
+
+
+class DocumentSession:
+    """
+    An open PDF: the memory-mapped file and the pdfplumber document parsed from it.
+
+    Args:
+        pdf_path: Path to the PDF file.
+        data: Contents of `pdf_path` if already read into memory; the file is
+            then not opened at all.
+    """
+
+    def __init__(self, pdf_path: str, data: Optional[bytes] = None):
+        import pdfplumber
+
+        self.path = pdf_path
+        self._file = None
+        self._map = None
+        if data is not None:
+            stream = io.BytesIO(data)
+        else:
+            self._file = open(pdf_path, 'rb')
+            try:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                stream = self._map
+            except (ValueError, OSError):
+                stream = self._file  # Empty files and special files cannot be mapped
+        try:
+            self.pdf = pdfplumber.open(stream)
+        except Exception:
+            self._release()
+            raise
+        self._page_count: Optional[int] = None
+        self._page_labels: Optional[Dict[str, int]] = None
+        self._bookmarks: Dict[Optional[int], List[Dict[str, Any]]] = {}
+
+    @property
+    def page_count(self) -> int:
+        """Number of pages, from the page tree root if it states one."""
+        if self._page_count is None:
+            from pdfminer.pdftypes import resolve1
+
+            count = None
+            try:
+                count = resolve1(resolve1(self.pdf.doc.catalog.get('Pages')).get('Count'))
+            except Exception:
+                pass
+            self._page_count = count if isinstance(count, int) and count >= 0 else len(self.pdf.pages)
+        return self._page_count
+
+    @property
+    def page_labels(self) -> Dict[str, int]:
+        """Physical page number of each page label ({} if the document defines none)."""
+        if self._page_labels is None:
+            import itertools
+
+            self._page_labels = {}
+            try:
+                labels = itertools.islice(self.pdf.doc.get_page_labels(), self.page_count)
+                for pg_no, label in enumerate(labels, start=1):
+                    self._page_labels.setdefault(label, pg_no)
+            except Exception:
+                self._page_labels = {}  # No /PageLabels, or a malformed one
+        return self._page_labels
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """The document information dictionary ({} if there is none)."""
+        return self.pdf.metadata or {}
+
+    @property
+    def title(self) -> str:
+        """The metadata title, stripped, or '' if there is none."""
+        title = self.metadata.get('Title')
+        return title.strip() if isinstance(title, str) else ''
+
+    @property
+    def pages(self) -> List[Any]:
+        """The pdfplumber pages."""
+        return self.pdf.pages
+
+    def bookmarks(self, max_level: Optional[int] = MAX_LEVEL) -> List[Dict[str, Any]]:
+        """Return the bookmarks down to `max_level` (None for all) as outline entries."""
+        if max_level not in self._bookmarks:
+            from embedded_outline import outline_from_bookmarks
+
+            self._bookmarks[max_level] = outline_from_bookmarks(self.pdf, max_level=max_level)
+        return self._bookmarks[max_level]
+
+    def _release(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self) -> None:
+        self.pdf.close()
+        self._release()
+
+    def __enter__(self) -> "DocumentSession":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
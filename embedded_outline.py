@@ -0,0 +1,217 @@
+"""
+Outlines the PDF already carries, read without layout analysis.
+
+Born-digital documents usually embed their heading structure either as
+bookmarks (the /Outlines tree) or as a tagged structure tree (/StructTreeRoot
+with H1/H2/H3 elements). Both are plain object-level reads on the pdfminer
+document behind an open pdfplumber PDF, so they cost a fraction of the
+char-level font analysis in main.extract_outline.
+"""
+
+import logging
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from pdfminer.pdfdevice import PDFTextDevice
+from pdfminer.pdfdocument import PDFNoOutlines
+from pdfminer.pdfinterp import PDFPageInterpreter
+from pdfminer.pdffont import PDFUnicodeNotDefined
+from pdfminer.pdftypes import PDFObjRef, resolve1
+from pdfminer.psparser import PSLiteral
+
+logger = logging.getLogger(__name__)
+
+MAX_LEVEL = 3  # The output schema only allows H1-H3
+HEADING_TAGS = {'H1': 1, 'H2': 2, 'H3': 3}
+
+
+def _name(obj: Any) -> Optional[str]:
+    """Return the string value of a PDF name object."""
+    obj = resolve1(obj)
+    if isinstance(obj, PSLiteral):
+        return obj.name if isinstance(obj.name, str) else obj.name.decode('latin-1')
+    return None
+
+
+def _text(obj: Any) -> str:
+    """Decode a PDF text string."""
+    obj = resolve1(obj)
+    if isinstance(obj, bytes):
+        if obj.startswith(b'\xfe\xff'):
+            return obj[2:].decode('utf-16-be', 'ignore')
+        return obj.decode('latin-1')
+    return obj if isinstance(obj, str) else ''
+
+
+def page_numbers(pdf) -> Dict[int, int]:
+    """Map each page's object id to its 1-based page number."""
+    return {page.page_obj.pageid: page.page_number for page in pdf.pages}
+
+
+def _dest_page(doc, dest: Any, page_ids: Dict[int, int]) -> Optional[int]:
+    """Resolve an explicit or named destination to a 1-based page number."""
+    dest = resolve1(dest)
+    if isinstance(dest, (str, bytes, PSLiteral)):
+        name = dest.name if isinstance(dest, PSLiteral) else dest
+        try:
+            dest = resolve1(doc.get_dest(name))
+        except Exception:
+            return None
+    if isinstance(dest, dict):
+        dest = resolve1(dest.get('D'))
+    if isinstance(dest, list) and dest:
+        target = dest[0]
+        if isinstance(target, PDFObjRef):
+            return page_ids.get(target.objid)
+        if isinstance(target, int):
+            return target + 1
+    return None
+
+
+def outline_from_bookmarks(pdf, max_level: Optional[int] = MAX_LEVEL) -> List[Dict[str, Any]]:
+    """Return the document's bookmarks down to `max_level` (None for all) as outline entries."""
+    try:
+        entries = list(pdf.doc.get_outlines())
+    except PDFNoOutlines:
+        return []
+    except Exception as e:
+        logger.warning(f"Could not read bookmarks: {str(e)}")
+        return []
+
+    if not entries:
+        return []
+
+    page_ids = page_numbers(pdf)
+    outline = []
+    for level, title, dest, action, _ in entries:
+        if max_level is not None and level > max_level:
+            continue
+        if dest is None and action is not None:
+            action = resolve1(action)
+            if isinstance(action, dict) and _name(action.get('S')) == 'GoTo':
+                dest = action.get('D')
+        page = _dest_page(pdf.doc, dest, page_ids)
+        text = (title or '').strip()
+        if page is None or not text:
+            continue
+        outline.append({'level': f'H{level}', 'text': text, 'page': page})
+    return outline
+
+
+class _MarkedContentCollector(PDFTextDevice):
+    """Device that gathers the text of each marked-content id (MCID) on a page."""
+
+    def __init__(self, rsrcmgr):
+        super().__init__(rsrcmgr)
+        self._stack: List[Optional[int]] = []
+        self.text: Dict[int, List[str]] = defaultdict(list)
+
+    def begin_tag(self, tag, props=None) -> None:
+        mcid = props.get('MCID') if isinstance(props, dict) else None
+        self._stack.append(mcid if isinstance(mcid, int) else None)
+
+    def end_tag(self) -> None:
+        if self._stack:
+            self._stack.pop()
+
+    def render_char(self, matrix, font, fontsize, scaling, rise, cid, ncs, graphicstate) -> float:
+        mcid = next((m for m in reversed(self._stack) if m is not None), None)
+        if mcid is not None:
+            try:
+                self.text[mcid].append(font.to_unichr(cid))
+            except PDFUnicodeNotDefined:
+                pass
+        return font.char_width(cid) * fontsize * scaling
+
+
+def _marked_content_text(pdf, page_number: int) -> Dict[int, str]:
+    """Interpret one page's content stream and return the text of each MCID."""
+    page = pdf.pages[page_number - 1]
+    device = _MarkedContentCollector(pdf.rsrcmgr)
+    PDFPageInterpreter(pdf.rsrcmgr, device).process_page(page.page_obj)
+    return {mcid: ''.join(chars) for mcid, chars in device.text.items()}
+
+
+def outline_from_struct_tree(pdf) -> List[Dict[str, Any]]:
+    """Return the H1-H3 elements of the document's tagged structure tree."""
+    try:
+        root = resolve1(pdf.doc.catalog.get('StructTreeRoot'))
+    except Exception as e:
+        logger.warning(f"Could not read structure tree: {str(e)}")
+        return []
+    if not isinstance(root, dict):
+        return []
+
+    role_map = resolve1(root.get('RoleMap')) or {}
+    page_ids = page_numbers(pdf)
+    headings = []  # (level, page, inline text, [mcid, ...])
+
+    def page_of(obj: Any, inherited: Optional[int]) -> Optional[int]:
+        ref = obj.get('Pg')
+        if isinstance(ref, PDFObjRef):
+            return page_ids.get(ref.objid, inherited)
+        return inherited
+
+    def collect_mcids(kids: Any, page: Optional[int], out: List) -> None:
+        kids = resolve1(kids)
+        if isinstance(kids, list):
+            for kid in kids:
+                collect_mcids(kid, page, out)
+        elif isinstance(kids, int):
+            out.append((page, kids))
+        elif isinstance(kids, dict):
+            kid_page = page_of(kids, page)
+            if 'MCID' in kids:
+                out.append((kid_page, resolve1(kids['MCID'])))
+            elif 'K' in kids:
+                collect_mcids(kids['K'], kid_page, out)
+
+    def walk(node: Any, page: Optional[int], depth: int = 0) -> None:
+        node = resolve1(node)
+        if depth > 64:
+            return
+        if isinstance(node, list):
+            for kid in node:
+                walk(kid, page, depth + 1)
+            return
+        if not isinstance(node, dict):
+            return
+
+        page = page_of(node, page)
+        tag = _name(node.get('S'))
+        if tag in role_map:
+            tag = _name(role_map[tag]) or tag
+        if tag in HEADING_TAGS:
+            text = _text(node.get('ActualText')) or _text(node.get('Alt')) or _text(node.get('T'))
+            mcids: List = []
+            if not text.strip():
+                collect_mcids(node.get('K'), page, mcids)
+            headings.append((HEADING_TAGS[tag], page, text, mcids))
+            return
+        if 'K' in node:
+            walk(node['K'], page, depth + 1)
+
+    walk(root.get('K'), None)
+    if not headings:
+        return []
+
+    # Interpret only the pages whose headings need their marked content
+    needed_pages = {pg for _, _, _, mcids in headings for pg, _ in mcids if pg}
+    page_text = {}
+    for pg in sorted(needed_pages):
+        try:
+            page_text[pg] = _marked_content_text(pdf, pg)
+        except Exception as e:
+            logger.warning(f"Could not read marked content on page {pg}: {str(e)}")
+            page_text[pg] = {}
+
+    outline = []
+    for level, page, text, mcids in headings:
+        if mcids:
+            text = ''.join(page_text.get(pg, {}).get(mcid, '') for pg, mcid in mcids)
+            page = page or next((pg for pg, _ in mcids if pg), None)
+        text = ' '.join(text.split())
+        if page is None or not text:
+            continue
+        outline.append({'level': f'H{level}', 'text': text, 'page': page})
+    return outline
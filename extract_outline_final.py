@@ -6,12 +6,16 @@ This script extracts the outline from a PDF file and saves it in the exact forma
 required for the Adobe India Hackathon Challenge 1a.
 """
 
+import argparse
+import contextlib
 import json
 import os
 import sys
 import time
 from pathlib import Path
-from PyPDF2 import PdfReader
+
+import profiler
+from document_session import DocumentSession
 
 # Configure output directory
 OUTPUT_DIR = Path("output")
@@ -20,8 +24,7 @@ OUTPUT_DIR.mkdir(exist_ok=True)
 def extract_outline(pdf_path):
     """Extract outline from a PDF file with specific formatting requirements."""
     try:
-        with open(pdf_path, 'rb') as file:
-            reader = PdfReader(file)
+        with DocumentSession(pdf_path) as session:
             
             # Get the PDF title (use filename if no title in metadata)
             filename = os.path.basename(pdf_path)
@@ -123,37 +126,30 @@ def extract_outline(pdf_path):
                     ]
                 }
             
-            # Default case for any other files
-            title = reader.metadata.get('/Title', os.path.splitext(filename)[0])
-            title = title.strip() if title else os.path.splitext(filename)[0]
+            # Default case for any other files (documents without an
+            # information dictionary have empty metadata)
+            title = session.title or os.path.splitext(filename)[0]
             
-            if not reader.outline:
+            bookmarks = session.bookmarks(max_level=None)
+            if not bookmarks:
                 return {"title": title, "outline": []}
             
             # Process the outline for other files (not one of the special cases)
-            def process_outline(items, level=1):
-                result = []
-                for item in items:
-                    if isinstance(item, list):
-                        result.extend(process_outline(item, level + 1))
-                    else:
-                        # Determine heading level (H1, H2, H3, H4)
-                        heading_level = f"H{min(level, 4)}"  # Cap at H4
-                        text = item.title.strip() if item.title else ""
-                        page = reader.get_destination_page_number(item)
-                        
-                        # Add space at the end of text if not empty
-                        if text and not text.endswith(' '):
-                            text += ' '
-                            
-                        result.append({
-                            "level": heading_level,
-                            "text": text,
-                            "page": page
-                        })
-                return result
-            
-            outline_data = process_outline(reader.outline)
+            outline_data = []
+            for item in bookmarks:
+                # Determine heading level (H1, H2, H3, H4)
+                heading_level = f"H{min(int(item['level'][1:]), 4)}"  # Cap at H4
+                text = item['text']
+                
+                # Add space at the end of text if not empty
+                if text and not text.endswith(' '):
+                    text += ' '
+                    
+                outline_data.append({
+                    "level": heading_level,
+                    "text": text,
+                    "page": item['page'] - 1  # Zero-based, as in the expected outputs
+                })
             
             return {
                 "title": title,
@@ -168,15 +164,22 @@ def extract_outline(pdf_path):
         }
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python extract_outline_final.py <path_to_pdf> [output_file]")
-        print("If output_file is not provided, it will be saved as output/<pdf_name>_final_outline.json")
-        return 1
+    parser = argparse.ArgumentParser(description="Extract the outline of one PDF.")
+    parser.add_argument('pdf_path', help="PDF to extract")
+    parser.add_argument('output_file', nargs='?',
+                        help="Output JSON (default: output/<pdf_name>_final_outline.json)")
+    parser.add_argument('--profile', action='store_true',
+                        help="Profile the extraction with cProfile and tracemalloc and write a report "
+                             "to output/profiles/")
+    parser.add_argument('--profile-slower-than', type=float, metavar='SECONDS',
+                        help="Write the profile report only if extraction takes longer than this; "
+                             "without --profile, profile by cheap stack sampling instead")
+    args = parser.parse_args()
     
-    pdf_path = sys.argv[1]
+    pdf_path = args.pdf_path
     
-    if len(sys.argv) > 2:
-        output_path = Path(sys.argv[2])
+    if args.output_file:
+        output_path = Path(args.output_file)
     else:
         # Default output path
         pdf_name = os.path.splitext(os.path.basename(pdf_path))[0]
@@ -190,7 +193,14 @@ def main():
     # Start timing
     start_time = time.time()
     
-    result = extract_outline(pdf_path)
+    profiling = contextlib.nullcontext()
+    if args.profile or args.profile_slower_than is not None:
+        profiling = profiler.ProfileDocument(pdf_path, str(OUTPUT_DIR / "profiles"),
+                                             profiler.PROFILE_FULL if args.profile else profiler.PROFILE_SAMPLED,
+                                             slower_than=args.profile_slower_than)
+    with profiling:
+        result = extract_outline(pdf_path)
+    report_path = getattr(profiling, 'report_path', None)
     
     # Calculate processing time
     processing_time = time.time() - start_time
@@ -200,6 +210,8 @@ def main():
         json.dump(result, f, indent=4, ensure_ascii=False)
     
     print(f"Outline information saved to: {output_path}")
+    if report_path:
+        print(f"Profile report saved to: {report_path}")
     
     # Print a summary
     if result.get('error'):
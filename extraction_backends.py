@@ -0,0 +1,119 @@
+"""
+Extraction backends: where the glyphs of a page come from.
+
+The font-size heuristic only needs four things per glyph: its text, font
+size, left edge and top edge. A backend returns them for one page as a
+PageGlyphs record of parallel lists.
+
+    pdfplumber  The reference. Reads `page.chars`, for which pdfplumber has
+                pdfminer build an LTChar object per glyph and then copies it
+                into a dict of some twenty keys.
+    pdfminer    Runs pdfminer's interpreter on the page with a device that
+                computes the same four values, with the same arithmetic as
+                LTChar and pdfplumber, and appends them straight to the
+                lists. No layout objects or dicts are created, and paths and
+                images are ignored.
+
+Both give identical records, so results do not depend on the backend.
+"""
+
+from typing import Dict, List, NamedTuple
+
+from pdfminer.pdfdevice import PDFTextDevice
+from pdfminer.pdffont import PDFUnicodeNotDefined
+from pdfminer.pdfinterp import PDFPageInterpreter
+
+DEFAULT_BACKEND = 'pdfplumber'
+
+
+class PageGlyphs(NamedTuple):
+    """The glyphs of one page in content-stream order, as parallel lists."""
+    top: List[float]
+    x0: List[float]
+    size: List[float]
+    text: List[str]
+
+
+class PdfplumberBackend:
+    """Glyphs from pdfplumber's `page.chars` (the reference backend)."""
+
+    name = 'pdfplumber'
+
+    def page_glyphs(self, page) -> PageGlyphs:
+        chars = page.chars
+        return PageGlyphs(
+            [c['top'] for c in chars],
+            [c['x0'] for c in chars],
+            [c['size'] for c in chars],
+            [c['text'] for c in chars],
+        )
+
+
+class _GlyphCollector(PDFTextDevice):
+    """Device that records the top, x0, size and text of every glyph drawn."""
+
+    def __init__(self, rsrcmgr, page_height: float):
+        super().__init__(rsrcmgr)
+        self.page_height = page_height
+        self.glyphs = PageGlyphs([], [], [], [])
+
+    def render_char(self, matrix, font, fontsize, scaling, rise, cid, ncs, graphicstate) -> float:
+        # Mirrors PDFLayoutAnalyzer.render_char and LTChar.__init__ (pdfminer)
+        # followed by pdfplumber's Page.process_object
+        try:
+            text = font.to_unichr(cid)
+        except PDFUnicodeNotDefined:
+            text = '(cid:%d)' % cid
+        adv = font.char_width(cid) * fontsize * scaling
+        if font.is_vertical():
+            vx, vy = font.char_disp(cid)
+            vx = fontsize * 0.5 if vx is None else vx * fontsize * 0.001
+            vy = (1000 - vy) * fontsize * 0.001
+            lower_left = (-vx, vy + rise + adv)
+            upper_right = (-vx + fontsize, vy + rise)
+        else:
+            descent = font.get_descent() * fontsize
+            lower_left = (0, descent + rise)
+            upper_right = (adv, descent + rise + fontsize)
+        a, b, c, d, e, f = matrix
+        x0 = a * lower_left[0] + c * lower_left[1] + e
+        y0 = b * lower_left[0] + d * lower_left[1] + f
+        x1 = a * upper_right[0] + c * upper_right[1] + e
+        y1 = b * upper_right[0] + d * upper_right[1] + f
+        if x1 < x0:
+            x0, x1 = x1, x0
+        if y1 < y0:
+            y0, y1 = y1, y0
+
+        glyphs = self.glyphs
+        glyphs.top.append(self.page_height - y1)
+        glyphs.x0.append(x0)
+        glyphs.size.append(x1 - x0 if font.is_vertical() else y1 - y0)
+        glyphs.text.append(text)
+        return adv
+
+
+class PdfminerBackend:
+    """Glyphs straight from pdfminer's interpreter, without layout objects."""
+
+    name = 'pdfminer'
+
+    def page_glyphs(self, page) -> PageGlyphs:
+        rsrcmgr = page.pdf.rsrcmgr
+        device = _GlyphCollector(rsrcmgr, page.height)
+        PDFPageInterpreter(rsrcmgr, device).process_page(page.page_obj)
+        return device.glyphs
+
+
+BACKENDS: Dict[str, object] = {
+    PdfplumberBackend.name: PdfplumberBackend(),
+    PdfminerBackend.name: PdfminerBackend(),
+}
+
+
+def get_backend(name: str):
+    """Return the backend registered as `name`."""
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown extraction backend {name!r}; choose from {sorted(BACKENDS)}") from None
@@ -0,0 +1,149 @@
+"""
+Streaming font-size statistics for heading detection.
+
+FontSizeModel keeps a histogram of line font sizes weighted by how many
+characters were set in each size. It is updated page by page, so its memory
+depends only on the number of distinct sizes in a document, not its length.
+Heading levels come from an exact 1-D k-means clustering of that histogram
+(dynamic programming over the sorted sizes), so a size used for a handful of
+characters cannot claim a level of its own at the expense of the sizes the
+document actually uses. The histogram is split into one group more than there
+are levels, and the heaviest group is the body text: it and anything smaller
+(footnotes, captions) never become a heading level. Callers that scale the
+heading sizes down for tolerance clamp the result to body_ceiling(), so a
+heading group within that tolerance of the body size cannot pull body lines
+in with it.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+SIZE_PRECISION = 1  # Decimal places sizes are bucketed to
+
+
+class FontSizeModel:
+    """Character-weighted histogram of font sizes."""
+
+    def __init__(self):
+        self.histogram: Dict[float, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.histogram)
+
+    def add(self, size: float, weight: int = 1) -> None:
+        """Record `weight` characters set in `size`."""
+        key = round(size, SIZE_PRECISION)
+        self.histogram[key] = self.histogram.get(key, 0) + weight
+
+    def add_lines(self, lines: Iterable[Tuple[float, int]]) -> None:
+        """Record (size, character count) pairs, e.g. the lines of one page."""
+        for size, weight in lines:
+            self.add(size, weight)
+
+    def merge(self, other: "FontSizeModel") -> None:
+        """Fold another model's counts into this one."""
+        for size, weight in other.histogram.items():
+            self.histogram[size] = self.histogram.get(size, 0) + weight
+
+    def representative_sizes(self, k: int = 4) -> List[float]:
+        """
+        Return one size for each of up to `k` groups set larger than the body text.
+
+        The histogram is clustered into k + 1 groups; the group holding the
+        most characters is the body text, and it and every group below it are
+        dropped. Each remaining group is represented by its character-weighted
+        median size. The result is sorted largest first and padded with the
+        smallest size to `k` entries; it is empty when no size is larger than
+        the body text's, and for an empty model.
+        """
+        if not self.histogram:
+            return []
+
+        sizes, weights, clusters, body = self._split(k)
+        headings = [_weighted_median(sizes[i:j], weights[i:j]) for i, j in clusters[body + 1:]][::-1]
+        return headings + headings[-1:] * (k - len(headings))
+
+    def modal_ceiling(self) -> Optional[float]:
+        """Return a size just above the size set in the most characters, or None for an empty model."""
+        if not self.histogram:
+            return None
+        return max(self.histogram, key=self.histogram.__getitem__) + 0.5 * 10 ** -SIZE_PRECISION
+
+    def body_ceiling(self, k: int = 4) -> Optional[float]:
+        """
+        Return the size a line must reach to be above the body text, or None for an empty model.
+
+        This is half a bucket above the largest size in the body text group
+        of representative_sizes(k), so every line bucketed into that group
+        stays below it.
+        """
+        if not self.histogram:
+            return None
+        sizes, _, clusters, body = self._split(k)
+        return sizes[clusters[body][1] - 1] + 0.5 * 10 ** -SIZE_PRECISION
+
+    def _split(self, k: int) -> Tuple[List[float], List[int], List[Tuple[int, int]], int]:
+        """Return the sorted sizes, their weights, their k + 1 groups and the index of the body text group."""
+        sizes = sorted(self.histogram)
+        weights = [self.histogram[s] for s in sizes]
+        clusters = _optimal_clusters(sizes, weights, k + 1)
+        body = max(range(len(clusters)), key=lambda c: sum(weights[clusters[c][0]:clusters[c][1]]))
+        return sizes, weights, clusters, body
+
+
+def _optimal_clusters(sizes: List[float], weights: List[int], k: int) -> List[Tuple[int, int]]:
+    """
+    Split sorted `sizes` into `k` contiguous groups minimising the weighted
+    within-group sum of squares; return the groups as (start, end) slices.
+
+    With `k` or fewer sizes, every size is a group of its own.
+    """
+    m = len(sizes)
+    if m <= k:
+        return [(i, i + 1) for i in range(m)]
+    # Prefix sums of w, w*x and w*x^2 give each group's cost in O(1)
+    w_sum = [0.0] * (m + 1)
+    wx_sum = [0.0] * (m + 1)
+    wxx_sum = [0.0] * (m + 1)
+    for i, (x, w) in enumerate(zip(sizes, weights)):
+        w_sum[i + 1] = w_sum[i] + w
+        wx_sum[i + 1] = wx_sum[i] + w * x
+        wxx_sum[i + 1] = wxx_sum[i] + w * x * x
+
+    def cost(i: int, j: int) -> float:
+        w = w_sum[j] - w_sum[i]
+        wx = wx_sum[j] - wx_sum[i]
+        return (wxx_sum[j] - wxx_sum[i]) - wx * wx / w
+
+    # best[c][j]: minimal cost of the first j sizes in c + 1 groups
+    best = [[cost(0, j) if j else 0.0 for j in range(m + 1)]]
+    split = [[0] * (m + 1)]
+    for c in range(1, k):
+        row = [float('inf')] * (m + 1)
+        row_split = [0] * (m + 1)
+        for j in range(c + 1, m + 1):
+            for i in range(c, j):
+                candidate = best[c - 1][i] + cost(i, j)
+                if candidate < row[j]:
+                    row[j] = candidate
+                    row_split[j] = i
+        best.append(row)
+        split.append(row_split)
+
+    clusters = []
+    end = m
+    for c in range(k - 1, -1, -1):
+        start = split[c][end] if c else 0
+        clusters.append((start, end))
+        end = start
+    return clusters[::-1]
+
+
+def _weighted_median(sizes: List[float], weights: List[int]) -> float:
+    """Return the size at which the cumulative weight reaches half the total."""
+    half = sum(weights) / 2
+    running = 0
+    for size, weight in zip(sizes, weights):
+        running += weight
+        if running >= half:
+            return size
+    return sizes[-1]
@@ -0,0 +1,134 @@
+"""
+Overlap input and output file I/O with extraction.
+
+prefetch() reads upcoming input files into memory on a background thread,
+a bounded number of files ahead of the consumer, so reading from a slow or
+network-mounted input directory happens while earlier documents are being
+parsed. ResultWriter takes finished results and writes them on a background
+thread in submission order, optionally appending each one to a combined JSON
+Lines file, so serialisation and output latency stay off the path that feeds
+the workers.
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_DEPTH = 4        # Files read ahead of the consumer
+PREFETCH_MAX_MB = 64      # Larger files are left for the worker to read itself
+WRITE_QUEUE_SIZE = 64     # Results waiting to be written before submit() blocks
+
+_DONE = object()
+
+
+def prefetch(paths: Iterable[str], depth: int = PREFETCH_DEPTH,
+             max_bytes: int = PREFETCH_MAX_MB * 1024 * 1024) -> Iterator[Tuple[str, Optional[bytes], Optional[str]]]:
+    """
+    Yield (path, contents, error) for each path, reading ahead on a background thread.
+
+    `contents` is None for files larger than `max_bytes` and for files that
+    could not be read; `error` describes the latter.
+    """
+    buffered: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, depth))
+    stop = threading.Event()
+
+    def read_ahead() -> None:
+        for path in paths:
+            if stop.is_set():
+                return
+            data, error = None, None
+            try:
+                if os.path.getsize(path) <= max_bytes:
+                    with open(path, 'rb') as f:
+                        data = f.read()
+            except OSError as e:
+                error = str(e)
+            buffered.put((path, data, error))
+        buffered.put(_DONE)
+
+    reader = threading.Thread(target=read_ahead, name='prefetch', daemon=True)
+    reader.start()
+    try:
+        while True:
+            item = buffered.get()
+            if item is _DONE:
+                break
+            yield item
+    finally:
+        stop.set()
+        # Unblock a reader waiting on a full queue so it can see `stop`
+        while reader.is_alive():
+            try:
+                buffered.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+
+class ResultWriter:
+    """
+    Write results through `save`, optionally appending them to a JSON Lines file.
+
+    Args:
+        save: Called as save(result, filename) to write one document's output.
+        jsonl_path: Combined file receiving one {"file": ..., "title": ...,
+            "outline": [...]} line per document (default: none).
+        background: Write on a background thread; otherwise submit() writes
+            before returning.
+    """
+
+    def __init__(self, save: Callable[[Dict[str, Any], str], Any], jsonl_path: Optional[str] = None,
+                 background: bool = True):
+        self.save = save
+        self.errors: Dict[str, str] = {}
+        self._jsonl = open(jsonl_path, 'w', encoding='utf-8') if jsonl_path else None
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        self._thread = None
+        if background:
+            self._thread = threading.Thread(target=self._drain, name='result-writer', daemon=True)
+            self._thread.start()
+
+    def submit(self, filename: str, result: Dict[str, Any]) -> None:
+        """Write `result` as the output of input file `filename`."""
+        if self._thread is None:
+            self._write(filename, result)
+        else:
+            self._queue.put((filename, result))
+
+    def _write(self, filename: str, result: Dict[str, Any]) -> None:
+        try:
+            self.save(result, filename)
+            if self._jsonl is not None:
+                record = {'file': filename, **result}
+                self._jsonl.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+        except Exception as e:
+            logger.error(f"Failed to write output for {filename}: {str(e)}")
+            self.errors[filename] = str(e)
+
+    def _drain(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _DONE:
+                return
+            self._write(*item)
+
+    def close(self) -> Dict[str, str]:
+        """Finish pending writes; return {filename: error} for writes that failed."""
+        if self._thread is not None:
+            self._queue.put(_DONE)
+            self._thread.join()
+            self._thread = None
+        if self._jsonl is not None:
+            self._jsonl.close()
+            self._jsonl = None
+        return self.errors
+
+    def __enter__(self) -> "ResultWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
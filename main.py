@@ -1,23 +1,47 @@
+import argparse
+import contextlib
+import functools
+import importlib
+import itertools
 import json
 import os
-import pdfplumber
 import logging
 import time
 from collections import defaultdict
-from typing import Dict, List, Any, Optional, Tuple
-from jsonschema import validate, ValidationError
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('pdf_processor.log')
-    ]
-)
+from typing import Callable, Dict, Iterable, Iterator, List, Any, Optional, Tuple
+
+import async_logging
+import batch
+import batch_scheduler
+import cache
+import profiler
+from font_model import FontSizeModel
+from io_pipeline import ResultWriter, prefetch
+from page_buffer import MemoryPageBuffer, PageLines, SpillPageBuffer
+from page_classifier import PAGE_TEXT, classify_page
+from metrics import CounterMetrics, Metrics, NULL_METRICS, write_metrics
+from page_scheduler import HEAD_PAGES, PageScheduler, content_size
+from schema_validator import compile_schema
+
+# pdfplumber, pdfminer and numpy take most of the start-up time, so they are
+# imported where first used; preload_extraction_modules() imports them up
+# front when documents are about to be processed.
+EXTRACTION_MODULES = ('numpy', 'pdfplumber', 'embedded_outline', 'extraction_backends')
+
 logger = logging.getLogger(__name__)
 
+def configure_logging() -> None:
+    """
+    Log to stderr and pdf_processor.log through a background writer (see
+    async_logging.py). Only done when run as a program, not on import.
+    """
+    async_logging.configure()
+
+def preload_extraction_modules() -> None:
+    """Import the extraction libraries now, so processes forked afterwards start warm."""
+    for name in EXTRACTION_MODULES:
+        importlib.import_module(name)
+
 # Define the output schema
 OUTPUT_SCHEMA = {
     "type": "object",
@@ -39,215 +63,1117 @@ OUTPUT_SCHEMA = {
     }
 }
 
+# Bump whenever a change alters extraction results, so cached results are not reused
+EXTRACTOR_VERSION = '5'
+
+# Sources an outline can come from, cheapest first
+TIER_BOOKMARKS = 'bookmarks'
+TIER_STRUCT_TREE = 'struct_tree'
+TIER_TOC = 'toc'
+TIER_FONT_SIZE = 'font_size'
+
+# Counters that mark a result as partial: it is written, but never cached
+INCOMPLETE_COUNTERS = ('pages_skipped_timeout', 'page_errors', 'shard_errors')
+
+SHARD_MIN_PAGES = 100   # Documents shorter than this are never sharded
+SPILL_MIN_PAGES = 200   # Documents this long buffer page lines on disk between passes
+PAGE_CACHE_SUBDIR = 'pages'  # Page cache location inside --cache-dir
+PROFILE_SUBDIR = 'profiles'  # Profile report location inside the output directory
+DEFAULT_BACKEND = 'pdfplumber'  # See extraction_backends.py
+LINE_Y_TOLERANCE = 1.0  # Glyph tops closer than this (points) are on the same line
+MIN_PAGE_TEXT = 10      # Pages with no more text than this go through the fallback extractors
+PAGE_TIME_BUDGET = 9    # Seconds of page processing before unread pages are skipped
+
+_check_output = compile_schema(OUTPUT_SCHEMA)
+
 def validate_output(output_data: Dict[str, Any]) -> bool:
     """Validate output against schema."""
-    try:
-        validate(instance=output_data, schema=OUTPUT_SCHEMA)
-        return True
-    except ValidationError as e:
-        logger.error(f"Output validation failed: {e.message}")
+    error = _check_output(output_data)
+    if error:
+        logger.error(f"Output validation failed: {error}")
         return False
+    return True
+
+def embedded_outline_tiers() -> Tuple[Tuple[str, Any], ...]:
+    """Return the (tier, reader) pairs tried before the font-size heuristic, in order; readers take a DocumentSession."""
+    from embedded_outline import outline_from_struct_tree
+    return (
+        (TIER_BOOKMARKS, lambda session: session.bookmarks()),
+        (TIER_STRUCT_TREE, lambda session: outline_from_struct_tree(session.pdf)),
+    )
 
 def cluster_font_sizes(sizes: List[float], k: int = 4) -> List[float]:
-    """Cluster font sizes into k groups and return representative sizes."""
-    if not sizes:
+    """Cluster font sizes and return up to k sizes larger than the body text's (see FontSizeModel)."""
+    model = FontSizeModel()
+    for size in sizes:
+        model.add(size)
+    return model.representative_sizes(k)
+
+def group_lines(glyphs, y_tolerance: float = LINE_Y_TOLERANCE,
+                min_size: Optional[float] = None, left_edges: bool = False,
+                text_min_size: Optional[float] = None) -> List[Tuple[Any, ...]]:
+    """
+    Assemble glyphs into lines and return (text, average font size, glyph count) per line.
+    
+    `glyphs` is an extraction_backends.PageGlyphs record. Glyphs are sorted by `top`, and a new line starts wherever the gap to the
+    previous glyph exceeds `y_tolerance`. Within a line glyphs are ordered by
+    `x0`. Lines are returned in the order their first glyph appears on the page.
+    
+    With `min_size`, lines averaging a smaller size are dropped once the line
+    boundaries and sizes are known, and only the glyphs of the remaining lines
+    are gathered into text. With `left_edges`, each line also carries the
+    smallest `x0` of its glyphs as a fourth element.
+    
+    With `text_min_size`, lines averaging a smaller size are still returned
+    for their size and glyph count, but with None as text and without their
+    glyphs being gathered; the first non-blank line of the page always gets
+    its text. Lines of blank glyphs only are then left out, as callers would
+    drop them once stripped.
+    """
+    import numpy as np
+    
+    n = len(glyphs.text)
+    if not n:
+        return []
+    top = np.array(glyphs.top, dtype=float)
+    x0 = np.array(glyphs.x0, dtype=float)
+    size = np.array(glyphs.size, dtype=float)
+    
+    # Assign line ids by splitting the top-sorted glyphs at vertical gaps
+    by_top = np.argsort(top, kind='stable')
+    starts_line = np.empty(n, dtype=bool)
+    starts_line[0] = False
+    starts_line[1:] = np.diff(top[by_top]) > y_tolerance
+    line_id = np.empty(n, dtype=np.intp)
+    line_id[by_top] = np.cumsum(starts_line)
+    
+    counts = np.bincount(line_id)
+    avg_sizes = np.bincount(line_id, weights=size) / counts
+    first_glyph = np.full(len(counts), n, dtype=np.intp)
+    np.minimum.at(first_glyph, line_id, np.arange(n))
+    
+    if left_edges:
+        lefts = np.full(len(counts), np.inf)
+        np.minimum.at(lefts, line_id, x0)
+    
+    kept = np.ones(len(counts), dtype=bool) if min_size is None else avg_sizes >= min_size
+    if not kept.any():
         return []
     
-    unique_sizes = sorted(set(sizes), reverse=True)
+    glyph_text = glyphs.text
+    in_page_order = np.argsort(first_glyph, kind='stable')
+    joined = kept
+    if text_min_size is not None:
+        non_blank = np.bincount(line_id, weights=np.fromiter((bool(t.strip()) for t in glyph_text), float, n),
+                                minlength=len(counts)) > 0
+        kept = kept & non_blank
+        joined = kept & (avg_sizes >= text_min_size)
+        first_line = next((line for line in in_page_order if kept[line]), None)
+        if first_line is not None:
+            joined[first_line] = True
+    
+    # Text of the joined glyphs in line order, left to right within each line
+    order = np.lexsort((x0, line_id))
+    if min_size is not None or text_min_size is not None:
+        order = order[joined[line_id[order]]]
+    texts = [glyph_text[i] for i in order.tolist()]
+    ends = np.cumsum(np.where(joined, counts, 0))
+    
+    lines = []
+    for line in in_page_order:
+        if not kept[line]:
+            continue
+        end = ends[line]
+        text = ''.join(texts[end - counts[line]:end]) if joined[line] else None
+        record = (text, float(avg_sizes[line]), int(counts[line]))
+        lines.append(record + (float(lefts[line]),) if left_edges else record)
+    return lines
+
+def _has_enough_text(texts: List[str], minimum: int = MIN_PAGE_TEXT) -> bool:
+    """
+    Return True if the glyphs alone prove extract_text() would give more than `minimum` characters.
+    
+    extract_text() keeps every non-blank glyph, so their stripped text is a
+    lower bound on the length of its result. A False answer is inconclusive.
+    """
+    total = 0
+    for text in texts:
+        total += len(text.strip())
+        if total > minimum:
+            return True
+    return False
+
+def extract_page_lines(page, pg_no: int, metrics: Metrics = NULL_METRICS,
+                       min_size: Optional[float] = None,
+                       backend: str = DEFAULT_BACKEND,
+                       text_min_size: Optional[float] = None) -> List[Tuple[Optional[str], float, int]]:
+    """
+    Return the (text, font size, glyph count) lines of one page.
+    
+    Lines recovered without character information get the default size and a
+    glyph count of 0, so they do not contribute to the font statistics. With
+    `min_size`, only lines averaging at least that size are assembled and
+    returned. With `text_min_size`, lines built from glyphs that average less
+    carry None as text (see group_lines). Glyphs come from the named extraction backend; the fallbacks
+    for pages with little text always use pdfplumber.
+    """
+    from extraction_backends import get_backend
+    
+    lines = []
+    
+    with metrics.stage('chars'):
+        glyphs = get_backend(backend).page_glyphs(page)
+    if _has_enough_text(glyphs.text):
+        # Lines come from the glyphs; extract_text() would only confirm there are enough
+        with metrics.stage('group_lines'):
+            grouped = group_lines(glyphs, min_size=min_size, text_min_size=text_min_size)
+        metrics.incr('chars', len(glyphs.text))
+        metrics.incr('extract_text_skipped')
+        return [(line_text and line_text.strip(), avg_size, glyph_count)
+                for line_text, avg_size, glyph_count in grouped if line_text is None or line_text.strip()]
+    
+    # Try to extract text with different methods if needed
+    with metrics.stage('extract_text'):
+        text = page.extract_text()
+    
+    if not text or len(text.strip()) < MIN_PAGE_TEXT:  # If no text or very little text
+        logger.warning(f"Little or no text found on page {pg_no}, trying alternative extraction method")
+        metrics.incr('fallback_triggers')
+        # Try alternative extraction method
+        with metrics.stage('extract_text_tolerant'):
+            text = page.extract_text(x_tolerance=3, y_tolerance=3)
+        
+        # If still no text, try to extract words
+        if not text or len(text.strip()) < MIN_PAGE_TEXT:
+            with metrics.stage('extract_words'):
+                words = page.extract_words(keep_blank_chars=False, x_tolerance=3, y_tolerance=3)
+            if words:
+                text = ' '.join(w['text'] for w in words)
+    
+    # If we have text, process it
+    if text and len(text.strip()) > MIN_PAGE_TEXT:
+        # Get font information
+        metrics.incr('chars', len(glyphs.text))
+        if glyphs.text:
+            with metrics.stage('group_lines'):
+                grouped = group_lines(glyphs, min_size=min_size, text_min_size=text_min_size)
+            for line_text, avg_size, glyph_count in grouped:
+                if line_text is None or line_text.strip():
+                    lines.append((line_text and line_text.strip(), avg_size, glyph_count))
+        else:
+            # Fallback: if no character info, just use the extracted text
+            logger.warning("No character information available, using plain text extraction")
+            metrics.incr('plain_text_fallbacks')
+            for line in text.split('\n'):
+                if line.strip() and (min_size is None or 12 >= min_size):
+                    lines.append((line.strip(), 12, 0))  # Default size
+    
+    return lines
+
+def release_page(page) -> None:
+    """Drop the layout objects pdfplumber caches on a page once it has been read."""
+    page.flush_cache()
+    page.get_textmap.cache_clear()
+
+def classify_pdf_page(page, page_kinds: Optional[Dict[int, str]] = None,
+                      metrics: Metrics = NULL_METRICS) -> str:
+    """Classify a pdfplumber page as text, image-only or blank, remembering the answer in `page_kinds`."""
+    pg_no = page.page_number
+    if page_kinds is not None and pg_no in page_kinds:
+        return page_kinds[pg_no]
+    with metrics.stage('classify_page'):
+        kind = classify_page(page.page_obj)
+    metrics.incr(f'pages_{kind}')
+    if page_kinds is not None:
+        page_kinds[pg_no] = kind
+    return kind
+
+def _cached_page_lines(page, pg_no: int, page_cache: cache.PageCache, seen: Dict[int, bytes],
+                       metrics: Metrics = NULL_METRICS, min_size: Optional[float] = None,
+                       backend: str = DEFAULT_BACKEND) -> Tuple[List[Tuple[str, float, int]], bool]:
+    """
+    extract_page_lines() through `page_cache`; return the lines and whether they were cached.
+    
+    Pages are always extracted and cached in full, and `min_size` is applied
+    to the lines afterwards, so one entry serves both passes.
+    """
+    try:
+        with metrics.stage('page_cache_key'):
+            key = page_cache.key_for_page(page.page_obj, EXTRACTOR_VERSION, seen)
+    except Exception as e:
+        logger.debug(f"Page {pg_no} cannot be cached: {str(e)}")
+        return extract_page_lines(page, pg_no, metrics, min_size, backend), False
+    
+    lines = page_cache.get(key)
+    hit = lines is not None
+    if hit:
+        metrics.incr('page_cache_hits')
+    else:
+        metrics.incr('page_cache_misses')
+        lines = extract_page_lines(page, pg_no, metrics, backend=backend)
+        page_cache.put(key, lines)
+    if min_size is not None:
+        lines = [line for line in lines if line[1] >= min_size]
+    return lines, hit
+
+def iter_page_lines(pdf, deadline: float, page_numbers: Optional[Iterable[int]] = None,
+                    metrics: Metrics = NULL_METRICS,
+                    page_kinds: Optional[Dict[int, str]] = None,
+                    min_size: Optional[float] = None,
+                    page_cache: Optional[cache.PageCache] = None,
+                    backend: str = DEFAULT_BACKEND,
+                    text_min_size: Optional[Callable[[int], Optional[float]]] = None) -> Iterator[PageLines]:
+    """
+    Yield (page number, lines) for the pages of `pdf`, releasing every page after use.
+    
+    With a finite `deadline`, pages come in PageScheduler order (leading
+    pages, table-of-contents pages, then a progressively finer sample of the
+    rest) and pages that cannot finish in time are skipped, so a document that
+    runs out of time is still covered end to end at reduced density. With an
+    infinite deadline, pages come in document order, limited to
+    `page_numbers` if given.
+    
+    Pages whose content streams contain no text are not extracted and yield
+    no lines; their classification is recorded in `page_kinds`. With
+    `min_size`, only lines averaging at least that size are assembled. Pages
+    found in `page_cache` are not extracted at all.
+    
+    `text_min_size`, if given, is called with each page number before the
+    page is extracted; lines averaging less than the size it returns (if
+    any) carry None as text. Cached pages always come with their text.
+    """
+    by_number = {page.page_number: page for page in pdf.pages}
+    scheduler = None
+    if deadline == float('inf'):
+        order = sorted(page_numbers) if page_numbers is not None else list(by_number)
+    else:
+        scheduler = PageScheduler({pg_no: content_size(page.page_obj) for pg_no, page in by_number.items()},
+                                  deadline)
+        order = scheduler
+    seen: Dict[int, bytes] = {}  # Digests of the fonts and forms shared between pages
+    
+    for pg_no in order:
+        page = by_number[pg_no]
+        start = time.perf_counter()
+        cached = False
+        try:
+            if classify_pdf_page(page, page_kinds, metrics) != PAGE_TEXT:
+                lines = []
+            elif page_cache is not None:
+                lines, cached = _cached_page_lines(page, pg_no, page_cache, seen, metrics, min_size, backend)
+            else:
+                lines = extract_page_lines(page, pg_no, metrics, min_size, backend,
+                                           None if text_min_size is None else text_min_size(pg_no))
+        except Exception as e:
+            logger.error(f"Error processing page {pg_no}: {str(e)}")
+            metrics.incr('page_errors')
+            lines = None
+        finally:
+            release_page(page)
+        seconds = time.perf_counter() - start
+        profiler.record_page(pg_no, seconds)
+        if scheduler is not None:
+            # Cached pages say nothing about what extracting a page costs
+            scheduler.record(pg_no, None if cached else seconds,
+                             [line for line in lines or () if line[0] is not None])
+        if lines is None:
+            continue
+        metrics.incr('pages_processed')
+        yield pg_no, lines
+    
+    if scheduler is not None and scheduler.skipped:
+        logger.warning(f"Processing timeout: skipped {scheduler.skipped} of {len(by_number)} pages, "
+                       f"sampled across the document")
+        metrics.incr('pages_skipped_timeout', scheduler.skipped)
+
+def _extract_shard(pdf_path: str, first_page: int, last_page: int, deadline: float,
+                   collect_metrics: bool = False, page_cache: Optional[cache.PageCache] = None,
+                   backend: str = DEFAULT_BACKEND
+                   ) -> Tuple[List[PageLines], Optional[Dict[str, Any]], Dict[int, str]]:
+    """Open `pdf_path` in this process and extract pages first_page..last_page."""
+    import pdfplumber
+    
+    # Counters are always returned: the parent needs them to judge completeness
+    metrics = Metrics() if collect_metrics else CounterMetrics()
+    page_kinds: Dict[int, str] = {}
+    with async_logging.repeat_summary(f"{os.path.basename(pdf_path)} pages {first_page}-{last_page}"), \
+            pdfplumber.open(pdf_path, pages=list(range(first_page, last_page + 1))) as pdf:
+        pages = list(iter_page_lines(pdf, deadline, metrics=metrics, page_kinds=page_kinds,
+                                     page_cache=page_cache, backend=backend))
+    return pages, metrics.as_dict(), page_kinds
+
+def _extract_sharded(pdf_path: str, page_count: int, shards: int, deadline: float,
+                     metrics: Metrics = NULL_METRICS,
+                     page_kinds: Optional[Dict[int, str]] = None,
+                     page_cache: Optional[cache.PageCache] = None,
+                     backend: str = DEFAULT_BACKEND) -> List[PageLines]:
+    """Split the page range across `shards` processes and merge their pages in page order."""
+    from concurrent.futures import ProcessPoolExecutor
+    
+    per_shard = -(-page_count // shards)
+    bounds = [(first, min(first + per_shard - 1, page_count))
+              for first in range(1, page_count + 1, per_shard)]
+    logger.info(f"Splitting {page_count} pages into {len(bounds)} shards")
+    
+    pages = []
+    with ProcessPoolExecutor(max_workers=len(bounds)) as executor:
+        futures = [executor.submit(_extract_shard, pdf_path, first, last, deadline, metrics.enabled, page_cache,
+                                   backend)
+                   for first, last in bounds]
+        # Futures are consumed in submission order, so records stay in page order
+        for (first, last), future in zip(bounds, futures):
+            try:
+                shard_pages, shard_metrics, shard_kinds = future.result()
+            except Exception as e:
+                logger.error(f"Error processing pages {first}-{last}: {str(e)}")
+                metrics.incr('shard_errors')
+                continue
+            pages.extend(shard_pages)
+            if page_kinds is not None:
+                page_kinds.update(shard_kinds)
+            if shard_metrics:
+                metrics.merge(Metrics.from_dict(shard_metrics))
+    
+    return pages
+
+def _toc_outline(session, deadline: float, metrics: Metrics = NULL_METRICS,
+                 backend: str = DEFAULT_BACKEND) -> List[Dict[str, Any]]:
+    """Return the outline confirmed from the printed table of contents, reading only the pages it needs."""
+    from extraction_backends import get_backend
+    from toc_outline import outline_from_toc
+    
+    pages = session.pages
+    read: Dict[int, List[Tuple[str, float, int, float]]] = {}
+    
+    def read_lines(pg_no: int) -> List[Tuple[str, float, int, float]]:
+        if pg_no not in read:
+            page = pages[pg_no - 1]
+            lines = []
+            try:
+                if classify_pdf_page(page, metrics=metrics) == PAGE_TEXT:
+                    glyphs = get_backend(backend).page_glyphs(page)
+                    if glyphs.text:
+                        lines = [(text.strip(), size, count, left)
+                                 for text, size, count, left in group_lines(glyphs, left_edges=True)
+                                 if text.strip()]
+            except Exception as e:
+                logger.error(f"Error processing page {pg_no}: {str(e)}")
+                metrics.incr('page_errors')
+            finally:
+                release_page(page)
+            read[pg_no] = lines
+        return read[pg_no]
+    
+    outline = outline_from_toc(len(pages), read_lines, session.page_labels, deadline)
+    metrics.incr('toc_pages_read', len(read))
+    if outline:
+        logger.info(f"Table of contents: {len(outline)} headings confirmed from {len(read)} of {len(pages)} pages")
+    return outline
+
+def _title_from_first_page(session, backend: str = DEFAULT_BACKEND) -> str:
+    """Return the metadata title, or the largest-font line on the first page."""
+    if session.title:
+        return session.title
+    
+    lines = []
+    try:
+        lines = extract_page_lines(session.pages[0], 1, backend=backend)
+    except Exception as e:
+        logger.warning(f"Could not read title from first page: {str(e)}")
+    if not lines:
+        return ''
+    largest = max(size for _, size, _ in lines)
+    return next(text for text, size, _ in lines if size >= largest * 0.9)
+
+def _make_page_buffer(mode: str, page_count: int):
+    """Return the buffer that carries page lines from the first pass to the second."""
+    if mode == 'reparse':
+        return None
+    if mode == 'spill' or (mode == 'auto' and page_count >= SPILL_MIN_PAGES):
+        return SpillPageBuffer()
+    return MemoryPageBuffer()
+
+def _heading_candidates(pages: Iterable[PageLines],
+                        min_size: float) -> Iterator[Tuple[int, str, float]]:
+    """Yield the (page, text, size) records of lines set in at least `min_size`."""
+    for pg_no, lines in pages:
+        for text, size, _ in lines:
+            if size >= min_size:
+                yield pg_no, text, size
+
+def _font_size_outline(pdf, pdf_path: str, shards: int, deadline: float,
+                       page_buffer: str = 'auto',
+                       metrics: Metrics = NULL_METRICS,
+                       page_cache: Optional[cache.PageCache] = None,
+                       backend: str = DEFAULT_BACKEND) -> Tuple[Dict[str, Any], int]:
+    """
+    Derive title and outline from font sizes; return the result and the number of lines read.
+    
+    The first pass streams pages and only accumulates font statistics. Once
+    the heading thresholds are known, a second pass keeps just the lines large
+    enough to be headings. The second pass reads pages back from `page_buffer`
+    ('memory', 'spill' to a temporary file, or 'auto' to spill long documents).
+    
+    With 'reparse', body text is never assembled or kept. After the leading
+    pages, the first pass gathers text only for lines set larger than the
+    size used most so far (and each page's first line, a title candidate),
+    and keeps only those; the other lines contribute their size and glyph
+    count. The few pages whose text-less lines turn out to reach the heading
+    threshold are extracted again in the second pass, so the outline is the
+    same as with the other buffers.
+    """
+    page_count = len(pdf.pages)
+    page_kinds: Dict[int, str] = {}
+    size_model = FontSizeModel()
+    reparse = False
+    if shards > 1 and page_count >= SHARD_MIN_PAGES:
+        pages = _extract_sharded(pdf_path, page_count, shards, deadline, metrics, page_kinds, page_cache,
+                                 backend)
+        buffer = MemoryPageBuffer()
+    else:
+        buffer = _make_page_buffer(page_buffer, page_count)
+        text_min_size = None
+        if buffer is None:
+            reparse = True
+            buffer = MemoryPageBuffer()  # Holds only the lines that have text
+            # Leading pages are read in full: the scheduler looks for a table of contents there
+            text_min_size = lambda pg_no: None if pg_no <= HEAD_PAGES else size_model.modal_ceiling()
+        pages = iter_page_lines(pdf, deadline, metrics=metrics, page_kinds=page_kinds, page_cache=page_cache,
+                                backend=backend, text_min_size=text_min_size)
+    
+    untexted: Dict[int, float] = {}  # Largest size among each page's lines read without text
+    try:
+        # Pass one: font statistics
+        first_line = None
+        first_line_page = None
+        line_count = 0
+        for pg_no, lines in pages:
+            size_model.add_lines((size, glyph_count) for _, size, glyph_count in lines if glyph_count)
+            # Pages can arrive out of order under a deadline
+            if lines and (first_line_page is None or pg_no < first_line_page):
+                first_line, first_line_page = lines[0][0], pg_no
+            line_count += len(lines)
+            if reparse:
+                texted = [line for line in lines if line[0] is not None]
+                if len(texted) < len(lines):
+                    untexted[pg_no] = max(size for text, size, _ in lines if text is None)
+                lines = texted
+            buffer.append(pg_no, lines)
+        
+        if not line_count:
+            logger.error("No text content found in PDF. The PDF might be a scanned document or use non-standard encoding.")
+            # Try one more time with OCR-like extraction
+            texts: Dict[int, str] = {}
+            if len(page_kinds) < page_count:
+                # Pages were skipped for time: a second pass over every page would overrun the deadline
+                logger.warning(f"Skipping alternative text extraction: only {len(page_kinds)} of "
+                               f"{page_count} pages were read in time")
+            else:
+                try:
+                    logger.info("Attempting alternative text extraction...")
+                    for page in pdf.pages:
+                        if time.time() >= deadline:
+                            logger.warning(f"Processing timeout: alternative text extraction stopped "
+                                           f"before page {page.page_number}")
+                            metrics.incr('pages_skipped_timeout', page_count - page.page_number + 1)
+                            break
+                        # Pages without text objects (scans, blanks) have nothing to find
+                        if classify_pdf_page(page, page_kinds, metrics) == PAGE_TEXT:
+                            texts[page.page_number] = page.extract_text() or ''
+                        release_page(page)
+                except Exception as e:
+                    logger.error(f"Alternative extraction failed: {str(e)}")
+            
+            if len(''.join(texts.values()).strip()) <= 10:
+                return {'title': '', 'outline': []}, 0
+            
+            logger.info("Alternative extraction successful")
+            buffer.close()
+            buffer = MemoryPageBuffer()
+            for pg_no, text in texts.items():
+                lines = [(line.strip(), 12, 0) for line in text.split('\n') if line.strip()]  # Default size
+                if lines:
+                    buffer.append(pg_no, lines)
+                    if first_line is None:
+                        first_line = lines[0][0]
+                    line_count += len(lines)
+        
+        # Cluster font sizes
+        metrics.incr('lines', line_count)
+        with metrics.stage('cluster_font_sizes'):
+            representative_sizes = size_model.representative_sizes(k=4)
+            body_ceiling = size_model.body_ceiling(k=4) or 0.0
+        if not representative_sizes and len(size_model):
+            # Nothing is set larger than the body text, so no line is a heading
+            representative_sizes = [float('inf')]
+        while len(representative_sizes) < 4:
+            representative_sizes.append(representative_sizes[-1] if representative_sizes else 12)
+        
+        # Sizes within 10% of a level still reach it, but body text never reaches any level
+        title_min, h1_min, h2_min, h3_min = (max(size * 0.9, body_ceiling) for size in representative_sizes[:4])
+        
+        # Pass two: keep only lines large enough to be the title or a heading
+        pages = buffer
+        reread = {pg_no for pg_no, size in untexted.items() if size >= h3_min}
+        if reread:
+            # Re-extraction assembles only the lines that can be headings
+            metrics.incr('pages_reread', len(reread))
+            pages = itertools.chain(((pg_no, lines) for pg_no, lines in buffer if pg_no not in reread),
+                                    iter_page_lines(pdf, float('inf'), page_numbers=reread, metrics=metrics,
+                                                    page_kinds=page_kinds, min_size=h3_min,
+                                                    page_cache=page_cache, backend=backend))
+        # Stable sort: page order, keeping the order of lines within a page
+        candidates = sorted(_heading_candidates(pages, h3_min), key=lambda candidate: candidate[0])
+    finally:
+        buffer.close()
     
-    if len(unique_sizes) <= k:
-        return unique_sizes + [unique_sizes[-1]] * (k - len(unique_sizes)) if unique_sizes else []
+    # Extract title (first non-empty line with largest font)
+    title = next((text for _, text, size in candidates if size >= title_min), first_line)
     
-    # Simple binning approach
-    chunk_size = max(1, len(unique_sizes) // k)
-    clusters = []
+    # Build outline
+    outline = []
+    for pg_no, text, font_size in candidates:
+        # Skip title line
+        if text == title:
+            continue
+        
+        level = None
+        if font_size >= h1_min:
+            level = 'H1'
+        elif font_size >= h2_min:
+            level = 'H2'
+        elif font_size >= h3_min:
+            level = 'H3'
+        
+        # Filter out noise
+        if level and len(text) > 2 and not text.isdigit():
+            outline.append({
+                'level': level,
+                'text': text,
+                'page': pg_no
+            })
     
-    for i in range(k):
-        start_idx = i * chunk_size
-        end_idx = (i + 1) * chunk_size if i < k - 1 else len(unique_sizes)
-        cluster = unique_sizes[start_idx:end_idx]
-        if cluster:
-            clusters.append(cluster[len(cluster) // 2])  # Use median as representative
+    result = {
+        'title': title,
+        'outline': outline
+    }
     
-    return sorted(clusters, reverse=True)
+    return result, line_count
 
-def extract_outline(pdf_path: str) -> Dict[str, Any]:
+def extract_outline_with_tier(pdf_path: str, shards: int = 1, tiered: bool = True,
+                              page_buffer: str = 'auto', metrics: Metrics = NULL_METRICS,
+                              page_budget: float = PAGE_TIME_BUDGET,
+                              deadline: Optional[float] = None,
+                              data: Optional[bytes] = None,
+                              session=None,
+                              page_cache: Optional[cache.PageCache] = None,
+                              backend: str = DEFAULT_BACKEND,
+                              toc: bool = False) -> Tuple[Dict[str, Any], Optional[str]]:
     """
     Extract document title and hierarchical outline from PDF.
     
+    Embedded bookmarks are tried first, then the tagged structure tree, then
+    (with `toc`) the printed table of contents; the char-level font-size
+    heuristic only runs when the document has none of them.
+    
+    Args:
+        pdf_path: Path to the PDF file.
+        shards: Number of processes to split the pages of a large document
+            (at least SHARD_MIN_PAGES pages) across.
+        tiered: Try the embedded bookmarks and structure tree before the
+            font-size heuristic.
+        page_buffer: Where page lines wait between the two font-size passes:
+            'memory', 'spill' (temporary file), 'reparse' (extract the pages
+            again) or 'auto' (spill documents of SPILL_MIN_PAGES or more).
+        metrics: Receives per-stage timings and counters.
+        page_budget: Seconds after the start within which pages are read;
+            pages that do not fit are skipped (see iter_page_lines).
+        deadline: time.time() after which no more pages are read, whatever
+            is left of `page_budget` (default: none); set from a batch
+            deadline (see batch_scheduler.py).
+        data: Contents of `pdf_path` if already read into memory; the file
+            is then only reopened by page shards.
+        session: An open DocumentSession for `pdf_path` to extract from
+            instead of opening the file again; it is left open.
+        page_cache: Lines of pages already extracted from this or other
+            documents, keyed by page content.
+        backend: Name of the extraction backend supplying page glyphs
+            (see extraction_backends.py).
+        toc: Look for a printed table of contents and read only the pages
+            its entries point to (see toc_outline.py).
+    
     Returns:
-        dict: {
+        tuple: ({
             'title': str,
             'outline': [{'level': str, 'text': str, 'page': int}, ...]
-        }
+        }, tier) where tier is one of TIER_BOOKMARKS, TIER_STRUCT_TREE,
+        TIER_TOC, TIER_FONT_SIZE, or None if the document could not be processed.
     """
     start_time = time.time()
+    page_deadline = start_time + page_budget
+    if deadline is not None:
+        page_deadline = min(page_deadline, deadline)
     logger.info(f"Processing PDF: {pdf_path}")
+    from document_session import DocumentSession
+    from extraction_backends import get_backend
     
+    get_backend(backend)  # Unknown names fail here, not once per page
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            all_sizes = []
-            lines_data = []
-            
+        if session is None:
+            with metrics.stage('open'):
+                session = owned = DocumentSession(pdf_path, data)
+        else:
+            owned = contextlib.nullcontext()
+        # Per-page warnings are summarised once the document is done
+        with owned, async_logging.repeat_summary(os.path.basename(pdf_path)):
+            pdf = session.pdf
             # Check if PDF is encrypted
             try:
-                if hasattr(pdf, 'stream') and hasattr(pdf.stream, 'encrypted') and pdf.stream.encrypted:
-                    logger.warning("PDF is encrypted, trying to decrypt with empty password")
-                    try:
-                        pdf.stream.decrypt('')
-                    except Exception as e:
-                        logger.error(f"Failed to decrypt PDF: {str(e)}")
-                        return {'title': '', 'outline': []}
+                with metrics.stage('decrypt'):
+                    if hasattr(pdf, 'stream') and hasattr(pdf.stream, 'encrypted') and pdf.stream.encrypted:
+                        logger.warning("PDF is encrypted, trying to decrypt with empty password")
+                        try:
+                            pdf.stream.decrypt('')
+                        except Exception as e:
+                            logger.error(f"Failed to decrypt PDF: {str(e)}")
+                            return {'title': '', 'outline': []}, None
             except Exception as e:
                 logger.warning(f"Could not check PDF encryption status: {str(e)}")
                 # Continue processing anyway
             
-            # Process pages in batches for memory efficiency
-            for pg_no, page in enumerate(pdf.pages, 1):
-                if time.time() - start_time > 9:  # Timeout after 9 seconds
-                    logger.warning(f"Processing timeout after {pg_no} pages")
-                    break
-                    
-                try:
-                    # Try to extract text with different methods if needed
-                    text = page.extract_text()
-                    
-                    if not text or len(text.strip()) < 10:  # If no text or very little text
-                        logger.warning(f"Little or no text found on page {pg_no}, trying alternative extraction method")
-                        # Try alternative extraction method
-                        text = page.extract_text(x_tolerance=3, y_tolerance=3)
-                        
-                        # If still no text, try to extract words
-                        if not text or len(text.strip()) < 10:
-                            words = page.extract_words(keep_blank_chars=False, x_tolerance=3, y_tolerance=3)
-                            if words:
-                                text = ' '.join(w['text'] for w in words)
-                    
-                    # If we have text, process it
-                    if text and len(text.strip()) > 10:
-                        # Get font information
-                        chars = page.chars
-                        if chars:
-                            # Group characters by line
-                            lines = {}
-                            for ch in chars:
-                                y = round(ch['top'], 1)
-                                if y not in lines:
-                                    lines[y] = []
-                                lines[y].append(ch)
-                            
-                            # Process each line
-                            for y, char_group in lines.items():
-                                if not char_group:
-                                    continue
-                                
-                                # Calculate average font size for the line
-                                sizes = [c['size'] for c in char_group if 'size' in c]
-                                if not sizes:
-                                    continue
-                                    
-                                avg_size = sum(sizes) / len(sizes)
-                                line_text = ''.join(c['text'] for c in sorted(char_group, key=lambda x: x['x0']))
-                                
-                                if line_text.strip():
-                                    all_sizes.append(avg_size)
-                                    lines_data.append((pg_no, line_text.strip(), avg_size))
-                        else:
-                            # Fallback: if no character info, just use the extracted text
-                            logger.warning("No character information available, using plain text extraction")
-                            for line in text.split('\n'):
-                                if line.strip():
-                                    lines_data.append((pg_no, line.strip(), 12))  # Default size
-                
-                except Exception as e:
-                    logger.error(f"Error processing page {pg_no}: {str(e)}")
-                    continue
-            
-            if not lines_data:
-                logger.error("No text content found in PDF. The PDF might be a scanned document or use non-standard encoding.")
-                # Try one more time with OCR-like extraction
-                try:
-                    logger.info("Attempting alternative text extraction...")
-                    text = ''
-                    for page in pdf.pages:
-                        text += page.extract_text() or ''
-                    
-                    if text and len(text.strip()) > 10:
-                        logger.info("Alternative extraction successful")
-                        for i, line in enumerate(text.split('\n')):
-                            if line.strip():
-                                lines_data.append((1, line.strip(), 12))  # Default size
-                except Exception as e:
-                    logger.error(f"Alternative extraction failed: {str(e)}")
-                
-                if not lines_data:
-                    return {'title': '', 'outline': []}
-            
-            # Cluster font sizes
-            representative_sizes = cluster_font_sizes(all_sizes, k=4)
-            while len(representative_sizes) < 4:
-                representative_sizes.append(representative_sizes[-1] if representative_sizes else 12)
-                
-            title_font, h1_font, h2_font, h3_font = representative_sizes[:4]
-            
-            # Extract title (first non-empty line with largest font)
-            title = next((text for _, text, size in lines_data if size >= title_font * 0.9), 
-                        lines_data[0][1] if lines_data else "")
+            result = None
+            if tiered:
+                for tier, read_outline in embedded_outline_tiers():
+                    with metrics.stage(tier):
+                        outline = read_outline(session)
+                    if outline:
+                        with metrics.stage('title'):
+                            result = {'title': _title_from_first_page(session, backend), 'outline': outline}
+                        break
             
-            # Build outline
-            outline = []
-            for pg_no, text, font_size in lines_data:
-                # Skip title line
-                if text == title:
-                    continue
-                
-                level = None
-                if font_size >= h1_font * 0.9:
-                    level = 'H1'
-                elif font_size >= h2_font * 0.9:
-                    level = 'H2'
-                elif font_size >= h3_font * 0.9:
-                    level = 'H3'
-                
-                # Filter out noise
-                if level and len(text) > 2 and not text.isdigit():
-                    outline.append({
-                        'level': level,
-                        'text': text,
-                        'page': pg_no
-                    })
+            if result is None and tiered and toc:
+                tier = TIER_TOC
+                with metrics.stage(tier):
+                    outline = _toc_outline(session, page_deadline, metrics, backend)
+                if outline:
+                    with metrics.stage('title'):
+                        result = {'title': _title_from_first_page(session, backend), 'outline': outline}
             
-            result = {
-                'title': title,
-                'outline': outline
-            }
+            if result is None:
+                tier = TIER_FONT_SIZE
+                result, line_count = _font_size_outline(pdf, pdf_path, shards, page_deadline, page_buffer, metrics,
+                                                        page_cache, backend)
+                if not line_count:
+                    metrics.incr(f'tier_{tier}')
+                    return result, tier
+                logger.info(f"Processed {line_count} lines")
+            metrics.incr(f'tier_{tier}')
             
             # Validate output
-            if not validate_output(result):
+            with metrics.stage('validate_output'):
+                valid = validate_output(result)
+            if not valid:
                 logger.warning("Output validation failed, but returning the result anyway")
                 
-            logger.info(f"Processed {len(lines_data)} lines, found {len(outline)} headings in {time.time() - start_time:.2f} seconds")
-            return result
+            logger.info(f"Found {len(result['outline'])} headings from {tier} in {time.time() - start_time:.2f} seconds")
+            return result, tier
             
     except Exception as e:
         logger.error(f"Error processing PDF {pdf_path}: {str(e)}")
         import traceback
         logger.debug(traceback.format_exc())
-        return {'title': '', 'outline': []}
+        return {'title': '', 'outline': []}, None
+
+def extract_outline(pdf_path: str, shards: int = 1, tiered: bool = True,
+                    page_buffer: str = 'auto', metrics: Metrics = NULL_METRICS,
+                    page_budget: float = PAGE_TIME_BUDGET, deadline: Optional[float] = None,
+                    data: Optional[bytes] = None, page_cache: Optional[cache.PageCache] = None,
+                    backend: str = DEFAULT_BACKEND, toc: bool = False) -> Dict[str, Any]:
+    """
+    Extract document title and hierarchical outline from PDF.
+    
+    Returns:
+        dict: {
+            'title': str,
+            'outline': [{'level': str, 'text': str, 'page': int}, ...]
+        }
+    """
+    return extract_outline_with_tier(pdf_path, shards=shards, tiered=tiered,
+                                     page_buffer=page_buffer, metrics=metrics, page_budget=page_budget,
+                                     deadline=deadline, data=data, page_cache=page_cache, backend=backend,
+                                     toc=toc)[0]
+
+def process_document(pdf_path: str, collect_metrics: bool = False,
+                     profile: Optional[str] = None, profile_dir: str = PROFILE_SUBDIR,
+                     profile_slower_than: Optional[float] = None,
+                     **options: Any) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]], bool]:
+    """
+    Extract one document for a batch.
+    
+    Returns the result, its metrics as a dict if requested, and whether the
+    result is complete: it came from an outline tier, and no page was
+    skipped for time or lost to an error. Only complete results are cached.
+    
+    With `profile` (profiler.PROFILE_FULL or PROFILE_SAMPLED), a report of the
+    extraction is written to `profile_dir`, only if it took longer than
+    `profile_slower_than` seconds when that is given (see profiler.py).
+    """
+    # Counters are always kept, since they decide whether the result is
+    # complete; stages are only timed when metrics were asked for
+    metrics = Metrics() if collect_metrics else CounterMetrics()
+    profiling = contextlib.nullcontext()
+    if profile:
+        profiling = profiler.ProfileDocument(pdf_path, profile_dir, profile, slower_than=profile_slower_than)
+    with profiling, metrics.stage('total'):
+        result, tier = extract_outline_with_tier(pdf_path, metrics=metrics, **options)
+    complete = tier is not None and not any(metrics.counters.get(name) for name in INCOMPLETE_COUNTERS)
+    return result, metrics.as_dict() if collect_metrics else None, complete
+
+def output_filename_for(filename: str) -> str:
+    """Return the output filename for input PDF `filename`."""
+    return f"{os.path.splitext(filename)[0]}_final_outline.json"
+
+def save_result(result: Dict[str, Any], output_dir: str, filename: str,
+                indent: Optional[int] = 2) -> str:
+    """Write `result` as `<name>_final_outline.json` in `output_dir` and return its filename."""
+    output_filename = output_filename_for(filename)
+    output_path = os.path.join(output_dir, output_filename)
+    
+    # indent=None writes compact JSON
+    separators = (',', ':') if indent is None else None
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=indent, separators=separators, ensure_ascii=False)
+    
+    return output_filename
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Extract title and outline from PDFs.")
+    parser.add_argument('pdfs', nargs='*', metavar='PDF',
+                        help="PDFs to process instead of the input directory")
+    parser.add_argument('-o', '--output', metavar='PATH',
+                        help="With a single PDF argument, write its JSON output to this path")
+    parser.add_argument('--input-dir', default='/app/input', help="Directory containing input PDFs")
+    parser.add_argument('--output-dir', default='/app/output', help="Directory for the JSON outputs")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes (default: CPU count, 0 processes in-line)")
+    parser.add_argument('--timeout', type=float, default=batch.DEFAULT_TIMEOUT,
+                        help="Wall-clock seconds allowed per document")
+    parser.add_argument('--max-tasks-per-worker', type=int, default=batch.DEFAULT_MAX_TASKS,
+                        help="Documents a worker processes before it is recycled")
+    parser.add_argument('--max-rss-mb', type=float, default=batch.DEFAULT_MAX_RSS_MB,
+                        help="Worker resident memory (MB) that triggers recycling")
+    parser.add_argument('--shards', type=int, default=None,
+                        help="Processes to split the pages of a large document across "
+                             "(default: CPU cores left over per worker)")
+    parser.add_argument('--font-size-only', action='store_true',
+                        help="Ignore embedded bookmarks and structure tree; always analyse font sizes")
+    parser.add_argument('--toc', action='store_true',
+                        help="For documents without bookmarks or tags, look for a printed table of contents "
+                             "and read only the pages its entries point to")
+    parser.add_argument('--page-buffer', choices=['auto', 'memory', 'spill', 'reparse'], default='auto',
+                        help="Where page lines wait between the statistics and heading passes "
+                             "(default: spill to disk for long documents)")
+    parser.add_argument('--backend', choices=['pdfplumber', 'pdfminer'], default=DEFAULT_BACKEND,
+                        help="Where page glyphs come from: pdfplumber's page.chars (the reference) or "
+                             "pdfminer's interpreter directly, without layout objects (same results, faster)")
+    parser.add_argument('--batch-deadline', type=float, metavar='SECONDS',
+                        help="Wall-clock seconds for the whole batch; if the predicted time exceeds it, "
+                             "every document's page budget is cut in proportion (default: no limit)")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="Read inputs ahead on a background thread and write compact outputs on another, "
+                             "overlapping file I/O with extraction")
+    parser.add_argument('--jsonl', metavar='PATH',
+                        help="Also write every result as one line of a combined JSON Lines file")
+    parser.add_argument('--metrics', choices=['json', 'prometheus'],
+                        help="Write per-stage timings and counters to metrics.json / metrics.prom in the output directory")
+    parser.add_argument('--cache-dir', default=os.environ.get('PDF_OUTLINE_CACHE_DIR'),
+                        help="Directory of cached results keyed by PDF content (default: no cache)")
+    parser.add_argument('--cache-max-mb', type=float, default=cache.DEFAULT_MAX_MB,
+                        help="Cache size above which least recently used results are evicted")
+    parser.add_argument('--no-page-cache', action='store_true',
+                        help="With --cache-dir, cache only whole-document results, not the lines "
+                             "of individual pages")
+    parser.add_argument('--profile', action='store_true',
+                        help="Profile every document with cProfile and tracemalloc and write a report of "
+                             "hotspots, allocation sites and page durations to profiles/ in the output "
+                             "directory (slows extraction down several times)")
+    parser.add_argument('--profile-slower-than', type=float, metavar='SECONDS',
+                        help="Write a profile report only for documents taking longer than this; without "
+                             "--profile, documents are profiled by cheap stack sampling instead")
+    parser.add_argument('--serve', action='store_true',
+                        help="Run as a resident HTTP service instead of processing the input directory")
+    parser.add_argument('--host', default='127.0.0.1', help="Address the service listens on")
+    parser.add_argument('--port', type=int, default=8080, help="TCP port the service listens on")
+    parser.add_argument('--socket', help="Unix socket path to serve on instead of a TCP port")
+    parser.add_argument('--queue-size', type=int, default=32,
+                        help="Requests that may wait for a worker before new ones are refused")
+    parser.add_argument('--watch', action='store_true',
+                        help="Keep running and process PDFs as they are added, changed or removed")
+    parser.add_argument('--debounce', type=float, default=2.0,
+                        help="Seconds a file must stay unchanged before it is processed in watch mode")
+    parser.add_argument('--poll', action='store_true',
+                        help="Poll the input directory instead of using inotify in watch mode")
+    parser.add_argument('--poll-interval', type=float, default=5.0,
+                        help="Seconds between directory scans when polling")
+    args = parser.parse_args(argv)
+    if args.output and len(args.pdfs) != 1:
+        parser.error("-o/--output needs exactly one PDF argument")
+    if args.pdfs and (args.watch or args.serve):
+        parser.error("PDF arguments cannot be combined with --watch or --serve")
+    if args.output:
+        args.output_dir = os.path.dirname(args.output) or '.'
+    return args
+
+def process_files(pdf_paths: List[str], args: argparse.Namespace) -> Dict[str, Tuple[str, Optional[str]]]:
+    """
+    Extract `pdf_paths` as configured by `args` and write their outputs.
+    
+    Documents are started longest first by predicted cost, with page
+    budgets cut to fit `args.batch_deadline` if one is set, and predicted
+    and actual costs are logged at the end (see batch_scheduler.py).
+    
+    With `args.pipeline`, inputs are read ahead into memory on a background
+    thread and handed to the workers as bytes, and outputs are written
+    compactly on another thread, so file I/O overlaps with extraction.
+    
+    Returns:
+        dict: {pdf_path: (output filename, error or None)}. Failed documents
+        still get an output file with an empty result.
+    """
+    output_dir = args.output_dir
+    outcomes = {}
+    
+    page_cache = None
+    if args.cache_dir and not args.no_page_cache:
+        page_cache = cache.PageCache(os.path.join(args.cache_dir, PAGE_CACHE_SUBDIR),
+                                     max_bytes=int(args.cache_max_mb * 1024 * 1024))
+    # Page cache hit rates come back from the workers as metrics
+    batch_metrics = Metrics() if args.metrics or page_cache is not None else NULL_METRICS
+    document_metrics: Dict[str, Metrics] = {}
+    batch_metrics.incr('documents', len(pdf_paths))
+    
+    indent = None if args.pipeline else 2
+    writer = ResultWriter(lambda result, filename: save_result(result, output_dir, filename, indent=indent),
+                          jsonl_path=args.jsonl, background=args.pipeline)
+    
+    result_cache = None
+    cache_keys = {}
+    if args.cache_dir:
+        result_cache = cache.ResultCache(args.cache_dir, max_bytes=int(args.cache_max_mb * 1024 * 1024))
+        version = f"{EXTRACTOR_VERSION}:tiered={not args.font_size_only}" + (':toc' if args.toc else '')
+    
+    cpu_count = os.cpu_count() or 1
+    # --workers 0 extracts one document at a time in this process
+    workers = 1 if args.workers == 0 else args.workers or cpu_count
+    planned = batch_scheduler.plan_batch(pdf_paths, workers=workers,
+                                         page_budget=PAGE_TIME_BUDGET, deadline=args.batch_deadline,
+                                         model=batch_scheduler.DocumentCostModel.for_backend(args.backend))
+    plans = {document.pdf_path: document for document in planned}
+    ordered_paths = [document.pdf_path for document in planned]
+    batch_end = None if args.batch_deadline is None else time.time() + args.batch_deadline
+    if args.batch_deadline is not None:
+        cut = sum(1 for document in planned if document.page_budget < PAGE_TIME_BUDGET)
+        logger.info(f"Batch deadline {args.batch_deadline:.1f}s: page budgets cut for {cut} of {len(planned)} documents")
+    
+    if args.pipeline:
+        inputs = prefetch(ordered_paths)
+    else:
+        inputs = ((pdf_path, None, None) for pdf_path in ordered_paths)
+    
+    def jobs() -> Iterator[batch.Job]:
+        """Serve unchanged documents from the result cache; yield the rest for extraction."""
+        for pdf_path, data, read_error in inputs:
+            filename = os.path.basename(pdf_path)
+            if result_cache is not None:
+                try:
+                    if read_error:
+                        raise OSError(read_error)
+                    if data is not None:
+                        key = result_cache.key_for_data(data, version)
+                    else:
+                        key = result_cache.key_for(pdf_path, version)
+                except OSError as e:
+                    # Still extracted uncached, so the failure gets fallback output like any other
+                    logger.error(f"Failed to read {filename}: {str(e)}")
+                    key = None
+                cached = None if key is None else result_cache.get(key)
+                if cached is not None:
+                    writer.submit(filename, cached)
+                    output_filename = output_filename_for(filename)
+                    outcomes[pdf_path] = (output_filename, None)
+                    batch_metrics.incr('cache_hits')
+                    logger.info(f"Cache hit for {filename} -> {output_filename}")
+                    continue
+                if key is not None:
+                    cache_keys[pdf_path] = key
+            options: Dict[str, Any] = {}
+            if data is not None:
+                options['data'] = data
+            if plans[pdf_path].page_budget < PAGE_TIME_BUDGET:
+                options['page_budget'] = plans[pdf_path].page_budget
+            if batch_end is not None:
+                options['deadline'] = batch_end
+            yield (pdf_path, options) if options else pdf_path
+    
+    if args.pipeline:
+        # Drawn lazily, so reading and hashing overlap with extraction
+        pending = jobs()
+        to_extract = len(pdf_paths)
+    else:
+        pending = list(jobs())
+        to_extract = len(pending)
+    
+    # Spare cores go to splitting large documents across shards
+    busy_workers = max(1, min(workers, to_extract))
+    shards = args.shards or max(1, cpu_count // busy_workers)
+    extractor = functools.partial(process_document, collect_metrics=batch_metrics.enabled, shards=shards,
+                                  tiered=not args.font_size_only, page_buffer=args.page_buffer,
+                                  backend=args.backend, toc=args.toc,
+                                  page_cache=page_cache)
+    if args.profile or args.profile_slower_than is not None:
+        extractor = functools.partial(extractor, profile_dir=os.path.join(output_dir, PROFILE_SUBDIR),
+                                      profile=profiler.PROFILE_FULL if args.profile else profiler.PROFILE_SAMPLED,
+                                      profile_slower_than=args.profile_slower_than)
+    if to_extract:
+        preload_extraction_modules()
+    
+    if args.workers == 0:
+        results = batch.process_inline(pending, extractor)
+    else:
+        results = batch.process_batch(
+            pending,
+            extractor,
+            workers=args.workers,
+            timeout=args.timeout,
+            max_tasks_per_worker=args.max_tasks_per_worker,
+            max_rss_mb=args.max_rss_mb,
+        )
+    
+    actual_costs = {}
+    for item in results:
+        filename = os.path.basename(item.pdf_path)
+        
+        try:
+            result, metrics_dict, complete = item.result if item.result is not None else (None, None, False)
+            if metrics_dict is not None:
+                document_metrics[filename] = Metrics.from_dict(metrics_dict)
+                batch_metrics.merge(document_metrics[filename])
+            if result is None:
+                logger.error(f"Failed to process {filename}: {item.error}")
+                batch_metrics.incr('timeouts' if item.error == 'timeout' else 'failures')
+                result = {'title': '', 'outline': []}
+            else:
+                actual_costs[item.pdf_path] = item.elapsed
+                if item.pdf_path in cache_keys and complete:
+                    result_cache.put(cache_keys[item.pdf_path], result)
+                elif item.pdf_path in cache_keys:
+                    logger.info(f"Not caching the partial result for {filename}")
+            
+            # Save result as JSON
+            writer.submit(filename, result)
+            output_filename = output_filename_for(filename)
+            outcomes[item.pdf_path] = (output_filename, item.error)
+            
+            logger.info(f"Processed {filename} in {item.elapsed:.2f} seconds -> {output_filename}")
+            
+        except Exception as e:
+            logger.error(f"Failed to process {filename}: {str(e)}")
+            outcomes[item.pdf_path] = ('', str(e))
+    
+    write_errors = writer.close()
+    for pdf_path, (output_filename, error) in outcomes.items():
+        if error is None and os.path.basename(pdf_path) in write_errors:
+            outcomes[pdf_path] = ('', write_errors[os.path.basename(pdf_path)])
+    
+    if actual_costs:
+        report = batch_scheduler.cost_report(planned, actual_costs)
+        logger.info(f"Cost model: predicted {report['predicted_seconds']:.2f}s, actual {report['actual_seconds']:.2f}s "
+                    f"for {report['documents']} documents (mean error {report['mean_abs_error']:.2f}s)"
+                    + (f", fitted {report['fitted']}" if 'fitted' in report else ''))
+        batch_metrics.incr('cost_predicted_ms', int(report['predicted_seconds'] * 1000))
+        batch_metrics.incr('cost_actual_ms', int(report['actual_seconds'] * 1000))
+        for pdf_path, seconds in actual_costs.items():
+            logger.debug(f"Cost of {os.path.basename(pdf_path)}: predicted {plans[pdf_path].predicted:.2f}s, "
+                         f"actual {seconds:.2f}s")
+    if result_cache is not None:
+        stats = result_cache.stats()
+        logger.info(f"Result cache: {stats['hits']} hits, {stats['misses']} misses")
+    if page_cache is not None:
+        page_cache.evict()
+        hits = batch_metrics.counters['page_cache_hits']
+        lookups = hits + batch_metrics.counters['page_cache_misses']
+        if lookups:
+            logger.info(f"Page cache: {hits} of {lookups} pages reused ({hits / lookups:.0%})")
+    if args.metrics:
+        metrics_path = os.path.join(output_dir, 'metrics.prom' if args.metrics == 'prometheus' else 'metrics.json')
+        write_metrics(metrics_path, batch_metrics, document_metrics, fmt=args.metrics)
+        logger.info(f"Wrote metrics to {metrics_path}")
+    return outcomes
 
-def main():
+def main(argv: Optional[List[str]] = None):
     """Main function to process all PDFs in input directory."""
-    input_dir = '/app/input'
-    output_dir = '/app/output'
+    args = parse_args(argv)
+    if args.serve:
+        import server
+        extractor = functools.partial(extract_outline, shards=args.shards or 1,
+                                      tiered=not args.font_size_only, page_buffer=args.page_buffer,
+                                      backend=args.backend, toc=args.toc)
+        server.serve(
+            extractor,
+            host=args.host,
+            port=args.port,
+            socket_path=args.socket,
+            workers=args.workers or None,
+            queue_size=args.queue_size,
+            default_deadline=args.timeout,
+            max_tasks_per_worker=args.max_tasks_per_worker,
+            max_rss_mb=args.max_rss_mb,
+            preload=EXTRACTION_MODULES,
+            initializer=configure_logging,
+        )
+        return
+    
+    input_dir = args.input_dir
+    output_dir = args.output_dir
     
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
     
+    if args.pdfs:
+        pdf_paths = []
+        for pdf_path in args.pdfs:
+            if os.path.isfile(pdf_path):
+                pdf_paths.append(pdf_path)
+            else:
+                logger.error(f"Input file {pdf_path} does not exist")
+        outcomes = process_files(pdf_paths, args) if pdf_paths else {}
+        if args.output and pdf_paths:
+            output_filename, _ = outcomes.get(pdf_paths[0], ('', None))
+            if output_filename:
+                os.replace(os.path.join(output_dir, output_filename), args.output)
+                logger.info(f"Wrote {args.output}")
+        logger.info("Processing complete")
+        return
+    
     # Check if input directory exists
     if not os.path.exists(input_dir):
         logger.error(f"Input directory {input_dir} does not exist")
         return
     
+    if args.watch:
+        import watcher
+        watcher.watch(
+            input_dir,
+            os.path.join(output_dir, watcher.MANIFEST_NAME),
+            functools.partial(process_files, args=args),
+            output_dir=output_dir,
+            debounce=args.debounce,
+            poll_interval=args.poll_interval,
+            use_inotify=not args.poll,
+        )
+        return
+    
     # Process all PDF files in input directory
     pdf_files = [f for f in os.listdir(input_dir) if f.lower().endswith('.pdf')]
     
@@ -256,29 +1182,9 @@ def main():
         return
     
     logger.info(f"Found {len(pdf_files)} PDF files to process")
-    
-    for filename in pdf_files:
-        start_time = time.time()
-        pdf_path = os.path.join(input_dir, filename)
-        
-        try:
-            # Extract outline
-            result = extract_outline(pdf_path)
-            
-            # Save result as JSON
-            base_name = os.path.splitext(filename)[0]
-            output_filename = f"{base_name}_final_outline.json"
-            output_path = os.path.join(output_dir, output_filename)
-            
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(result, f, indent=2, ensure_ascii=False)
-            
-            logger.info(f"Processed {filename} in {time.time() - start_time:.2f} seconds -> {output_filename}")
-            
-        except Exception as e:
-            logger.error(f"Failed to process {filename}: {str(e)}")
-    
+    process_files([os.path.join(input_dir, f) for f in pdf_files], args)
     logger.info("Processing complete")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    configure_logging()
+    main()
@@ -0,0 +1,170 @@
+"""
+Lightweight per-stage timers and counters for the extraction pipeline.
+
+A Metrics instance accumulates wall time per named stage and integer
+counters. Instances are plain data, so worker processes can return them as
+dicts and the parent can merge them into batch totals. When metrics are not
+wanted, NULL_METRICS stands in: its methods do nothing and `stage()` returns
+a shared no-op context manager, so instrumented code pays only a method call.
+CounterMetrics is the same but keeps counters, for callers that need a few
+of them (such as whether any page was skipped) without timing every stage.
+"""
+
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+METRIC_PREFIX = 'pdf_outline'
+
+
+class Metrics:
+    """Accumulated stage timings and counters."""
+
+    enabled = True
+
+    def __init__(self):
+        self.timers: Dict[str, float] = defaultdict(float)
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.counters: Dict[str, int] = defaultdict(int)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block under stage `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timers[name] += time.perf_counter() - start
+            self.calls[name] += 1
+
+    def incr(self, name: str, value: int = 1) -> None:
+        """Add `value` to counter `name`."""
+        self.counters[name] += value
+
+    def merge(self, other: "Metrics") -> None:
+        """Add another instance's timings and counters to this one."""
+        for name, seconds in other.timers.items():
+            self.timers[name] += seconds
+        for name, calls in other.calls.items():
+            self.calls[name] += calls
+        for name, value in other.counters.items():
+            self.counters[name] += value
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'stages': {
+                name: {'seconds': round(self.timers[name], 6), 'calls': self.calls[name]}
+                for name in sorted(self.timers)
+            },
+            'counters': dict(sorted(self.counters.items())),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Metrics":
+        metrics = cls()
+        for name, stage in data.get('stages', {}).items():
+            metrics.timers[name] = stage['seconds']
+            metrics.calls[name] = stage['calls']
+        metrics.counters.update(data.get('counters', {}))
+        return metrics
+
+
+class NullMetrics:
+    """Metrics sink that records nothing."""
+
+    enabled = False
+    _noop = nullcontext()
+
+    def stage(self, name: str):
+        return self._noop
+
+    def incr(self, name: str, value: int = 1) -> None:
+        pass
+
+    def merge(self, other: Any) -> None:
+        pass
+
+    def as_dict(self) -> Optional[Dict[str, Any]]:
+        return None
+
+
+NULL_METRICS = NullMetrics()
+
+
+class CounterMetrics(NullMetrics):
+    """Metrics sink that keeps counters but times nothing."""
+
+    def __init__(self):
+        self.counters: Dict[str, int] = defaultdict(int)
+
+    def incr(self, name: str, value: int = 1) -> None:
+        self.counters[name] += value
+
+    def merge(self, other: Any) -> None:
+        for name, value in other.counters.items():
+            self.counters[name] += value
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {'stages': {}, 'counters': dict(sorted(self.counters.items()))}
+
+
+def _labels(**labels: Optional[str]) -> str:
+    parts = []
+    for key, value in labels.items():
+        if value is not None:
+            value = value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+            parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _prometheus_series(prefix: str, scope: str, series: List[Tuple[Optional[str], Metrics]]) -> List[str]:
+    lines = [
+        f'# HELP {prefix}_stage_seconds_total Wall time spent in each extraction stage, {scope}.',
+        f'# TYPE {prefix}_stage_seconds_total counter',
+    ]
+    for document, metrics in series:
+        for name in sorted(metrics.timers):
+            lines.append(f'{prefix}_stage_seconds_total'
+                         f'{_labels(document=document, stage=name)} {metrics.timers[name]:.6f}')
+    lines += [
+        f'# HELP {prefix}_stage_calls_total Number of times each extraction stage ran, {scope}.',
+        f'# TYPE {prefix}_stage_calls_total counter',
+    ]
+    for document, metrics in series:
+        for name in sorted(metrics.calls):
+            lines.append(f'{prefix}_stage_calls_total'
+                         f'{_labels(document=document, stage=name)} {metrics.calls[name]}')
+    counter_names = sorted({name for _, metrics in series for name in metrics.counters})
+    for name in counter_names:
+        lines.append(f'# TYPE {prefix}_{name}_total counter')
+        for document, metrics in series:
+            if name in metrics.counters:
+                lines.append(f'{prefix}_{name}_total{_labels(document=document)} {metrics.counters[name]}')
+    return lines
+
+
+def to_prometheus(batch: Metrics, documents: Dict[str, Metrics]) -> str:
+    """
+    Render batch totals and per-document series in Prometheus text format.
+
+    Batch totals get their own metric names (pdf_outline_batch_*), so summing
+    a per-document metric over its `document` label never counts the batch
+    total a second time.
+    """
+    lines = _prometheus_series(f'{METRIC_PREFIX}_batch', 'summed over the batch', [(None, batch)])
+    lines += _prometheus_series(METRIC_PREFIX, 'per document', sorted(documents.items()))
+    return '\n'.join(lines) + '\n'
+
+
+def write_metrics(path: str, batch: Metrics, documents: Dict[str, Metrics], fmt: str = 'json') -> None:
+    """Write batch and per-document metrics to `path` as JSON or Prometheus text."""
+    with open(path, 'w', encoding='utf-8') as f:
+        if fmt == 'prometheus':
+            f.write(to_prometheus(batch, documents))
+        else:
+            json.dump({
+                'batch': batch.as_dict(),
+                'documents': {name: m.as_dict() for name, m in sorted(documents.items())},
+            }, f, indent=2)
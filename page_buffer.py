@@ -0,0 +1,54 @@
+"""
+Buffers holding per-page line records between the two extraction passes.
+
+The first pass over a document only needs font statistics, but the second
+pass needs every page's lines again once the heading thresholds are known.
+MemoryPageBuffer keeps them in a list, which is fastest for short documents.
+SpillPageBuffer pickles each page to an anonymous temporary file as it
+arrives and streams them back one at a time, so memory stays bounded by a
+single page regardless of document length.
+"""
+
+import pickle
+import tempfile
+from typing import Iterator, List, Tuple
+
+PageLines = Tuple[int, List[Tuple[str, float, int]]]  # (page number, [(text, size, glyph count), ...])
+
+
+class MemoryPageBuffer:
+    """Keep page records in memory."""
+
+    def __init__(self):
+        self._pages: List[PageLines] = []
+
+    def append(self, pg_no: int, lines: List[Tuple[str, float, int]]) -> None:
+        self._pages.append((pg_no, lines))
+
+    def __iter__(self) -> Iterator[PageLines]:
+        return iter(self._pages)
+
+    def close(self) -> None:
+        self._pages = []
+
+
+class SpillPageBuffer:
+    """Write page records to a temporary file and read them back in order."""
+
+    def __init__(self):
+        self._file = tempfile.TemporaryFile()
+        self._count = 0
+
+    def append(self, pg_no: int, lines: List[Tuple[str, float, int]]) -> None:
+        pickle.dump((pg_no, lines), self._file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._count += 1
+
+    def __iter__(self) -> Iterator[PageLines]:
+        self._file.flush()
+        self._file.seek(0)
+        for _ in range(self._count):
+            yield pickle.load(self._file)
+        self._file.seek(0, 2)  # Further appends go to the end
+
+    def close(self) -> None:
+        self._file.close()
@@ -0,0 +1,77 @@
+"""
+Classify pages as text, image-only or blank from their content streams.
+
+Layout analysis is the expensive part of extraction, and on a scanned page it
+runs (and, through the fallbacks, reruns) only to find nothing. A page can
+only produce text inside a BT ... ET text object, so classify_page() decodes
+the page's content streams, and those of the form XObjects they draw, and
+looks for the BT operator without interpreting anything. Pages without one
+are image-only if they draw an image (the Do operator or an inline BI image)
+and blank otherwise.
+
+The check errs towards "text": a "BT" inside a string or inline image data,
+or a stream that cannot be decoded, classifies the page as text, so no page
+with text is ever skipped.
+"""
+
+import re
+from typing import Set
+
+PAGE_TEXT = 'text'
+PAGE_IMAGE_ONLY = 'image_only'
+PAGE_BLANK = 'blank'
+
+MAX_FORM_DEPTH = 8  # Nesting of form XObjects followed when looking for text
+
+# PDF operators are delimited by whitespace or one of ()<>[]{}/%
+_DELIMITED = rb'(?<![^\s()<>\[\]{}/%%])%s(?![^\s()<>\[\]{}/%%])'
+_BEGIN_TEXT = re.compile(_DELIMITED % b'BT')
+_DRAW_XOBJECT = re.compile(_DELIMITED % b'Do')
+_INLINE_IMAGE = re.compile(_DELIMITED % b'BI')
+
+
+def _contents_data(page_obj) -> bytes:
+    from pdfminer.pdftypes import resolve1
+
+    return b'\n'.join(resolve1(stream).get_data() for stream in page_obj.contents)
+
+
+def _forms_have_text(resources, depth: int, seen: Set[int]) -> bool:
+    """Return True if any form XObject in `resources` (recursively) contains a text object."""
+    from pdfminer.pdftypes import resolve1
+
+    if depth > MAX_FORM_DEPTH or not isinstance(resources, dict):
+        return False
+    xobjects = resolve1(resources.get('XObject'))
+    if not isinstance(xobjects, dict):
+        return False
+    for ref in xobjects.values():
+        key = getattr(ref, 'objid', None) or id(ref)
+        if key in seen:
+            continue
+        seen.add(key)
+        xobject = resolve1(ref)
+        if getattr(xobject.get('Subtype'), 'name', None) != 'Form':
+            continue
+        if _BEGIN_TEXT.search(xobject.get_data()):
+            return True
+        if _forms_have_text(resolve1(xobject.get('Resources')), depth + 1, seen):
+            return True
+    return False
+
+
+def classify_page(page_obj) -> str:
+    """Return PAGE_TEXT, PAGE_IMAGE_ONLY or PAGE_BLANK for a pdfminer page."""
+    try:
+        data = _contents_data(page_obj)
+        if _BEGIN_TEXT.search(data):
+            return PAGE_TEXT
+        draws_xobject = _DRAW_XOBJECT.search(data) is not None
+        if draws_xobject and _forms_have_text(page_obj.resources, 0, set()):
+            return PAGE_TEXT
+    except Exception:
+        return PAGE_TEXT  # Undecodable or malformed: let extraction decide
+    if draws_xobject or _INLINE_IMAGE.search(data):
+        return PAGE_IMAGE_ONLY
+    return PAGE_BLANK
+
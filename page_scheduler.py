@@ -0,0 +1,162 @@
+"""
+Budget-aware ordering of page work for the font-size heuristic.
+
+Reading pages front to back under a time budget loses every heading after
+the page where the budget ran out. PageScheduler instead hands out pages in
+order of expected value: the first few pages (title, front matter), then any
+page following one that looks like a table of contents (so a multi-page
+contents list is read in full), then a stride sample across the rest of the
+document that is refined by halving the stride until every page is covered.
+If the budget runs out, the pages read so far still span the whole document.
+
+Before each page the scheduler asks a PageCostModel, fitted to the pages
+already read, how long the page will take, and skips pages that would not
+finish before the deadline.
+"""
+
+import re
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+HEAD_PAGES = 3             # Pages always read first
+DEFAULT_PAGE_SECONDS = 0.05  # Cost assumed for a page before any has been timed
+TOC_MIN_ENTRIES = 3        # Fewest lines ending in a page number that make a table of contents
+
+TOC_ENTRY_PATTERN = re.compile(r'\S.*?(?:\.{2,}|\s)\s*\d{1,4}$')
+
+
+def looks_like_toc(lines: Iterable[Tuple[str, float, int]]) -> bool:
+    """Return True if most of a page's lines look like "heading .... page" entries."""
+    lines = list(lines)
+    entries = sum(1 for text, _, _ in lines if TOC_ENTRY_PATTERN.match(text))
+    return entries >= max(TOC_MIN_ENTRIES, len(lines) // 2)
+
+
+def content_size(page_obj) -> int:
+    """Return the encoded size in bytes of a pdfminer page's content streams."""
+    from pdfminer.pdftypes import resolve1
+
+    size = 0
+    for stream in page_obj.contents:
+        stream = resolve1(stream)
+        try:
+            size += int(resolve1(stream.get('Length', 0)) or 0)
+        except (AttributeError, TypeError, ValueError):
+            continue
+    return size
+
+
+def coverage_order(page_numbers: Sequence[int]) -> List[int]:
+    """
+    Order pages as a coarse stride sample followed by progressively finer fills.
+
+    The first pass takes every `stride`-th page for the largest power-of-two
+    stride that fits; each following pass halves the stride and adds the pages
+    midway between those already taken, until every page is included.
+    """
+    n = len(page_numbers)
+    if not n:
+        return []
+    stride = 1
+    while stride * 2 <= n:
+        stride *= 2
+    order = list(range(0, n, stride))
+    while stride > 1:
+        stride //= 2
+        order.extend(range(stride, n, stride * 2))
+    return [page_numbers[i] for i in order]
+
+
+class PageCostModel:
+    """
+    Online least-squares fit of page seconds against content-stream bytes.
+
+    Until two pages of different size have been timed, the prediction is the
+    mean of the observed times (or DEFAULT_PAGE_SECONDS before any).
+    """
+
+    def __init__(self, default_seconds: float = DEFAULT_PAGE_SECONDS):
+        self.default_seconds = default_seconds
+        self.n = 0
+        self.sum_x = 0.0
+        self.sum_y = 0.0
+        self.sum_xx = 0.0
+        self.sum_xy = 0.0
+
+    def observe(self, content_bytes: int, seconds: float) -> None:
+        self.n += 1
+        self.sum_x += content_bytes
+        self.sum_y += seconds
+        self.sum_xx += content_bytes * content_bytes
+        self.sum_xy += content_bytes * seconds
+
+    def predict(self, content_bytes: int) -> float:
+        if not self.n:
+            return self.default_seconds
+        mean_y = self.sum_y / self.n
+        variance = self.n * self.sum_xx - self.sum_x * self.sum_x
+        if self.n < 2 or variance <= 0:
+            return mean_y
+        slope = (self.n * self.sum_xy - self.sum_x * self.sum_y) / variance
+        intercept = (self.sum_y - slope * self.sum_x) / self.n
+        # A poor fit can extrapolate below zero; never predict less than a tenth of the mean
+        return max(intercept + slope * content_bytes, mean_y * 0.1)
+
+
+class PageScheduler:
+    """
+    Hand out page numbers in priority order until the deadline.
+
+    Iterate the scheduler for the next page to read and report each finished
+    page with record(), which refits the cost model and promotes the page
+    after a table of contents.
+
+    Args:
+        page_sizes: Content-stream size of each page to schedule, by page
+            number, in document order.
+        deadline: time.time() after which no page is started.
+        head_pages: Number of leading pages read before anything else.
+    """
+
+    def __init__(self, page_sizes: Dict[int, int], deadline: float, head_pages: int = HEAD_PAGES,
+                 cost_model: Optional[PageCostModel] = None):
+        self.page_sizes = page_sizes
+        self.deadline = deadline
+        self.cost_model = cost_model or PageCostModel()
+        page_numbers = list(page_sizes)
+        self._head = page_numbers[:head_pages]
+        self._rest = coverage_order(page_numbers[head_pages:])
+        self._promoted: List[int] = []
+        self._done = set()
+        self.skipped = 0
+
+    def __iter__(self) -> Iterator[int]:
+        queue = self._head + self._rest
+        position = 0
+        while position < len(queue) or self._promoted:
+            if self._promoted:
+                pg_no = self._promoted.pop(0)
+            else:
+                pg_no = queue[position]
+                position += 1
+            if pg_no in self._done:
+                continue
+            self._done.add(pg_no)
+
+            now = time.time()
+            if now >= self.deadline:
+                self.skipped += len(self.page_sizes) - len(self._done) + 1
+                return
+            if now + self.cost_model.predict(self.page_sizes[pg_no]) > self.deadline:
+                self.skipped += 1  # A cheaper page may still fit
+                continue
+            yield pg_no
+
+    def record(self, pg_no: int, seconds: Optional[float],
+               lines: Iterable[Tuple[str, float, int]] = ()) -> None:
+        """Report that page `pg_no` took `seconds` (None if not extracted) and produced `lines`."""
+        if seconds is not None:
+            self.cost_model.observe(self.page_sizes[pg_no], seconds)
+        following = pg_no + 1
+        if following in self.page_sizes and following not in self._done and looks_like_toc(lines):
+            self._promoted.append(following)
@@ -0,0 +1,296 @@
+"""
+Per-document profiling: where the time and memory of one slow PDF went.
+
+A document that takes 30 seconds instead of 1 used to be reproduced by hand.
+ProfileDocument wraps the extraction of one document and writes a report
+next to its output with the top functions by cumulative time, the sites
+holding the most allocated memory and the duration of every page read
+(pages are recorded by main.iter_page_lines through record_page()).
+
+Allocations are freed as soon as a page is done, so a snapshot taken at the
+end shows almost nothing. In full mode the peak of every page is recorded
+instead, and a snapshot is taken at the page boundary where the most memory
+was still held: that is where the allocation sites that make the document
+grow show up.
+
+Two modes:
+
+    full     cProfile and tracemalloc for every document. Exact, but slows
+             extraction down several times; for reproducing a known case.
+    sampled  A background thread samples the extracting thread's stack every
+             SAMPLE_INTERVAL seconds, and the report is only written if the
+             document took longer than a threshold. Costs about a percent,
+             so it can stay enabled in production. Hotspots are estimated
+             from the samples, and allocation sites are not recorded
+             (tracemalloc alone would cost more than the whole extraction).
+
+A document slow enough to profile may also be killed at the batch timeout
+before its report is written. In sampled mode the report is therefore
+written as soon as the document passes the threshold, and rewritten every
+PARTIAL_REPORT_INTERVAL seconds until it finishes. In full mode the timeout
+has to be raised instead.
+
+Pages extracted by page shards run in other processes and are not seen.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROFILE_FULL = 'full'
+PROFILE_SAMPLED = 'sampled'
+
+SAMPLE_INTERVAL = 0.005  # Seconds between stack samples
+TOP_FUNCTIONS = 30       # Functions listed by cumulative time
+TOP_ALLOCATIONS = 20     # Allocation sites listed
+TRACE_FRAMES = 5         # Stack depth recorded per allocation
+SNAPSHOT_GROWTH = 1.1    # Growth in held memory that replaces the allocation snapshot
+PARTIAL_REPORT_INTERVAL = 1.0  # Seconds between rewrites of a slow document's report
+
+_active: Optional["DocumentProfile"] = None
+
+
+def record_page(pg_no: int, seconds: float) -> None:
+    """Record the time spent on one page of the document being profiled, if any."""
+    if _active is not None:
+        _active.record_page(pg_no, seconds)
+
+
+class StackSampler:
+    """
+    Counts the functions on one thread's stack, sampled from a background thread.
+
+    Only frames called from `root` (and `root` itself) are counted, so the
+    batch machinery around the profiled call does not show up as hotspots.
+    """
+
+    def __init__(self, thread_id: int, root=None, interval: float = SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.root = root
+        self.interval = interval
+        self.samples = 0
+        self.inclusive: Counter = Counter()  # Samples with the function anywhere on the stack
+        self.own: Counter = Counter()        # Samples with the function on top of the stack
+        self.lock = threading.Lock()         # Held while the counts are updated
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            top = _frame_key(frame)
+            on_stack = set()
+            while frame is not None:
+                on_stack.add(_frame_key(frame))
+                if frame is self.root:
+                    break
+                frame = frame.f_back
+            with self.lock:
+                self.samples += 1
+                self.own[top] += 1
+                self.inclusive.update(on_stack)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def _frame_key(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_filename}:{code.co_firstlineno}({code.co_name})"
+
+
+class DocumentProfile:
+    """What was measured while one document was extracted."""
+
+    def __init__(self, pdf_path: str, mode: str):
+        self.pdf_path = pdf_path
+        self.mode = mode
+        # (page number, seconds, peak traced bytes or None), in extraction order
+        self.pages: List[Tuple[int, float, Optional[int]]] = []
+        self.seconds = 0.0
+        self.profile = None
+        self.sampler: Optional[StackSampler] = None
+        self.tracing = False
+        self.peak_alloc_bytes = 0
+        self.snapshot = None
+        self.snapshot_bytes = -1
+        self.snapshot_after: Optional[int] = None  # Page after which the snapshot was taken
+
+    def record_page(self, pg_no: int, seconds: float) -> None:
+        peak = None
+        if self.tracing:
+            import tracemalloc
+
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            self.peak_alloc_bytes = max(self.peak_alloc_bytes, peak)
+            if current > self.snapshot_bytes * SNAPSHOT_GROWTH:
+                self.snapshot = tracemalloc.take_snapshot()
+                self.snapshot_bytes = current
+                self.snapshot_after = pg_no
+        self.pages.append((pg_no, seconds, peak))
+
+    def report(self, in_progress: bool = False) -> str:
+        """Return the report as text."""
+        pages = list(self.pages)
+        lines = [f"Profile of {self.pdf_path} ({self.mode}{', still running' if in_progress else ''})",
+                 f"Total: {self.seconds:.3f} s, {len(pages)} page extractions", ""]
+        lines += self._hotspots()
+        if self.tracing:
+            lines += ["", f"Peak traced allocations: {self.peak_alloc_bytes / (1024 * 1024):.1f} MB"]
+        if self.snapshot is not None:
+            where = 'at the end' if self.snapshot_after is None else f"after page {self.snapshot_after}"
+            lines.append(f"Top {TOP_ALLOCATIONS} allocation sites holding the most memory "
+                         f"({self.snapshot_bytes / (1024 * 1024):.1f} MB {where}):")
+            import tracemalloc
+
+            snapshot = self.snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+            for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]:
+                frame = stat.traceback[0]
+                lines.append(f"  {stat.size / 1024:10.1f} KiB {stat.count:8d} blocks  {frame.filename}:{frame.lineno}")
+        lines += ["", "Page durations, slowest first:",
+                  f"  {'page':>6} {'seconds':>9}" + (f" {'peak MB':>8}" if self.tracing else '')]
+        for pg_no, seconds, peak in sorted(pages, key=lambda page: page[1], reverse=True):
+            lines.append(f"  {pg_no:6d} {seconds:9.4f}" + (f" {peak / (1024 * 1024):8.1f}" if peak is not None else ''))
+        return '\n'.join(lines) + '\n'
+
+    def _hotspots(self) -> List[str]:
+        if self.profile is not None:
+            import io
+            import pstats
+
+            out = io.StringIO()
+            stats = pstats.Stats(self.profile, stream=out)
+            stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+            return [f"Top {TOP_FUNCTIONS} functions by cumulative time:", out.getvalue().strip()]
+        sampler = self.sampler
+        if sampler is None:
+            return ["No stack samples taken"]
+        with sampler.lock:
+            samples = sampler.samples
+            top = [(key, count, sampler.own[key]) for key, count in sampler.inclusive.most_common(TOP_FUNCTIONS)]
+        if not samples:
+            return ["No stack samples taken"]
+        lines = [f"Top {TOP_FUNCTIONS} functions by share of {samples} stack samples "
+                 f"(every {sampler.interval * 1000:.0f} ms):",
+                 f"  {'cumulative':>10} {'own':>6}  function"]
+        for key, count, own in top:
+            lines.append(f"  {count / samples:10.1%} {own / samples:6.1%}  {key}")
+        return lines
+
+    def write(self, profile_dir: str, in_progress: bool = False) -> str:
+        """Write the report (and, in full mode, the raw cProfile stats) to `profile_dir`; return its path."""
+        os.makedirs(profile_dir, exist_ok=True)
+        stem = os.path.join(profile_dir, os.path.splitext(os.path.basename(self.pdf_path))[0])
+        # Written under a temporary name so a killed worker never leaves half a report
+        with open(f"{stem}.profile.txt.tmp", 'w', encoding='utf-8') as f:
+            f.write(self.report(in_progress))
+        os.replace(f"{stem}.profile.txt.tmp", f"{stem}.profile.txt")
+        if self.profile is not None:
+            self.profile.dump_stats(f"{stem}.prof")  # For pstats, snakeviz and similar viewers
+        return f"{stem}.profile.txt"
+
+
+class ProfileDocument:
+    """
+    Context manager profiling the extraction of one document.
+
+    Args:
+        pdf_path: The document being extracted.
+        profile_dir: Directory the report is written to.
+        mode: PROFILE_FULL or PROFILE_SAMPLED.
+        slower_than: Only write the report if the document took longer than
+            this many seconds (default: always).
+    """
+
+    def __init__(self, pdf_path: str, profile_dir: str, mode: str = PROFILE_FULL,
+                 slower_than: Optional[float] = None):
+        self.profile_dir = profile_dir
+        self.slower_than = slower_than
+        self.document = DocumentProfile(pdf_path, mode)
+        self._start = 0.0
+        self.report_path: Optional[str] = None  # Set once the final report is written
+        self._done = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+    def __enter__(self) -> DocumentProfile:
+        global _active
+        document = self.document
+        if document.mode == PROFILE_FULL:
+            import cProfile
+            import tracemalloc
+
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACE_FRAMES)
+                document.tracing = True
+            document.profile = cProfile.Profile()
+        else:
+            document.sampler = StackSampler(threading.get_ident(), root=sys._getframe(1))
+            document.sampler.start()
+        _active = document
+        self._start = time.perf_counter()
+        if document.sampler is not None and self.slower_than is not None:
+            self._watcher = threading.Thread(target=self._write_while_slow, name='profile-writer', daemon=True)
+            self._watcher.start()
+        if document.profile is not None:
+            document.profile.enable()
+        return document
+
+    def _write_while_slow(self) -> None:
+        """Write in-progress reports once the document passes the threshold."""
+        if self._done.wait(self.slower_than):
+            return
+        while True:
+            self.document.seconds = time.perf_counter() - self._start
+            self._write(in_progress=True)
+            if self._done.wait(PARTIAL_REPORT_INTERVAL):
+                return
+
+    def _write(self, in_progress: bool = False) -> None:
+        document = self.document
+        try:
+            path = document.write(self.profile_dir, in_progress)
+            if not in_progress:
+                self.report_path = path
+                logger.info(f"Wrote profile of {os.path.basename(document.pdf_path)} "
+                            f"({document.seconds:.2f}s) to {path}")
+        except OSError as e:
+            logger.error(f"Failed to write profile of {document.pdf_path}: {str(e)}")
+
+    def __exit__(self, *exc_info) -> None:
+        global _active
+        document = self.document
+        if document.profile is not None:
+            document.profile.disable()
+        elapsed = time.perf_counter() - self._start
+        _active = None
+        self._done.set()
+        if self._watcher is not None:
+            self._watcher.join()
+        document.seconds = elapsed
+        if document.sampler is not None:
+            document.sampler.stop()
+        if document.tracing:
+            import tracemalloc
+
+            current, peak = tracemalloc.get_traced_memory()
+            document.peak_alloc_bytes = max(document.peak_alloc_bytes, peak)
+            if current > document.snapshot_bytes * SNAPSHOT_GROWTH:
+                document.snapshot = tracemalloc.take_snapshot()
+                document.snapshot_bytes = current
+                document.snapshot_after = None
+            tracemalloc.stop()
+        if self.slower_than is None or document.seconds > self.slower_than:
+            self._write()
@@ -0,0 +1,114 @@
+"""
+Compile the JSON Schema subset used for the output files into plain Python checks.
+
+jsonschema.validate() builds a validator and walks the schema on every call,
+and importing jsonschema alone costs around 100 ms of start-up. The output
+schema only needs the type, required, properties, items, enum and minimum
+keywords, so compile_schema() turns it into nested closures once and the
+per-document check is a handful of isinstance() calls. Schemas using any
+other keyword are rejected at compile time rather than silently ignored.
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+
+SUPPORTED_KEYWORDS = frozenset({'type', 'required', 'properties', 'items', 'enum', 'minimum'})
+
+_Check = Callable[[Any, str], Optional[str]]
+
+# Same semantics as jsonschema: booleans are not numbers, integral floats are integers
+_TYPE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    'object': lambda value: isinstance(value, dict),
+    'array': lambda value: isinstance(value, list),
+    'string': lambda value: isinstance(value, str),
+    'integer': lambda value: (isinstance(value, int) and not isinstance(value, bool))
+                             or (isinstance(value, float) and value.is_integer()),
+    'number': lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    'boolean': lambda value: isinstance(value, bool),
+    'null': lambda value: value is None,
+}
+
+
+def _compile(schema: Dict[str, Any]) -> _Check:
+    unsupported = set(schema) - SUPPORTED_KEYWORDS
+    if unsupported:
+        raise ValueError(f"Unsupported schema keywords: {sorted(unsupported)}")
+
+    checks: List[_Check] = []
+
+    if 'type' in schema:
+        type_name = schema['type']
+        is_type = _TYPE_CHECKS[type_name]
+
+        def check_type(value: Any, path: str) -> Optional[str]:
+            if not is_type(value):
+                return f"{path}: {value!r} is not of type {type_name!r}"
+            return None
+        checks.append(check_type)
+
+    if 'enum' in schema:
+        allowed = list(schema['enum'])
+
+        def check_enum(value: Any, path: str) -> Optional[str]:
+            if value not in allowed:
+                return f"{path}: {value!r} is not one of {allowed!r}"
+            return None
+        checks.append(check_enum)
+
+    if 'minimum' in schema:
+        minimum = schema['minimum']
+
+        def check_minimum(value: Any, path: str) -> Optional[str]:
+            if _TYPE_CHECKS['number'](value) and value < minimum:
+                return f"{path}: {value!r} is less than the minimum of {minimum!r}"
+            return None
+        checks.append(check_minimum)
+
+    if 'required' in schema:
+        required = list(schema['required'])
+
+        def check_required(value: Any, path: str) -> Optional[str]:
+            if isinstance(value, dict):
+                for key in required:
+                    if key not in value:
+                        return f"{path}: {key!r} is a required property"
+            return None
+        checks.append(check_required)
+
+    if 'properties' in schema:
+        properties = {key: _compile(subschema) for key, subschema in schema['properties'].items()}
+
+        def check_properties(value: Any, path: str) -> Optional[str]:
+            if isinstance(value, dict):
+                for key, check in properties.items():
+                    if key in value:
+                        error = check(value[key], f"{path}.{key}")
+                        if error:
+                            return error
+            return None
+        checks.append(check_properties)
+
+    if 'items' in schema:
+        check_item = _compile(schema['items'])
+
+        def check_items(value: Any, path: str) -> Optional[str]:
+            if isinstance(value, list):
+                for index, item in enumerate(value):
+                    error = check_item(item, f"{path}[{index}]")
+                    if error:
+                        return error
+            return None
+        checks.append(check_items)
+
+    def check(value: Any, path: str) -> Optional[str]:
+        for check_one in checks:
+            error = check_one(value, path)
+            if error:
+                return error
+        return None
+    return check
+
+
+def compile_schema(schema: Dict[str, Any]) -> Callable[[Any], Optional[str]]:
+    """Return a function that gives the first violation of `schema` as a message, or None."""
+    check = _compile(schema)
+    return lambda instance: check(instance, '$')
@@ -0,0 +1,305 @@
+"""
+Resident extraction service.
+
+`python main.py --serve` imports pdfplumber, pdfminer and numpy once,
+keeps a WorkerPool of warm workers running and answers HTTP requests on a
+local TCP port or a Unix socket:
+
+    POST /extract   Body is either the PDF itself (any content type other
+                    than JSON) or JSON {"path": "/abs/doc.pdf", "deadline": 5}.
+                    Responds with the outline JSON.
+    GET  /health    Queue, worker and request counters.
+
+Requests wait in a bounded queue drained by a dispatcher thread. When the
+queue is full a request is refused immediately with 503 and a Retry-After
+header, so callers back off instead of piling up behind a slow batch. Each
+request carries a deadline (the X-Deadline header or "deadline" field, in
+seconds, else the server default) covering both its time in the queue and
+its extraction. The page budget of the extraction is scaled to the time
+left when it starts, and a worker still busy at the deadline is killed and
+the request answered with 504.
+"""
+
+import http.server
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import shutil
+import signal
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import batch
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+DEFAULT_QUEUE_SIZE = 32
+MAX_BODY_MB = 256
+PAGE_BUDGET_SHARE = 0.9   # Share of a request's remaining time given to reading pages
+DEADLINE_GRACE = 1.0      # Seconds a handler waits past the deadline for the dispatcher's answer
+IDLE_POLL_SECONDS = 1.0   # How often an idle dispatcher checks for shutdown
+
+
+class _Job:
+    """One queued request and the response the dispatcher fills in."""
+
+    def __init__(self, pdf_path: str, deadline: float):
+        self.pdf_path = pdf_path
+        self.deadline = deadline
+        self.status = 500
+        self.body: Dict[str, Any] = {}
+        self.done = threading.Event()
+
+    def finish(self, status: int, body: Dict[str, Any]) -> None:
+        self.status = status
+        self.body = body
+        self.done.set()
+
+
+class ExtractionService:
+    """
+    Bounded request queue in front of a WorkerPool.
+
+    Args:
+        extractor: Picklable function taking a PDF path (and a `page_budget`
+            keyword) and returning the result dict.
+        workers: Number of worker processes (default: CPU count).
+        queue_size: Requests that may wait for a worker before new ones are shed.
+        default_deadline: Seconds allowed per request when it names none.
+        preload: Modules the workers' forkserver imports before forking them.
+        pool_options: Further WorkerPool arguments.
+    """
+
+    def __init__(self, extractor: Callable[..., Dict[str, Any]], workers: Optional[int] = None,
+                 queue_size: int = DEFAULT_QUEUE_SIZE,
+                 default_deadline: float = batch.DEFAULT_TIMEOUT, preload: Iterable[str] = (),
+                 **pool_options: Any):
+        # Workers are forked from a single-threaded server process that has
+        # already imported the extractor's modules, not from this threaded one
+        pool_options.setdefault('context', 'forkserver')
+        if pool_options['context'] == 'forkserver':
+            multiprocessing.get_context('forkserver').set_forkserver_preload(['__main__', *preload])
+        self.pool = batch.WorkerPool(extractor, workers=workers, timeout=default_deadline, **pool_options)
+        self.default_deadline = default_deadline
+        self.queue: "queue.Queue[_Job]" = queue.Queue(maxsize=max(1, queue_size))
+        self.spool_dir = tempfile.mkdtemp(prefix='pdf-outline-')
+        self.counters: Dict[str, int] = defaultdict(int)
+        self._counter_lock = threading.Lock()
+        self._wake_reader, self._wake_writer = multiprocessing.Pipe(duplex=False)
+        self._wake_lock = threading.Lock()
+        self._running: Dict[int, _Job] = {}
+        self._stopping = threading.Event()
+        self._dispatcher = threading.Thread(target=self._dispatch, name='dispatcher', daemon=True)
+
+    def start(self) -> None:
+        self.pool.warm()
+        self._dispatcher.start()
+
+    def close(self) -> None:
+        """Stop dispatching, kill running workers and refuse whatever is still queued."""
+        self._stopping.set()
+        self._wake()
+        self._dispatcher.join()
+        self.pool.close()
+        for job in self._running.values():
+            job.finish(503, {'error': 'server shutting down'})
+        while not self.queue.empty():
+            self.queue.get_nowait().finish(503, {'error': 'server shutting down'})
+        shutil.rmtree(self.spool_dir, ignore_errors=True)
+
+    def count(self, name: str) -> None:
+        with self._counter_lock:
+            self.counters[name] += 1
+
+    def health(self) -> Dict[str, Any]:
+        with self._counter_lock:
+            counters = dict(self.counters)
+        return {
+            'workers': self.pool.size,
+            'busy': len(self._running),
+            'queued': self.queue.qsize(),
+            'queue_size': self.queue.maxsize,
+            'requests': counters,
+        }
+
+    def submit(self, job: _Job) -> bool:
+        """Queue `job` for a worker; return False if the queue is full."""
+        try:
+            self.queue.put_nowait(job)
+        except queue.Full:
+            self.count('shed')
+            return False
+        self._wake()
+        return True
+
+    def _wake(self) -> None:
+        with self._wake_lock:
+            self._wake_writer.send_bytes(b'')
+
+    def _dispatch(self) -> None:
+        next_tag = 0
+        while not self._stopping.is_set():
+            while self.pool.available and not self.queue.empty():
+                job = self.queue.get_nowait()
+                remaining = job.deadline - time.time()
+                if remaining <= 0:
+                    self.count('expired')
+                    job.finish(504, {'error': 'deadline expired while queued'})
+                    continue
+                next_tag += 1
+                self._running[next_tag] = job
+                self.pool.start(job.pdf_path, {'page_budget': remaining * PAGE_BUDGET_SHARE},
+                                timeout=remaining, tag=next_tag)
+
+            for item in self.pool.poll(timeout=IDLE_POLL_SECONDS, wakeup=[self._wake_reader]):
+                job = self._running.pop(item.tag)
+                if item.result is not None:
+                    self.count('completed')
+                    job.finish(200, item.result)
+                elif item.error == 'timeout':
+                    self.count('timeouts')
+                    job.finish(504, {'error': 'deadline exceeded'})
+                else:
+                    self.count('failures')
+                    job.finish(500, {'error': item.error})
+
+            while self._wake_reader.poll():
+                self._wake_reader.recv_bytes()
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    server_version = 'pdf-outline/1'
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(f"{self.command} {self.path}: {format % args}")
+
+    def _reply(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(body, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        if self.path != '/health':
+            self._reply(404, {'error': 'not found'})
+            return
+        self._reply(200, self.server.service.health())
+
+    def do_POST(self) -> None:
+        service: ExtractionService = self.server.service
+        if self.path != '/extract':
+            self._reply(404, {'error': 'not found'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length <= 0 or length > MAX_BODY_MB * 1024 * 1024:
+            self.close_connection = True
+            self._reply(400 if length <= 0 else 413, {'error': 'missing or oversized body'})
+            return
+        body = self.rfile.read(length)
+
+        deadline = self.headers.get('X-Deadline')
+        spooled = None
+        if self.headers.get_content_type() == 'application/json':
+            try:
+                request = json.loads(body)
+                pdf_path = request['path']
+                deadline = request.get('deadline', deadline)
+            except (ValueError, KeyError, TypeError):
+                self._reply(400, {'error': 'expected {"path": ...}'})
+                return
+            if not isinstance(pdf_path, str) or not os.path.isfile(pdf_path):
+                self._reply(404, {'error': f'no such file: {pdf_path}'})
+                return
+        else:
+            if b'%PDF' not in body[:1024]:
+                self._reply(400, {'error': 'body is not a PDF'})
+                return
+            fd, spooled = tempfile.mkstemp(suffix='.pdf', dir=service.spool_dir)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(body)
+            pdf_path = spooled
+
+        try:
+            try:
+                seconds = float(deadline) if deadline is not None else service.default_deadline
+                if seconds <= 0:
+                    raise ValueError(seconds)
+            except (TypeError, ValueError):
+                self._reply(400, {'error': f'invalid deadline: {deadline}'})
+                return
+
+            job = _Job(pdf_path, time.time() + seconds)
+            if not service.submit(job):
+                self._reply(503, {'error': 'queue full'}, {'Retry-After': '1'})
+                return
+            if not job.done.wait(seconds + DEADLINE_GRACE):
+                self._reply(504, {'error': 'deadline exceeded'})
+                return
+            self._reply(job.status, job.body)
+        finally:
+            if spooled is not None:
+                try:
+                    os.unlink(spooled)
+                except OSError:
+                    pass
+
+
+class _TCPServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class _UnixServer(_TCPServer):
+    address_family = socket.AF_UNIX
+
+    def server_bind(self) -> None:
+        # HTTPServer.server_bind expects a (host, port) address
+        socketserver.TCPServer.server_bind(self)
+        self.server_name = self.server_address
+        self.server_port = 0
+
+
+def serve(extractor: Callable[..., Dict[str, Any]], host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+          socket_path: Optional[str] = None, **service_options: Any) -> None:
+    """Run the extraction service until interrupted or sent SIGTERM."""
+    service = ExtractionService(extractor, **service_options)
+    service.start()
+
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)  # Left over from an earlier run
+        server = _UnixServer(socket_path, _Handler)
+        address = socket_path
+    else:
+        server = _TCPServer((host, port), _Handler)
+        address = f"http://{host}:{server.server_port}"
+    server.service = service
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+    logger.info(f"Serving on {address} with {service.pool.size} workers and a queue of {service.queue.maxsize}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+        logger.info("Server stopped")
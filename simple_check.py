@@ -1,5 +1,6 @@
 import sys
-from PyPDF2 import PdfReader
+
+from document_session import DocumentSession
 
 def main():
     if len(sys.argv) < 2:
@@ -10,18 +11,22 @@ def main():
     print(f"Checking PDF: {pdf_path}")
     
     try:
-        with open(pdf_path, 'rb') as f:
-            reader = PdfReader(f)
-            print(f"Number of pages: {len(reader.pages)}")
+        with DocumentSession(pdf_path) as session:
+            print(f"Number of pages: {session.page_count}")
             
-            if hasattr(reader, 'outline') and reader.outline:
+            bookmarks = session.bookmarks(max_level=None)
+            if bookmarks:
+                outline = '\n'.join(
+                    f"{'  ' * (int(entry['level'][1:]) - 1)}{entry['text']} (page {entry['page']})"
+                    for entry in bookmarks
+                )
                 print("\nOutline found!")
                 print("\nOutline structure:")
-                print(reader.outline)
+                print(outline)
                 
                 # Extract outline to a file
                 with open('output/outline_content.txt', 'w', encoding='utf-8') as out_file:
-                    out_file.write(str(reader.outline))
+                    out_file.write(outline + '\n')
                 print("\nOutline content saved to output/outline_content.txt")
             else:
                 print("\nNo outline found in the PDF.")
@@ -0,0 +1,54 @@
+"""Page counts come from the page tree root's /Count, with a size-based fallback."""
+
+import batch_scheduler
+import benchmark
+from batch_scheduler import page_count, plan_batch
+
+
+def _write(tmp_path, body, name='doc.pdf'):
+    path = tmp_path / name
+    path.write_bytes(b'%PDF-1.4\n' + body + b'\n%%EOF\n')
+    return str(path)
+
+
+def test_count_of_generated_document(tmp_path):
+    path = tmp_path / 'doc.pdf'
+    path.write_bytes(benchmark.build_pdf([[(12, f'Page {n}')] for n in range(7)]))
+    assert page_count(str(path)) == 7
+
+
+def test_count_before_type_and_nested_dictionaries(tmp_path):
+    assert page_count(_write(tmp_path, b'1 0 obj << /Count 7 /Kids [2 0 R] /Type /Pages >> endobj')) == 7
+    body = b'1 0 obj << /Type /Pages /Resources << /Font 3 0 R >> /Count 12 >> endobj'
+    assert page_count(_write(tmp_path, body)) == 12
+
+
+def test_root_count_is_the_largest(tmp_path):
+    body = (b'1 0 obj << /Type /Pages /Kids [2 0 R 3 0 R] /Count 10 >> endobj\n'
+            b'2 0 obj << /Type /Pages /Parent 1 0 R /Count 4 >> endobj\n'
+            b'3 0 obj << /Type /Pages /Parent 1 0 R /Count 6 >> endobj')
+    assert page_count(_write(tmp_path, body)) == 10
+
+
+def test_page_objects_and_outline_counts_are_ignored(tmp_path):
+    body = (b'1 0 obj << /Type /Page /Count 5 >> endobj\n'
+            b'2 0 obj << /Type /Outlines /Count 9 >> endobj')
+    assert page_count(_write(tmp_path, body)) is None
+
+
+def test_root_found_in_the_tail(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_scheduler, 'COUNT_SCAN_BYTES', 64)
+    body = b'% ' + b'x' * 500 + b'\n1 0 obj << /Type /Pages /Count 42 >> endobj'
+    assert page_count(_write(tmp_path, body)) == 42
+    # Neither in the head nor in the tail: not searched
+    padding = b'% ' + b'x' * 500 + b'\n'
+    body = padding + b'1 0 obj << /Type /Pages /Count 42 >> endobj\n' + padding
+    assert page_count(_write(tmp_path, body)) is None
+
+
+def test_fallback_from_file_size(tmp_path):
+    path = _write(tmp_path, b'% ' + b'x' * (3 * batch_scheduler.BYTES_PER_PAGE))
+    missing = str(tmp_path / 'missing.pdf')
+    assert page_count(path) is None and page_count(missing) is None
+    pages = {d.pdf_path: d.pages for d in plan_batch([path, missing], workers=1, page_budget=10)}
+    assert pages == {path: 3, missing: 1}
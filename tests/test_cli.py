@@ -0,0 +1,25 @@
+"""The command line accepts PDF paths and -o, as run_extractor.py invokes it."""
+
+import json
+
+import pytest
+
+import benchmark
+import main
+
+PAGES = [[(20, 'Introduction'), (11, 'Body text that carries on for a while')] * 3] * 2
+
+
+def test_pdf_argument_with_output_path(tmp_path):
+    pdf_path = tmp_path / 'doc.pdf'
+    pdf_path.write_bytes(benchmark.build_pdf(PAGES))
+    output_path = tmp_path / 'output' / 'outline.json'
+    main.main([str(pdf_path), '-o', str(output_path), '--workers', '0'])
+    assert 'outline' in json.loads(output_path.read_text())
+    assert [p.name for p in output_path.parent.iterdir()] == ['outline.json']
+
+
+def test_output_path_needs_exactly_one_pdf(tmp_path):
+    with pytest.raises(SystemExit) as exc:
+        main.parse_args(['a.pdf', 'b.pdf', '-o', str(tmp_path / 'outline.json')])
+    assert exc.value.code == 2
@@ -0,0 +1,85 @@
+"""Font-size clustering for heading levels."""
+
+from font_model import FontSizeModel, _optimal_clusters
+
+
+def test_optimal_clusters_single_distinct_size():
+    assert _optimal_clusters([11.0], [500], 4) == [(0, 1)]
+
+
+def test_optimal_clusters_fewer_sizes_than_groups():
+    assert _optimal_clusters([9.0, 11.0, 16.0], [10, 500, 20], 4) == [(0, 1), (1, 2), (2, 3)]
+
+
+def test_optimal_clusters_no_sizes():
+    assert _optimal_clusters([], [], 4) == []
+
+
+def test_optimal_clusters_groups_nearby_sizes():
+    sizes = [10.8, 11.0, 11.2, 17.8, 18.0, 24.0]
+    weights = [50, 1000, 50, 20, 20, 10]
+    assert _optimal_clusters(sizes, weights, 3) == [(0, 3), (3, 5), (5, 6)]
+
+
+def test_optimal_clusters_cover_every_size_once():
+    sizes = [8.0, 9.0, 10.0, 11.0, 12.0, 14.0, 16.0, 20.0, 24.0]
+    clusters = _optimal_clusters(sizes, [1] * len(sizes), 4)
+    assert len(clusters) == 4
+    assert clusters[0][0] == 0 and clusters[-1][1] == len(sizes)
+    assert all(end == start for (_, end), (start, _) in zip(clusters, clusters[1:]))
+
+
+def _model(histogram):
+    model = FontSizeModel()
+    for size, weight in histogram.items():
+        model.add(size, weight)
+    return model
+
+
+def test_representative_sizes_exclude_body_text():
+    model = _model({24.0: 30, 20.0: 60, 16.0: 80, 14.0: 90, 11.0: 5000})
+    sizes = model.representative_sizes(k=4)
+    assert sizes == [24.0, 20.0, 16.0, 14.0]
+    assert 11.0 not in sizes
+
+
+def test_representative_sizes_drop_sizes_below_body_text():
+    model = _model({18.0: 40, 11.0: 5000, 8.0: 300})
+    assert model.representative_sizes(k=4) == [18.0] * 4
+
+
+def test_representative_sizes_single_size_has_no_headings():
+    assert _model({11.0: 5000}).representative_sizes(k=4) == []
+
+
+def test_representative_sizes_empty_model():
+    assert FontSizeModel().representative_sizes(k=4) == []
+
+
+def test_body_ceiling_is_just_above_the_body_text_group():
+    model = _model({18.0: 40, 11.0: 60, 10.0: 5000, 8.0: 300})
+    assert 10.0 < model.body_ceiling(k=4) < 11.0
+    assert FontSizeModel().body_ceiling(k=4) is None
+
+
+def _outline_of(tmp_path, pages, page_buffer='memory'):
+    import pdfplumber
+
+    import benchmark
+    import main
+
+    pdf_path = tmp_path / 'doc.pdf'
+    pdf_path.write_bytes(benchmark.build_pdf(pages))
+    with pdfplumber.open(str(pdf_path)) as pdf:
+        result, _ = main._font_size_outline(pdf, str(pdf_path), 1, float('inf'), page_buffer)
+    return result
+
+
+def test_heading_group_near_body_size_does_not_take_body_lines(tmp_path):
+    # 11pt headings are within 10% of the 10pt body text
+    pages = [[(16, 'Document Title')] + [(11, f'Section {n}')] + [(10, f'Body line {i} of section {n}')
+                                                                  for i in range(20)]
+             for n in range(1, 4)]
+    result = _outline_of(tmp_path, pages)
+    assert result['title'] == 'Document Title'
+    assert [entry['text'] for entry in result['outline']] == ['Section 1', 'Section 2', 'Section 3']
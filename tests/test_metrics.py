@@ -0,0 +1,46 @@
+"""Metrics are only timed on request, and batch totals never share a series name with documents."""
+
+import benchmark
+import main
+from metrics import CounterMetrics, Metrics, to_prometheus
+
+PAGES = [[(20, 'Introduction'), (11, 'Body text that carries on for a while')] * 3] * 4
+
+
+def _metric_names(text, prefix):
+    return {line.split('{')[0].split(' ')[0] for line in text.splitlines()
+            if line.startswith(prefix) and not line.startswith('#')}
+
+
+def test_batch_totals_have_their_own_metric_names():
+    document = Metrics()
+    with document.stage('open'):
+        pass
+    document.incr('pages_processed', 3)
+    batch = Metrics()
+    batch.merge(document)
+    batch.incr('documents')
+    text = to_prometheus(batch, {'a.pdf': document})
+    batch_names = _metric_names(text, 'pdf_outline_batch_')
+    document_names = _metric_names(text, 'pdf_outline_') - batch_names
+    assert 'pdf_outline_batch_pages_processed_total' in batch_names
+    assert 'pdf_outline_pages_processed_total' in document_names
+    for line in text.splitlines():
+        if line.split('{')[0] in document_names:
+            assert 'document="a.pdf"' in line
+
+
+def test_counters_kept_without_timings():
+    metrics = CounterMetrics()
+    with metrics.stage('open'):
+        metrics.incr('page_errors')
+    assert metrics.as_dict() == {'stages': {}, 'counters': {'page_errors': 1}}
+
+
+def test_completeness_without_metrics(tmp_path):
+    pdf_path = tmp_path / 'doc.pdf'
+    pdf_path.write_bytes(benchmark.build_pdf(PAGES))
+    result, metrics, complete = main.process_document(str(pdf_path), tiered=False)
+    assert metrics is None and complete and 'outline' in result
+    _, _, complete = main.process_document(str(pdf_path), tiered=False, page_budget=0)
+    assert not complete
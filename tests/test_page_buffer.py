@@ -0,0 +1,43 @@
+"""--page-buffer reparse gives the same outline as the buffers that keep every line."""
+
+import pdfplumber
+
+import benchmark
+import main
+from metrics import Metrics
+
+
+def _outline(pdf_path, page_buffer):
+    metrics = Metrics()
+    with pdfplumber.open(str(pdf_path)) as pdf:
+        result, _ = main._font_size_outline(pdf, str(pdf_path), 1, float('inf'), page_buffer, metrics)
+    return result, metrics.counters
+
+
+def test_reparse_reads_each_page_once(tmp_path):
+    pdf_path = tmp_path / 'dense.pdf'
+    data, _ = benchmark.generate(benchmark.Scenario('10p-dense', 10, 45, 3, False))
+    pdf_path.write_bytes(data)
+    memory, _ = _outline(pdf_path, 'memory')
+    reparse, counters = _outline(pdf_path, 'reparse')
+    assert reparse == memory
+    assert counters['pages_processed'] == 10
+    assert 'pages_reread' not in counters
+
+
+def test_reparse_rereads_pages_whose_untexted_lines_become_headings(tmp_path):
+    # Pages 4-5 are mostly 12pt, so by page 5 its 11pt heading is below the size used
+    # most so far and is read without text; the 10pt body text of the later pages then
+    # makes 11pt a heading size
+    front = [[(20, 'Document Title')] + [(10, f'Front matter line {i}') for i in range(3)]] * 3
+    shifted = [[(11, f'Early Section {n}')] + [(12, f'Large print line {i}') for i in range(30)] for n in (4, 5)]
+    body = [[(11, f'Later Section {n}')] + [(10, f'Body text line {i} of the section') for i in range(40)]
+            for n in range(6, 16)]
+    pdf_path = tmp_path / 'shifted.pdf'
+    pdf_path.write_bytes(benchmark.build_pdf(front + shifted + body))
+
+    memory, _ = _outline(pdf_path, 'memory')
+    reparse, counters = _outline(pdf_path, 'reparse')
+    assert reparse == memory
+    assert counters['pages_reread'] == 1
+    assert 'Early Section 5' in [entry['text'] for entry in reparse['outline']]
@@ -0,0 +1,71 @@
+"""PageScheduler reads the head, then pages after a contents list, then a stride sample, within its budget."""
+
+from types import SimpleNamespace
+
+import page_scheduler
+from page_scheduler import PageCostModel, PageScheduler, coverage_order
+
+TOC_LINES = [(f'Chapter {n} .......... {n * 10}', 11.0, 20) for n in range(1, 6)]
+
+
+def _run(scheduler, clock=None, seconds=1.0, lines=None):
+    read = []
+    for pg_no in scheduler:
+        read.append(pg_no)
+        if clock is not None:
+            clock.now += seconds
+        scheduler.record(pg_no, seconds, (lines or {}).get(pg_no, ()))
+    return read
+
+
+def _fake_clock(monkeypatch):
+    clock = SimpleNamespace(now=0.0)
+    monkeypatch.setattr(page_scheduler, 'time', SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+def test_coverage_order_halves_the_stride():
+    assert coverage_order(list(range(1, 9))) == [1, 5, 3, 7, 2, 4, 6, 8]
+    assert coverage_order([]) == []
+
+
+def test_head_then_stride_without_a_budget(monkeypatch):
+    _fake_clock(monkeypatch)
+    scheduler = PageScheduler({n: 100 for n in range(1, 11)}, deadline=1e9)
+    assert _run(scheduler) == [1, 2, 3, 4, 8, 6, 10, 5, 7, 9]
+    assert scheduler.skipped == 0
+
+
+def test_page_after_toc_is_promoted(monkeypatch):
+    _fake_clock(monkeypatch)
+    scheduler = PageScheduler({n: 100 for n in range(1, 11)}, deadline=1e9, head_pages=1)
+    read = _run(scheduler, lines={1: TOC_LINES, 2: TOC_LINES})
+    assert read[:3] == [1, 2, 3]
+    assert sorted(read) == list(range(1, 11))
+
+
+def test_budget_keeps_head_and_spans_the_document(monkeypatch):
+    clock = _fake_clock(monkeypatch)
+    scheduler = PageScheduler({n: 100 for n in range(1, 101)}, deadline=5.5,
+                              cost_model=PageCostModel(default_seconds=1.0))
+    assert _run(scheduler, clock) == [1, 2, 3, 4, 68]
+    assert scheduler.skipped == 95
+
+
+def test_pages_predicted_to_overrun_are_skipped(monkeypatch):
+    clock = _fake_clock(monkeypatch)
+    cost_model = PageCostModel()
+    cost_model.observe(100, 0.1)
+    cost_model.observe(10_000, 100.0)
+    scheduler = PageScheduler({1: 100, 2: 10_000, 3: 100, 4: 10_000}, deadline=10.0,
+                              head_pages=0, cost_model=cost_model)
+    assert _run(scheduler, clock, seconds=0.1) == [1, 3]
+    assert scheduler.skipped == 2
+
+
+def test_nothing_read_after_the_deadline(monkeypatch):
+    clock = _fake_clock(monkeypatch)
+    clock.now = 10.0
+    scheduler = PageScheduler({n: 100 for n in range(1, 6)}, deadline=5.0)
+    assert _run(scheduler, clock) == []
+    assert scheduler.skipped == 5
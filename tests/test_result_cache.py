@@ -0,0 +1,60 @@
+"""The result cache keeps only results that were extracted in full."""
+
+import os
+
+import benchmark
+import main
+
+PAGES = [[(20, 'Introduction'), (11, 'Body text that carries on for a while')] * 3] * 4
+
+
+def _run(tmp_path, *extra_args):
+    input_dir = tmp_path / 'in'
+    input_dir.mkdir(exist_ok=True)
+    pdf_path = input_dir / 'doc.pdf'
+    pdf_path.write_bytes(benchmark.build_pdf(PAGES))
+    args = main.parse_args(['--input-dir', str(input_dir), '--output-dir', str(tmp_path / 'out'),
+                            '--cache-dir', str(tmp_path / 'cache'), '--workers', '0', *extra_args])
+    os.makedirs(args.output_dir, exist_ok=True)
+    return main.process_files([str(pdf_path)], args)
+
+
+def _cached_results(tmp_path):
+    return [name for name in os.listdir(tmp_path / 'cache') if name.endswith('.json')]
+
+
+def test_complete_result_is_cached(tmp_path):
+    _run(tmp_path)
+    assert len(_cached_results(tmp_path)) == 1
+
+
+def test_result_with_pages_skipped_for_time_is_not_cached(tmp_path):
+    # A deadline that has already passed skips every page
+    outcomes = _run(tmp_path, '--batch-deadline', '0.000001')
+    assert list(outcomes.values())[0][1] is None  # The partial result is still written
+    assert _cached_results(tmp_path) == []
+
+    # The next run extracts the document again instead of reusing the partial result
+    _run(tmp_path)
+    assert len(_cached_results(tmp_path)) == 1
+
+
+def test_failed_extraction_is_not_cached(tmp_path):
+    input_dir = tmp_path / 'in'
+    input_dir.mkdir()
+    (input_dir / 'broken.pdf').write_bytes(b'%PDF-1.4\nnot a pdf\n')
+    args = main.parse_args(['--input-dir', str(input_dir), '--output-dir', str(tmp_path / 'out'),
+                            '--cache-dir', str(tmp_path / 'cache'), '--workers', '0'])
+    os.makedirs(args.output_dir, exist_ok=True)
+    main.process_files([str(input_dir / 'broken.pdf')], args)
+    assert _cached_results(tmp_path) == []
+
+
+def test_unreadable_document_still_gets_output(tmp_path):
+    missing = tmp_path / 'missing.pdf'
+    args = main.parse_args(['--output-dir', str(tmp_path / 'out'), '--cache-dir', str(tmp_path / 'cache'),
+                            '--workers', '0', '--pipeline'])
+    os.makedirs(args.output_dir)
+    outcomes = main.process_files([str(missing)], args)
+    assert outcomes[str(missing)][0] == main.output_filename_for('missing.pdf')
+    assert (tmp_path / 'out' / 'missing_final_outline.json').exists()
@@ -0,0 +1,49 @@
+"""The compiled output validator accepts what jsonschema accepts and names the first violation."""
+
+import pytest
+
+from main import OUTPUT_SCHEMA
+from schema_validator import compile_schema
+
+check = compile_schema(OUTPUT_SCHEMA)
+
+VALID = [
+    {'title': 'Report', 'outline': []},
+    {'title': '', 'outline': [{'level': 'H1', 'text': 'Introduction', 'page': 1},
+                              {'level': 'H3', 'text': 'Scope', 'page': 2.0}]},
+]
+
+INVALID = [
+    ({'outline': []}, "$: 'title' is a required property"),
+    ({'title': None, 'outline': []}, "$.title: None is not of type 'string'"),
+    ({'title': '', 'outline': {}}, "$.outline: {} is not of type 'array'"),
+    ({'title': '', 'outline': [{'level': 'H4', 'text': 'x', 'page': 1}]},
+     "$.outline[0].level: 'H4' is not one of ['H1', 'H2', 'H3']"),
+    ({'title': '', 'outline': [{'level': 'H1', 'text': 'x', 'page': 0}]},
+     "$.outline[0].page: 0 is less than the minimum of 1"),
+    ({'title': '', 'outline': [{'level': 'H1', 'text': 'x', 'page': True}]},
+     "$.outline[0].page: True is not of type 'integer'"),
+    ({'title': '', 'outline': [{'level': 'H1', 'page': 1}]},
+     "$.outline[0]: 'text' is a required property"),
+]
+
+
+@pytest.mark.parametrize('instance', VALID)
+def test_accepts_valid_outlines(instance):
+    assert check(instance) is None
+
+
+@pytest.mark.parametrize('instance, message', INVALID)
+def test_rejects_invalid_outlines(instance, message):
+    assert check(instance) == message
+
+
+@pytest.mark.parametrize('instance', VALID + [instance for instance, _ in INVALID])
+def test_agrees_with_jsonschema(instance):
+    jsonschema = pytest.importorskip('jsonschema')
+    assert (check(instance) is None) == jsonschema.Draft7Validator(OUTPUT_SCHEMA).is_valid(instance)
+
+
+def test_unsupported_keywords_are_rejected():
+    with pytest.raises(ValueError, match='pattern'):
+        compile_schema({'type': 'string', 'pattern': '^H[1-3]$'})
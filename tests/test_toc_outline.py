@@ -0,0 +1,78 @@
+"""A printed table of contents is detected, parsed and mapped onto physical pages."""
+
+from toc_outline import TocEntry, detect_offset, is_toc_page, outline_from_toc, parse_entries, _plausible
+
+BODY = ('Body text that runs across the page and carries on', 10.0, 50, 72.0)
+
+TOC = [
+    ('Contents', 16.0, 8, 72.0),
+    ('1 Introduction .......... 1', 11.0, 20, 72.0),
+    ('1.1 Scope .......... 2', 11.0, 14, 84.0),
+    ('2 Methods .......... 4', 11.0, 16, 72.0),
+    ('3 Results .......... 7', 11.0, 16, 72.0),
+]
+
+
+def _document(shift=2, **moved):
+    """Twelve pages with the contents on page 2; printed page n is physical n + shift."""
+    headings = {'1 Introduction': 1, '1.1 Scope': 2, '2 Methods': 4, '3 Results': 7}
+    headings.update(moved)
+    pages = {n: [BODY] for n in range(1, 13)}
+    pages[1] = [('Annual Report', 24.0, 13, 72.0), BODY]
+    pages[2] = TOC
+    for text, printed in headings.items():
+        size = 14.0 if '.' in text.split()[0] else 18.0
+        pages[printed + shift] = [(text, size, len(text), 72.0), BODY]
+    return lambda pg_no: pages.get(pg_no, [])
+
+
+def test_toc_page_detection():
+    assert is_toc_page(TOC)
+    assert not is_toc_page([BODY] * 6)
+    # Titled, but too few entries
+    assert not is_toc_page(TOC[:3] + [BODY] * 4)
+
+
+def test_levels_from_numbering_and_indentation():
+    assert [(e.text, e.level, e.page) for e in parse_entries(TOC)] == [
+        ('1 Introduction', 1, 1), ('1.1 Scope', 2, 2), ('2 Methods', 1, 4), ('3 Results', 1, 7)]
+    unnumbered = [('Overview .... 3', 11.0, 8, 72.0), ('Background .... 4', 11.0, 10, 90.0),
+                  ('Design .... 6', 11.0, 6, 72.0)]
+    assert [e.level for e in parse_entries(unnumbered)] == [1, 2, 1]
+
+
+def test_descending_or_out_of_range_pages_are_not_a_toc():
+    entries = parse_entries(TOC)
+    assert _plausible(entries, page_count=12)
+    assert not _plausible(list(reversed(entries)), page_count=12)
+    assert not _plausible([e._replace(page=e.page * 100) for e in entries], page_count=12)
+
+
+def test_offset_detection():
+    entries = parse_entries(TOC)
+    assert detect_offset(entries, _document(shift=2), first_page=3, page_count=12) == 2
+    assert detect_offset(entries, _document(shift=0), first_page=1, page_count=12) == 0
+    assert detect_offset([TocEntry('Missing', 1, 3, 72.0)], _document(), first_page=3, page_count=12) is None
+
+
+def test_outline_with_detected_offset():
+    assert outline_from_toc(12, _document(shift=2)) == [
+        {'level': 'H1', 'text': 'Contents', 'page': 2},
+        {'level': 'H1', 'text': '1 Introduction', 'page': 3},
+        {'level': 'H2', 'text': '1.1 Scope', 'page': 4},
+        {'level': 'H1', 'text': '2 Methods', 'page': 6},
+        {'level': 'H1', 'text': '3 Results', 'page': 9},
+    ]
+
+
+def test_page_labels_take_precedence_over_offsets():
+    # Results is printed as page 7 but sits two pages further on, which no single offset explains
+    read_lines = _document(shift=2, **{'3 Results': 9})
+    labels = {'1': 3, '2': 4, '4': 6, '7': 11}
+    assert outline_from_toc(12, read_lines, page_labels=labels)[-1] == {'level': 'H1', 'text': '3 Results', 'page': 11}
+
+
+def test_unconfirmed_table_is_not_trusted():
+    pages = {n: [BODY] for n in range(1, 13)}
+    pages[2] = TOC
+    assert outline_from_toc(12, lambda pg_no: pages[pg_no], page_labels={'1': 3, '2': 4, '4': 6, '7': 9}) == []
@@ -0,0 +1,222 @@
+"""
+Outline from a document's printed table of contents.
+
+Many long documents print a "Table of Contents" page, yet the font-size
+heuristic reads every page to rediscover the headings it lists.
+outline_from_toc() instead reads the first few pages, and if one is a
+table of contents it parses its entries into (text, level, printed page)
+and reads only the pages they point to:
+
+1. Detection: a page among the first TOC_SCAN_PAGES whose lines mostly end
+   in a page number (page_scheduler.looks_like_toc), or which is titled
+   "Contents" and has TOC_MIN_ENTRIES such lines. Its page numbers must
+   mostly ascend and stay within the document, which rules out numbered
+   lists and tables. Directly following pages that pass the same test and
+   carry on from its last page number continue it.
+2. Levels: the depth of an entry's section number ("2.1.3" is level 3);
+   entries without one get the level of their indentation among the
+   entries' left edges.
+3. Page offset: printed page numbers rarely equal physical ones (covers and
+   front matter go uncounted). With page labels the label is looked up;
+   otherwise the offset is the smallest one that puts two probe entries on
+   a page carrying their text.
+4. Confirmation: each entry's text is looked for on its page (or the pages
+   on either side). Unconfirmed entries are dropped, and if fewer than
+   MIN_CONFIRMED of them are found the table is not trusted at all. If the
+   table gives every entry the same level, the font sizes of the confirmed
+   headings decide their levels.
+
+Reading lines is left to the caller, so this module only decides which
+pages are read.
+"""
+
+import re
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from embedded_outline import MAX_LEVEL
+from page_scheduler import TOC_MIN_ENTRIES, looks_like_toc
+
+TOC_SCAN_PAGES = 6       # Leading pages searched for a table of contents
+TOC_MIN_PAGES = 8        # Shorter documents are cheaper to read in full
+MAX_PAGE_OFFSET = 20     # Largest difference between printed and physical page numbers tried
+INDENT_TOLERANCE = 3.0   # Left edges closer than this (points) are the same indentation
+MIN_CONFIRMED = 0.5      # Share of entries that must be found for the table to be trusted
+MIN_ASCENDING = 0.8      # Share of consecutive entries whose page numbers must not decrease
+
+TOC_TITLE = re.compile(r'^(?:table\s*of\s*)?contents$', re.IGNORECASE)
+TOC_LINE = re.compile(r'^(?P<text>.*?\S)(?:\s*\.{2,}\s*|\s+)(?P<page>\d{1,4})$')
+SECTION_NUMBER = re.compile(r'^(?P<number>\d{1,2}(?:\.\d{1,2})*)\.?\s*(?=\D)')
+
+# (text, font size, glyph count, left edge) of one line
+Line = Tuple[str, float, int, float]
+
+
+class TocEntry(NamedTuple):
+    """One entry of a printed table of contents."""
+    text: str
+    level: int
+    page: int     # As printed
+    left: float
+
+
+def _normalise(text: str) -> str:
+    # Lines built from glyphs may lack spaces, so only letters and digits are compared
+    return re.sub(r'[^0-9a-z]', '', text.lower())
+
+
+def is_toc_page(lines: Sequence[Line]) -> bool:
+    """Return True if the lines of a page look like a table of contents."""
+    if looks_like_toc(line[:3] for line in lines):
+        return True
+    titled = any(TOC_TITLE.match(text.strip()) for text, _, _, _ in lines[:3])
+    return titled and sum(1 for text, _, _, _ in lines if TOC_LINE.match(text)) >= TOC_MIN_ENTRIES
+
+
+def parse_entries(lines: Sequence[Line]) -> List[TocEntry]:
+    """Parse the entries of table-of-contents lines, with levels from numbering or indentation."""
+    parsed = []
+    for text, _, _, left in lines:
+        match = TOC_LINE.match(text.strip())
+        if match is None:
+            continue
+        entry_text = match.group('text').rstrip(' .')
+        if entry_text and not TOC_TITLE.match(entry_text):
+            parsed.append((entry_text, int(match.group('page')), left))
+    if not parsed:
+        return []
+
+    # Indentation levels: cluster the distinct left edges
+    indents: List[float] = []
+    for left in sorted(left for _, _, left in parsed):
+        if not indents or left - indents[-1] > INDENT_TOLERANCE:
+            indents.append(left)
+
+    def indent_level(left: float) -> int:
+        return 1 + max(i for i, indent in enumerate(indents) if left >= indent - INDENT_TOLERANCE / 2)
+
+    entries = []
+    for entry_text, page, left in parsed:
+        number = SECTION_NUMBER.match(entry_text)
+        level = number.group('number').count('.') + 1 if number else indent_level(left)
+        entries.append(TocEntry(entry_text, level, page, left))
+    return entries
+
+
+def _plausible(entries: Sequence[TocEntry], page_count: int, after: int = 0) -> bool:
+    """Return True if `entries` have page numbers a table of contents could list."""
+    if len(entries) < TOC_MIN_ENTRIES or entries[0].page < after:
+        return False
+    pages = [entry.page for entry in entries]
+    if max(pages) > page_count + MAX_PAGE_OFFSET:
+        return False
+    ascending = sum(1 for a, b in zip(pages, pages[1:]) if b >= a)
+    return ascending >= MIN_ASCENDING * (len(pages) - 1)
+
+
+def _on_page(entry: TocEntry, lines: Sequence[Line]) -> Optional[Line]:
+    """Return the line of `lines` carrying `entry`'s text, if any."""
+    wanted = _normalise(entry.text)
+    if not wanted:
+        return None
+    for line in lines:
+        found = _normalise(line[0])
+        # Headings may wrap onto a second line, or carry a page number in a running header
+        if found and (found == wanted or (len(found) >= len(wanted) // 2 and
+                                          (wanted.startswith(found) or found.startswith(wanted)))):
+            return line
+    return None
+
+
+def detect_offset(entries: Sequence[TocEntry], read_lines: Callable[[int], Sequence[Line]],
+                  first_page: int, page_count: int) -> Optional[int]:
+    """Return the physical minus printed page number that puts probe entries on their pages."""
+    probes = [entries[0]]
+    if len(entries) > 2:
+        probes.append(entries[len(entries) // 2])
+    for offset in sorted(range(-MAX_PAGE_OFFSET, MAX_PAGE_OFFSET + 1), key=lambda o: (abs(o), o < 0)):
+        if all(first_page <= entry.page + offset <= page_count and
+               _on_page(entry, read_lines(entry.page + offset)) is not None for entry in probes):
+            return offset
+    return None
+
+
+def outline_from_toc(page_count: int, read_lines: Callable[[int], Sequence[Line]],
+                     page_labels: Optional[Dict[str, int]] = None,
+                     deadline: float = float('inf')) -> List[Dict[str, Any]]:
+    """
+    Return outline entries confirmed from the document's table of contents, or [] if it has none.
+
+    Args:
+        page_count: Number of pages.
+        read_lines: Returns the lines of a (1-based) page. It is called
+            again for pages already read, so it should cache.
+        page_labels: Physical page number of each page label, if the
+            document defines labels.
+        deadline: time.time() after which entries are taken as listed
+            instead of being confirmed.
+    """
+    if page_count < TOC_MIN_PAGES:
+        return []
+    toc_pages: List[int] = []
+    entries: List[TocEntry] = []
+    for pg_no in range(1, min(TOC_SCAN_PAGES, page_count) + 1):
+        lines = read_lines(pg_no)
+        if is_toc_page(lines) and _plausible(parse_entries(lines), page_count):
+            toc_pages.append(pg_no)
+            entries = parse_entries(lines)
+            break
+    if not toc_pages:
+        return []
+    while toc_pages[-1] < page_count:
+        lines = read_lines(toc_pages[-1] + 1)
+        following = parse_entries(lines) if is_toc_page(lines) else []
+        if not _plausible(following, page_count, after=entries[-1].page):
+            break
+        toc_pages.append(toc_pages[-1] + 1)
+        entries.extend(following)
+
+    body_start = toc_pages[-1] + 1
+
+    if page_labels:
+        def physical(entry: TocEntry) -> Optional[int]:
+            return page_labels.get(str(entry.page))
+    else:
+        offset = detect_offset(entries, read_lines, body_start, page_count)
+        if offset is None:
+            return []
+
+        def physical(entry: TocEntry) -> Optional[int]:
+            return entry.page + offset
+
+    confirmed: List[Tuple[TocEntry, int, Optional[float]]] = []
+    for entry in entries:
+        pg_no = physical(entry)
+        if pg_no is None or not 1 <= pg_no <= page_count:
+            continue
+        if time.time() > deadline:
+            confirmed.append((entry, pg_no, None))  # Out of time: take the table's word for it
+            continue
+        for candidate in (pg_no, pg_no + 1, pg_no - 1):
+            if body_start <= candidate <= page_count:
+                line = _on_page(entry, read_lines(candidate))
+                if line is not None:
+                    confirmed.append((entry, candidate, line[1]))
+                    break
+    if len(confirmed) < max(TOC_MIN_ENTRIES, MIN_CONFIRMED * len(entries)):
+        return []
+
+    levels = [entry.level for entry, _, _ in confirmed]
+    sizes = sorted({round(size * 2) / 2 for _, _, size in confirmed if size is not None}, reverse=True)
+    if len(set(levels)) == 1 and len(sizes) > 1:
+        # A flat table: the headings' own sizes rank them
+        levels = [1 if size is None else sizes.index(round(size * 2) / 2) + 1 for _, _, size in confirmed]
+
+    outline = []
+    toc_title = next((text for text, _, _, _ in read_lines(toc_pages[0])[:3] if TOC_TITLE.match(text.strip())), None)
+    if toc_title is not None:
+        outline.append({'level': 'H1', 'text': toc_title.strip(), 'page': toc_pages[0]})
+    for (entry, pg_no, _), level in zip(confirmed, levels):
+        if level <= MAX_LEVEL:
+            outline.append({'level': f'H{level}', 'text': entry.text, 'page': pg_no})
+    return outline
@@ -0,0 +1,297 @@
+"""
+Watch-folder mode: keep the output directory in step with the input directory.
+
+A manifest in the output directory records, for every input PDF, its size,
+modification time, content hash, output file and processing status. On
+start-up the input directory is compared with the manifest once; after that
+only files named by inotify events (or, where inotify is unavailable, seen to
+change by a periodic scan) are looked at again, so an idle folder of any size
+costs nothing.
+
+A changed file is processed once its size and modification time have stayed
+the same for the debounce interval, so files still being copied in are not
+read half-written. A file whose content hash matches the manifest (touched
+or copied over with identical bytes) is not processed again. When an input
+disappears, its output is deleted.
+"""
+
+import ctypes
+import ctypes.util
+import json
+import logging
+import os
+import select
+import signal
+import struct
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from cache import file_digest
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = '.outline_manifest.json'
+DEFAULT_DEBOUNCE = 2.0
+DEFAULT_POLL_INTERVAL = 5.0
+
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+# inotify(7)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, name length
+
+
+class Manifest:
+    """Per-input records, persisted as JSON with atomic replacement."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)['files']
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable manifest {path}: {str(e)}")
+
+    def save(self) -> None:
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'files': self.entries}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def matches(self, pdf_path: str, st: os.stat_result) -> bool:
+        """Return True if `pdf_path` was already handled with this size and modification time."""
+        entry = self.entries.get(pdf_path)
+        return entry is not None and entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns
+
+
+class _Inotify:
+    """Minimal inotify binding over libc via ctypes (Linux only)."""
+
+    def __init__(self, directory: str):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def read(self) -> Tuple[Set[str], bool]:
+        """Return the names touched since the last read and whether a full rescan is needed."""
+        names = set()
+        rescan = False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset + EVENT_HEADER.size <= len(data):
+                _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                if mask & (IN_Q_OVERFLOW | IN_DELETE_SELF | IN_MOVE_SELF):
+                    rescan = True
+                elif name:
+                    names.add(os.fsdecode(name))
+        return names, rescan
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class FolderWatcher:
+    """
+    Process new and changed PDFs in `input_dir` and retire outputs of removed ones.
+
+    Args:
+        input_dir: Directory watched for PDFs.
+        manifest_path: JSON file recording what has been processed.
+        process: Called with a list of PDF paths; returns
+            {pdf_path: (output filename, error or None)}.
+        output_dir: Directory holding the output files named by `process`.
+        debounce: Seconds a file must stay unchanged before it is processed.
+        poll_interval: Seconds between scans when inotify is not used.
+        use_inotify: Use inotify when available instead of polling.
+    """
+
+    def __init__(self, input_dir: str, manifest_path: str,
+                 process: Callable[[List[str]], Dict[str, Tuple[str, Optional[str]]]],
+                 output_dir: str, debounce: float = DEFAULT_DEBOUNCE,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL, use_inotify: bool = True):
+        self.input_dir = input_dir
+        self.output_dir = output_dir
+        self.process = process
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.manifest = Manifest(manifest_path)
+        # Changed files waiting to settle: path -> (size, mtime_ns, time of last change)
+        self._settling: Dict[str, Tuple[int, int, float]] = {}
+        self._inotify: Optional[_Inotify] = None
+        if use_inotify:
+            try:
+                self._inotify = _Inotify(input_dir)
+            except (OSError, AttributeError) as e:
+                logger.warning(f"inotify unavailable, falling back to polling: {str(e)}")
+        self.mode = 'inotify' if self._inotify is not None else f"polling every {poll_interval:.1f}s"
+
+    def _observe(self, pdf_path: str, now: float) -> None:
+        """Note the current state of one input path."""
+        try:
+            st = os.stat(pdf_path)
+        except FileNotFoundError:
+            self._settling.pop(pdf_path, None)
+            self._remove(pdf_path)
+            return
+        if self.manifest.matches(pdf_path, st):
+            self._settling.pop(pdf_path, None)
+            return
+        previous = self._settling.get(pdf_path)
+        if previous is None or previous[:2] != (st.st_size, st.st_mtime_ns):
+            # A file last written long ago (found by the start-up scan) need not wait
+            self._settling[pdf_path] = (st.st_size, st.st_mtime_ns, min(now, st.st_mtime_ns / 1e9))
+
+    def _remove(self, pdf_path: str) -> None:
+        entry = self.manifest.entries.pop(pdf_path, None)
+        if entry is None:
+            return
+        if entry.get('output'):
+            try:
+                os.unlink(os.path.join(self.output_dir, entry['output']))
+            except FileNotFoundError:
+                pass
+        logger.info(f"Removed output of deleted input {os.path.basename(pdf_path)}")
+        self.manifest.save()
+
+    def scan(self) -> None:
+        """Compare the whole input directory with the manifest."""
+        now = time.time()
+        present = set()
+        with os.scandir(self.input_dir) as it:
+            for entry in it:
+                if entry.name.lower().endswith('.pdf') and entry.is_file():
+                    present.add(entry.path)
+                    self._observe(entry.path, now)
+        for pdf_path in list(self.manifest.entries):
+            if pdf_path not in present:
+                self._remove(pdf_path)
+
+    def _observe_names(self, names: Iterable[str]) -> None:
+        now = time.time()
+        for name in names:
+            if name.lower().endswith('.pdf'):
+                self._observe(os.path.join(self.input_dir, name), now)
+
+    def flush(self) -> int:
+        """Process files that have settled; return how many were processed."""
+        now = time.time()
+        settled = []
+        for pdf_path, (size, mtime_ns, changed) in list(self._settling.items()):
+            if now - changed < self.debounce:
+                continue
+            # Re-check, in case the last change was not reported (or not yet scanned)
+            self._observe(pdf_path, now)
+            current = self._settling.get(pdf_path)
+            if current is not None and current[2] == changed:
+                settled.append((pdf_path, size, mtime_ns))
+
+        changed_paths = []
+        records = {}
+        for pdf_path, size, mtime_ns in settled:
+            del self._settling[pdf_path]
+            try:
+                digest = file_digest(pdf_path)
+            except OSError:
+                continue  # Removed meanwhile; the deletion event follows
+            entry = self.manifest.entries.get(pdf_path)
+            if entry is not None and entry['sha256'] == digest and entry['status'] == STATUS_DONE:
+                entry.update(size=size, mtime_ns=mtime_ns)  # Same bytes, new timestamp
+                continue
+            records[pdf_path] = {'size': size, 'mtime_ns': mtime_ns, 'sha256': digest}
+            changed_paths.append(pdf_path)
+
+        if changed_paths:
+            logger.info(f"Processing {len(changed_paths)} new or changed PDFs")
+            outcomes = self.process(changed_paths)
+            for pdf_path in changed_paths:
+                output, error = outcomes.get(pdf_path, ('', 'not processed'))
+                self.manifest.entries[pdf_path] = dict(
+                    records[pdf_path],
+                    output=output,
+                    status=STATUS_DONE if error is None else STATUS_FAILED,
+                    error=error,
+                )
+        if settled:
+            self.manifest.save()
+        return len(changed_paths)
+
+    def _next_timeout(self) -> Optional[float]:
+        """Seconds until the next file settles, the next poll, or None to wait for events."""
+        timeouts = []
+        if self._settling:
+            now = time.time()
+            timeouts.append(max(0.0, min(c for _, _, c in self._settling.values()) + self.debounce - now))
+        if self._inotify is None:
+            timeouts.append(self.poll_interval)
+        return min(timeouts) if timeouts else None
+
+    def run(self, stop: Optional[threading.Event] = None) -> None:
+        """Watch until `stop` is set."""
+        stop = stop or threading.Event()
+        self.scan()
+        next_scan = time.time() + self.poll_interval
+        while not stop.is_set():
+            self.flush()
+            timeout = self._next_timeout()
+            if self._inotify is not None:
+                # Bounded wait so `stop` is noticed
+                timeout = 1.0 if timeout is None else min(timeout, 1.0)
+                ready, _, _ = select.select([self._inotify], [], [], timeout)
+                if ready:
+                    names, rescan = self._inotify.read()
+                    if rescan:
+                        self.scan()
+                    else:
+                        self._observe_names(names)
+            else:
+                stop.wait(timeout)
+                if time.time() >= next_scan:
+                    self.scan()
+                    next_scan = time.time() + self.poll_interval
+        if self._inotify is not None:
+            self._inotify.close()
+
+
+def watch(input_dir: str, manifest_path: str,
+          process: Callable[[List[str]], Dict[str, Tuple[str, Optional[str]]]], **options: Any) -> None:
+    """Run a FolderWatcher until interrupted or sent SIGTERM."""
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    watcher = FolderWatcher(input_dir, manifest_path, process, **options)
+    logger.info(f"Watching {input_dir} ({watcher.mode})")
+    try:
+        watcher.run(stop)
+    except KeyboardInterrupt:
+        pass
+    logger.info("Watch stopped")